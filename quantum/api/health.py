@@ -0,0 +1,131 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Health checks of the API server, served by the versions app:
+
+  GET /healthz  state of the plugin, the database, the devices and the
+                agents; 200 as long as the server answers
+  GET /readyz   200 when the plugin is initialized and the last database
+                statement succeeded, 503 otherwise
+
+Both are answered from the state cached in the server, so that they can
+be probed often: the outcomes of the DB, plugin and device calls recorded
+in the metrics registry, the status of the connection pools and the agent
+heartbeats, which are read from the database at most every
+heartbeat_cache_ttl seconds.
+"""
+
+import datetime
+import json
+import logging
+import time
+
+import webob
+
+from quantum.db import api as db
+from quantum.manager import QuantumManager
+from quantum import metrics
+
+
+LOG = logging.getLogger('quantum.api.health')
+PATHS = ('/healthz', '/readyz')
+# Outcomes which are not device calls
+CORE_COMPONENTS = ('db', 'plugin')
+
+
+def _failed(outcome):
+    """Returns True if the last call of a component failed"""
+    return outcome.get('last_failure', 0) > outcome.get('last_success', 0)
+
+
+class HeartbeatCache(object):
+    """Agent heartbeats, read from the database at most every ttl seconds"""
+
+    def __init__(self, ttl=10):
+        self.ttl = float(ttl)
+        self._heartbeats = []
+        self._read_at = None
+
+    def get(self):
+        now = time.time()
+        if self._read_at is None or now - self._read_at >= self.ttl:
+            self._read_at = now
+            try:
+                self._heartbeats = [(hb.host, hb.agent_type, hb.heartbeat_at)
+                                    for hb in db.agent_heartbeat_list()]
+            except Exception, e:
+                LOG.warn("Unable to read the agent heartbeats: %s" % e)
+        return self._heartbeats
+
+
+class HealthCheck(object):
+    """Answers the /healthz and /readyz requests"""
+
+    def __init__(self, heartbeat_cache_ttl=10, agent_down_time=30):
+        self.heartbeats = HeartbeatCache(heartbeat_cache_ttl)
+        self.agent_down_time = datetime.timedelta(
+            seconds=float(agent_down_time))
+
+    def __call__(self, req):
+        if req.path_info == '/readyz':
+            return self.readiness()
+        return self.health()
+
+    def _db_state(self, outcomes):
+        state = outcomes.get('db', {})
+        # Without any engine, as before the plugin configures its DB, only
+        # a failed statement makes the DB down
+        state['pool'] = db.pool_status()
+        state['ok'] = not _failed(state)
+        return state
+
+    def _agents(self):
+        # The heartbeats are in the core DB, unused by some plugins
+        if db.CORE_ENGINE not in db.pool_status():
+            return []
+        now = datetime.datetime.utcnow()
+        return [{'host': host,
+                 'agent_type': agent_type,
+                 'heartbeat_at': heartbeat_at.isoformat(),
+                 'alive': now - heartbeat_at <= self.agent_down_time}
+                for host, agent_type, heartbeat_at in self.heartbeats.get()]
+
+    def health(self):
+        outcomes = metrics.REGISTRY.outcomes()
+        plugin = outcomes.get('plugin', {})
+        plugin['status'] = QuantumManager.plugin_status()
+        devices = dict([(name, outcome) for name, outcome in
+                        outcomes.iteritems()
+                        if name not in CORE_COMPONENTS])
+        return _json_response({'plugin': plugin,
+                               'db': self._db_state(outcomes),
+                               'devices': devices,
+                               'agents': self._agents()})
+
+    def readiness(self):
+        checks = {
+            'plugin': QuantumManager.plugin_status() == 'ready',
+            'db': self._db_state(metrics.REGISTRY.outcomes())['ok']}
+        ready = all(checks.values())
+        return _json_response({'ready': ready, 'checks': checks},
+                              ready and 200 or 503)
+
+
+def _json_response(body, status=200):
+    return webob.Response(body=json.dumps(body), status=status,
+                          content_type="application/json")
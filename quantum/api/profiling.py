@@ -0,0 +1,178 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Per-request profiling of the API pipeline.
+
+The phases of every request are timed and returned in a Server-Timing
+header, and logged:
+
+  routing      from the profiling middleware to the API resource
+  deserialize  parsing of the request body
+  dispatch     controller action, including the plugin and DB time
+  plugin       plugin calls, including the DB time
+  db           SQL statements, with their count
+  serialize    building of the response body
+  total        whole request, as seen by the middleware
+
+When profile_dir is set, the requests are run under cProfile and the
+profile of the requests slower than profile_threshold_ms is dumped to
+that directory.
+"""
+
+import cProfile
+import functools
+import inspect
+import logging
+import os
+import re
+import time
+
+import eventlet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import webob.dec
+
+from quantum.manager import DeferredPlugin, QuantumManager
+from quantum import wsgi
+
+
+LOG = logging.getLogger('quantum.api.profiling')
+TIMING_HEADER = 'Server-Timing'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    timings = wsgi.RequestTimings.current()
+    if timings:
+        conn.info['query_start'] = time.time()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    timings = wsgi.RequestTimings.current()
+    start = conn.info.pop('query_start', None)
+    if timings and start:
+        timings.add('db', time.time() - start)
+
+
+def _timed_plugin_method(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with wsgi.RequestTimings.phase('plugin'):
+            return method(*args, **kwargs)
+    return wrapper
+
+
+class ProfilingMiddleware(wsgi.Middleware):
+    """Times the phases of the requests, and profiles the slow ones"""
+
+    _instrumented = False
+
+    def __init__(self, application, profile_dir=None,
+                 profile_threshold_ms=0, plugin=None):
+        super(ProfilingMiddleware, self).__init__(application)
+        self.profile_dir = profile_dir
+        self.profile_threshold_ms = profile_threshold_ms
+        self._instrument(plugin or QuantumManager.get_plugin())
+
+    @classmethod
+    def _instrument(cls, plugin):
+        """
+        Times the SQL statements and the public plugin methods, the wrapped
+        methods are plain functions and are not wrapped again
+        """
+        if not cls._instrumented:
+            event.listen(Engine, "before_cursor_execute",
+                         _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute",
+                         _after_cursor_execute)
+            cls._instrumented = True
+        if isinstance(plugin, DeferredPlugin):
+            eventlet.spawn_n(lambda: cls._instrument_plugin(plugin.wait()))
+        else:
+            cls._instrument_plugin(plugin)
+
+    @staticmethod
+    def _instrument_plugin(plugin):
+        for name, method in inspect.getmembers(plugin, inspect.ismethod):
+            if not name.startswith('_'):
+                setattr(plugin, name, _timed_plugin_method(method))
+
+    @webob.dec.wsgify
+    def __call__(self, req):
+        timings = wsgi.RequestTimings.activate()
+        profiler = None
+        try:
+            if self.profile_dir:
+                profiler = cProfile.Profile()
+                response = profiler.runcall(req.get_response,
+                                            self.application)
+            else:
+                response = req.get_response(self.application)
+            timings.mark('total')
+        finally:
+            wsgi.RequestTimings.deactivate()
+
+        response.headers[TIMING_HEADER] = self._timing_header(timings)
+        LOG.info(self._timing_log(req, response, timings))
+        total_ms = timings.durations['total'] * 1000
+        if profiler and total_ms >= self.profile_threshold_ms:
+            self._dump_profile(profiler, req, timings)
+        return response
+
+    def _timing_header(self, timings):
+        metrics = []
+        for phase in timings.phases:
+            metric = "%s;dur=%.3f" % (phase, timings.durations[phase] * 1000)
+            if phase == 'db':
+                metric += ';desc="%d queries"' % timings.counts[phase]
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+    def _timing_log(self, req, response, timings):
+        fields = ["method=%s" % req.method,
+                  "path=%s" % req.path,
+                  "status=%s" % response.status_int]
+        for phase in timings.phases:
+            fields.append("%s_ms=%.3f" % (phase,
+                                          timings.durations[phase] * 1000))
+        fields.append("db_count=%d" % timings.counts.get('db', 0))
+        return "request_timing " + " ".join(fields)
+
+    def _dump_profile(self, profiler, req, timings):
+        name = "%.6f-%s-%s.prof" % (timings.start, req.method,
+                                    re.sub(r'[^\w.-]+', '_', req.path))
+        path = os.path.join(self.profile_dir, name)
+        try:
+            profiler.dump_stats(path)
+            LOG.info("Profile of %s %s dumped to %s" % (req.method, req.path,
+                                                        path))
+        except (IOError, OSError), e:
+            LOG.error("Unable to dump profile to %s: %s" % (path, e))
+
+
+def filter_factory(global_config, **local_config):
+    """Paste factory."""
+    conf = global_config.copy()
+    conf.update(local_config)
+
+    def _factory(app):
+        return ProfilingMiddleware(
+            app, profile_dir=conf.get('profile_dir') or None,
+            profile_threshold_ms=float(conf.get('profile_threshold_ms', 0)))
+    return _factory
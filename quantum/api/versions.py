@@ -19,6 +19,7 @@ import logging
 import webob.dec
 
 from quantum import wsgi
+from quantum.api import health
 from quantum.api.views import versions as versions_view
 
 LOG = logging.getLogger('quantum.api.versions')
@@ -26,9 +27,16 @@ LOG = logging.getLogger('quantum.api.versions')
 
 class Versions(wsgi.Application):
 
+    def __init__(self, heartbeat_cache_ttl=10, agent_down_time=30):
+        self.health = health.HealthCheck(heartbeat_cache_ttl,
+                                         agent_down_time)
+
     @webob.dec.wsgify(RequestClass=wsgi.Request)
     def __call__(self, req):
         """Respond to a request for all Quantum API versions."""
+        if req.path_info in health.PATHS:
+            return self.health(req)
+
         version_objs = [
             {
                 "id": "v1.0",
@@ -61,3 +69,4 @@ class Versions(wsgi.Application):
         response.body = body
 
         return response
+
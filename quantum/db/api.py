@@ -18,18 +18,23 @@
 # @author: Dan Wendlandt, Nicira Networks, Inc.
 
 import logging
+import time
 
-from sqlalchemy import create_engine
+from sqlalchemy import and_, create_engine, event, exists, select
 from sqlalchemy.orm import sessionmaker, exc
 
 from quantum.api.api_common import OperationalStatus
 from quantum.common import exceptions as q_exc
 from quantum.db import models
+from quantum import metrics
 
 
 _ENGINE = None
 _MAKER = None
 BASE = models.BASE
+CORE_ENGINE = 'core'
+# Engines of the core and plugin DB layers, by name
+_ENGINES = {}
 LOG = logging.getLogger('quantum.db.api')
 
 
@@ -46,9 +51,46 @@ def configure_db(options):
                                 echo=False,
                                 echo_pool=True,
                                 pool_recycle=3600)
+        register_engine(CORE_ENGINE, _ENGINE)
         register_models()
 
 
+def register_engine(name, engine):
+    """
+    Records the statements of an engine in the metrics registry and
+    reports its pool in pool_status, for the plugins which use their own
+    engine
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "dbapi_error", _dbapi_error)
+    _ENGINES[name] = engine
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info['metrics_query_start'] = time.time()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = conn.info.pop('metrics_query_start', None)
+    if start:
+        metrics.histogram("db.query.latency").observe_since(start)
+    metrics.mark("db")
+
+
+def _dbapi_error(conn, cursor, statement, parameters, context, exception):
+    conn.info.pop('metrics_query_start', None)
+    metrics.mark("db", False)
+
+
+def pool_status():
+    """Returns the status of the connection pool of each engine, by name"""
+    return dict([(name, engine.pool.status())
+                 for name, engine in _ENGINES.iteritems()])
+
+
 def clear_db():
     global _ENGINE
     assert _ENGINE
@@ -98,6 +140,28 @@ def network_list(tenant_id):
       all()
 
 
+def _select_rows(row_class, whereclause):
+    """Reads the rows matching whereclause with a column-only select"""
+    session = get_session()
+    result = session.execute(select(row_class.table.columns, whereclause))
+    return [row_class._make(row) for row in result]
+
+
+def network_list_rows(tenant_id):
+    """Returns the networks of a tenant as NetworkRow tuples"""
+    table = models.NetworkRow.table
+    return _select_rows(models.NetworkRow, table.c.tenant_id == tenant_id)
+
+
+def network_get_row(net_id):
+    """Returns a network as a NetworkRow tuple"""
+    table = models.NetworkRow.table
+    rows = _select_rows(models.NetworkRow, table.c.uuid == net_id)
+    if not rows:
+        raise q_exc.NetworkNotFound(net_id=net_id)
+    return rows[0]
+
+
 def network_get(net_id):
     session = get_session()
     try:
@@ -118,24 +182,32 @@ def network_update(net_id, tenant_id, **kwargs):
     return net
 
 
-def network_destroy(net_id):
+def network_in_use(net_id):
+    """Returns True if a port of the network has an attachment"""
     session = get_session()
-    try:
-        net = session.query(models.Network).\
-          filter_by(uuid=net_id).\
-          one()
+    return session.query(exists().where(
+        and_(models.Port.network_id == net_id,
+             models.Port.interface_id != None))).scalar()
 
-        ports = session.query(models.Port).\
-            filter_by(network_id=net_id).\
-            all()
-        for p in ports:
-            session.delete(p)
 
-        session.delete(net)
-        session.flush()
+def network_destroy(net_id):
+    """Deletes a network and its ports in one transaction"""
+    session = get_session()
+    with session.begin():
+        try:
+            net = session.query(models.Network).\
+              filter_by(uuid=net_id).\
+              one()
+        except exc.NoResultFound:
+            raise q_exc.NetworkNotFound(net_id=net_id)
+
+        session.query(models.Port).\
+          filter_by(network_id=net_id).\
+          delete(synchronize_session=False)
+        session.query(models.Network).\
+          filter_by(uuid=net_id).\
+          delete(synchronize_session=False)
         return net
-    except exc.NoResultFound:
-        raise q_exc.NetworkNotFound(net_id=net_id)
 
 
 def port_create(net_id, state=None, op_status=OperationalStatus.UNKNOWN):
@@ -160,6 +232,28 @@ def port_list(net_id):
       all()
 
 
+def port_list_rows(net_id):
+    """Returns the ports of a network as PortRow tuples"""
+    table = models.PortRow.table
+    rows = _select_rows(models.PortRow, table.c.network_id == net_id)
+    if not rows:
+        # confirm network exists
+        network_get_row(net_id)
+    return rows
+
+
+def port_get_row(port_id, net_id):
+    """Returns a port as a PortRow tuple"""
+    table = models.PortRow.table
+    rows = _select_rows(models.PortRow, and_(table.c.uuid == port_id,
+                                             table.c.network_id == net_id))
+    if not rows:
+        # confirm network exists
+        network_get_row(net_id)
+        raise q_exc.PortNotFound(net_id=net_id, port_id=port_id)
+    return rows[0]
+
+
 def port_get(port_id, net_id, session=None):
     # confirm network exists
     network_get(net_id)
@@ -214,6 +308,8 @@ def port_set_attachment(port_id, net_id, new_interface_id):
             # this is what should happen
             pass
     port.interface_id = new_interface_id
+    # Bound again by the agent of the host of the new interface
+    port.host = None
     session.merge(port)
     session.flush()
     return port
@@ -226,6 +322,7 @@ def port_unset_attachment(port_id, net_id):
     session = get_session()
     port = port_get(port_id, net_id, session)
     port.interface_id = None
+    port.host = None
     session.add(port)
     session.flush()
 
@@ -248,3 +345,9 @@ def port_destroy(port_id, net_id):
         return port
     except exc.NoResultFound:
         raise q_exc.PortNotFound(port_id=port_id)
+
+
+def agent_heartbeat_list():
+    session = get_session()
+    return session.query(models.AgentHeartbeat).\
+      all()
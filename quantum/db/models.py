@@ -18,9 +18,10 @@
 # @author: Dan Wendlandt, Nicira Networks, Inc.
 # @author: Salvatore Orlando, Citrix Systems
 
+from collections import namedtuple
 import uuid
 
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, DateTime, String, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relation, object_mapper
 
@@ -64,6 +65,31 @@ class QuantumBase(object):
         return local.iteritems()
 
 
+def row_class(model):
+    """
+    Returns a named tuple class with the columns of model, for the rows
+    read with column-only queries instead of model instances. The fields
+    can also be read by name, as with the models; the rows keep no
+    per-instance dict and are not tracked by the session.
+    """
+    names = [column.name for column in model.__table__.columns]
+    base = namedtuple("%sRow" % model.__name__, names)
+
+    def __getitem__(self, key):
+        if isinstance(key, basestring):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    return type(base.__name__, (base,),
+                {'__slots__': (),
+                 '__getitem__': __getitem__,
+                 'get': get,
+                 'table': model.__table__})
+
+
 class Port(BASE, QuantumBase):
     """Represents a port on a quantum network"""
     __tablename__ = 'ports'
@@ -71,10 +97,12 @@ class Port(BASE, QuantumBase):
     uuid = Column(String(255), primary_key=True)
     network_id = Column(String(255), ForeignKey("networks.uuid"),
                         nullable=False)
-    interface_id = Column(String(255), nullable=True)
+    interface_id = Column(String(255), nullable=True, index=True)
     # Port state - Hardcoding string value at the moment
     state = Column(String(8))
     op_status = Column(String(16))
+    # Host of the VIF attached to the port, reported by the plugin agents
+    host = Column(String(255), nullable=True, index=True)
 
     def __init__(self, network_id,
                  op_status=common.OperationalStatus.UNKNOWN):
@@ -110,3 +138,25 @@ class Network(BASE, QuantumBase):
     def __repr__(self):
         return "<Network(%s,%s,%s,%s)>" % \
           (self.uuid, self.name, self.op_status, self.tenant_id)
+
+
+PortRow = row_class(Port)
+NetworkRow = row_class(Network)
+
+
+class AgentHeartbeat(BASE, QuantumBase):
+    """Represents the last heartbeat of a plugin agent on a host"""
+    __tablename__ = 'agent_heartbeats'
+
+    host = Column(String(255), primary_key=True)
+    agent_type = Column(String(255), primary_key=True)
+    heartbeat_at = Column(DateTime, nullable=False)
+
+    def __init__(self, host, agent_type, heartbeat_at):
+        self.host = host
+        self.agent_type = agent_type
+        self.heartbeat_at = heartbeat_at
+
+    def __repr__(self):
+        return "<AgentHeartbeat(%s,%s,%s)>" % \
+          (self.host, self.agent_type, self.heartbeat_at)
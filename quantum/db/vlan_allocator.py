@@ -0,0 +1,166 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012, Cisco Systems, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+
+from sqlalchemy import or_
+
+
+LOG = logging.getLogger('quantum.db.vlan_allocator')
+
+
+class VlanBitmap(object):
+    """
+    Compact bitmap of the used VLAN IDs of a range, the lowest free
+    VLAN ID is found without scanning the range in Python.
+    """
+
+    def __init__(self, start, end, used_ids=()):
+        self.start = start
+        self.end = end
+        self._full = (1 << (end - start + 1)) - 1
+        self._used = 0
+        for vlan_id in used_ids:
+            self.set_used(vlan_id)
+
+    def __contains__(self, vlan_id):
+        return self.start <= vlan_id <= self.end
+
+    def is_used(self, vlan_id):
+        """Checks if a VLAN ID of the range is marked as used"""
+        return vlan_id in self and bool(self._used >> (vlan_id - self.start)
+                                        & 1)
+
+    def set_used(self, vlan_id):
+        """Marks a VLAN ID as used, IDs outside of the range are ignored"""
+        if vlan_id in self:
+            self._used |= 1 << (vlan_id - self.start)
+
+    def set_free(self, vlan_id):
+        """Marks a VLAN ID as free, IDs outside of the range are ignored"""
+        if vlan_id in self:
+            self._used &= ~(1 << (vlan_id - self.start))
+
+    def lowest_free(self):
+        """Returns the lowest free VLAN ID of the range, or None"""
+        free = ~self._used & self._full
+        if not free:
+            return None
+        # bin() of the lowest set bit is '0b1' followed by its index in
+        # zeros, int.bit_length() is not available on Python 2.6
+        return self.start + len(bin(free & -free)) - 3
+
+    def used_count(self):
+        """Returns the number of used VLAN IDs of the range"""
+        return bin(self._used).count('1')
+
+
+class VlanAllocator(object):
+    """
+    Allocates VLAN IDs from a table with one (vlan_id, vlan_used) row per
+    VLAN ID. The used VLAN IDs are cached in a bitmap, so a reservation is
+    a single conditional UPDATE of the lowest free candidate. Another
+    server sharing the table may have taken the candidate, in which case
+    the next candidate is tried, and the bitmap is reloaded from the table
+    after repeated conflicts.
+    """
+    MAX_CONFLICTS = 3
+
+    def __init__(self, model, get_session, start, end):
+        self._model = model
+        self._get_session = get_session
+        self._bitmap = None
+        self.set_range(start, end)
+
+    def set_range(self, start, end):
+        """
+        Sets the range of VLAN IDs to allocate from, the missing rows are
+        inserted and the unused rows outside of the range deleted. Used
+        VLAN IDs outside of the range are kept until they are released.
+        """
+        LOG.debug("Setting VLAN range to %s-%s" % (start, end))
+        session = self._get_session()
+        session.query(self._model).\
+          filter(or_(self._model.vlan_id < start,
+                     self._model.vlan_id > end)).\
+          filter_by(vlan_used=False).\
+          delete(synchronize_session=False)
+        existing = set([vlan_id for vlan_id, in
+                        session.query(self._model.vlan_id)])
+        missing = [{'vlan_id': vlan_id, 'vlan_used': False}
+                   for vlan_id in xrange(start, end + 1)
+                   if vlan_id not in existing]
+        if missing:
+            LOG.debug("Adding %d VLAN IDs" % len(missing))
+            session.execute(self._model.__table__.insert(), missing)
+        self._bitmap = VlanBitmap(start, end)
+        self._load(session)
+
+    def reload(self):
+        """Rebuilds the bitmap from the table"""
+        self._load(self._get_session())
+
+    def _load(self, session):
+        """
+        Rebuilds the bitmap in one query, VLAN IDs without a row are not
+        available and marked as used
+        """
+        bitmap = VlanBitmap(self._bitmap.start, self._bitmap.end,
+                            xrange(self._bitmap.start, self._bitmap.end + 1))
+        for vlan_id, in session.query(self._model.vlan_id).\
+          filter_by(vlan_used=False):
+            bitmap.set_free(vlan_id)
+        self._bitmap = bitmap
+
+    def reserve(self):
+        """Reserves the lowest free VLAN ID, returns None if none is left"""
+        session = self._get_session()
+        conflicts = 0
+        reloaded = False
+        while True:
+            vlan_id = self._bitmap.lowest_free()
+            if vlan_id is None or conflicts == self.MAX_CONFLICTS:
+                if vlan_id is None and reloaded:
+                    return None
+                self._load(session)
+                conflicts = 0
+                reloaded = True
+                continue
+            self._bitmap.set_used(vlan_id)
+            count = session.query(self._model).\
+              filter_by(vlan_id=vlan_id).\
+              filter_by(vlan_used=False).\
+              update({'vlan_used': True}, synchronize_session=False)
+            if count:
+                return vlan_id
+            LOG.debug("VLAN ID %s already reserved" % vlan_id)
+            conflicts += 1
+
+    def release(self, vlan_id):
+        """
+        Releases a VLAN ID, returns False if the VLAN ID is unknown.
+        VLAN IDs outside of the range are deleted.
+        """
+        session = self._get_session()
+        query = session.query(self._model).\
+          filter_by(vlan_id=vlan_id)
+        if vlan_id in self._bitmap:
+            count = query.update({'vlan_used': False},
+                                 synchronize_session=False)
+        else:
+            count = query.delete(synchronize_session=False)
+        self._bitmap.set_free(vlan_id)
+        return bool(count)
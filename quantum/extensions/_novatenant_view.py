@@ -42,6 +42,12 @@ class ViewBuilder(object):
         """Return host description."""
         return dict(host_list=host_data[const.HOST_LIST])
 
+    def build_hosts(self, hosts_data):
+        """Return the host of each instance."""
+        return dict(host_list=[dict(instance_id=host[const.INSTANCE_ID],
+                                    host_name=host[const.HOST_NAME])
+                               for host in hosts_data[const.HOST_LIST]])
+
     def build_vif(self, vif_data):
         """Return VIF description."""
         return dict(vif_desc=vif_data[const.VIF_DESC])
@@ -17,6 +17,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import imp
+import json
 import logging
 import os
 import routes
@@ -32,6 +33,10 @@ from quantum import wsgi
 
 LOG = logging.getLogger('quantum.extensions.extensions')
 
+# Optional methods of the extensions, recorded in the extension manifest
+EXTENSION_HOOKS = ('get_resources', 'get_actions', 'get_request_extensions',
+                   'get_plugin_interface')
+
 
 class PluginInterface(object):
     __metaclass__ = ABCMeta
@@ -220,7 +225,8 @@ class ExtensionMiddleware(wsgi.Middleware):
 
         self.ext_mgr = (ext_mgr
                         or ExtensionManager(
-                        get_extensions_path(config_params)))
+                        get_extensions_path(config_params),
+                        get_extensions_manifest(config_params)))
         mapper = routes.Mapper()
 
         # extended resources
@@ -338,8 +344,9 @@ def plugin_aware_extension_middleware_factory(global_config, **local_config):
     """Paste factory."""
     def _factory(app):
         extensions_path = get_extensions_path(global_config)
-        ext_mgr = PluginAwareExtensionManager(extensions_path,
-                                              QuantumManager.get_plugin())
+        ext_mgr = PluginAwareExtensionManager(
+            extensions_path, QuantumManager.get_plugin(),
+            get_extensions_manifest(global_config))
         return ExtensionMiddleware(app, global_config, ext_mgr=ext_mgr)
     return _factory
 
@@ -350,11 +357,18 @@ class ExtensionManager(object):
     See tests/unit/extensions/foxinsocks.py for an
     example extension implementation.
 
+    When a manifest file is given, the extensions found are recorded in it
+    and, as long as the extension files are unchanged, the next managers
+    load the extensions from the manifest and only import their modules
+    when they are first used.
+
     """
-    def __init__(self, path):
+    def __init__(self, path, manifest=None):
         LOG.info(_('Initializing extension manager.'))
         self.path = path
+        self.manifest = manifest
         self.extensions = {}
+        self._manifest_entries = []
         self._load_all_extensions()
 
     def get_resources(self):
@@ -420,11 +434,84 @@ class ExtensionManager(object):
         extension implementation.
 
         """
+        if self.manifest:
+            files = self._extension_files()
+            entries = self._read_manifest(files)
+            if entries is not None:
+                for entry in entries:
+                    try:
+                        self.add_extension(LazyExtension(entry))
+                    except Exception as exception:
+                        LOG.warn("extension file %s wasnt loaded due to %s",
+                                 entry['file'], exception)
+                return
         for path in self.path.split(':'):
             if os.path.exists(path):
                 self._load_all_extensions_from_path(path)
             else:
                 LOG.error("Extension path \"%s\" doesn't exist!" % path)
+        if self.manifest:
+            self._write_manifest(files)
+
+    def _extension_files(self):
+        """Returns the modification times of the extension files"""
+        files = {}
+        for path in self.path.split(':'):
+            if not os.path.exists(path):
+                continue
+            for f in os.listdir(path):
+                mod_name, file_ext = os.path.splitext(f)
+                if file_ext.lower() == '.py' and not mod_name.startswith('_'):
+                    ext_path = os.path.join(path, f)
+                    files[ext_path] = os.path.getmtime(ext_path)
+        return files
+
+    def _read_manifest(self, files):
+        """
+        Returns the extension entries of the manifest, or None if the
+        manifest is missing or doesn't match the extension files
+        """
+        try:
+            with open(self.manifest) as manifest:
+                content = json.load(manifest)
+        except (IOError, ValueError), e:
+            LOG.info(_('Unable to use extension manifest %s: %s'),
+                     self.manifest, e)
+            return None
+        if content.get('files') != files:
+            LOG.info(_('Extension manifest %s is out of date'),
+                     self.manifest)
+            return None
+        return content['extensions']
+
+    def _write_manifest(self, files):
+        content = {'files': files, 'extensions': self._manifest_entries}
+        tmp_path = "%s.%d" % (self.manifest, os.getpid())
+        try:
+            with open(tmp_path, 'w') as manifest:
+                json.dump(content, manifest, indent=2, sort_keys=True)
+            os.rename(tmp_path, self.manifest)
+        except (IOError, OSError), e:
+            LOG.warn(_('Unable to write extension manifest %s: %s'),
+                     self.manifest, e)
+
+    def _record_extension(self, ext, mod_name, ext_path):
+        """Records the description of an extension for the manifest"""
+        try:
+            entry = {'module': mod_name,
+                     'file': ext_path,
+                     'class': ext.__class__.__name__,
+                     'name': ext.get_name(),
+                     'alias': ext.get_alias(),
+                     'description': ext.get_description(),
+                     'namespace': ext.get_namespace(),
+                     'updated': ext.get_updated(),
+                     'hooks': [hook for hook in EXTENSION_HOOKS
+                               if hasattr(ext, hook)]}
+        except AttributeError:
+            # Invalid extensions are rejected by _check_extension
+            return
+        self._manifest_entries.append(entry)
 
     def _load_all_extensions_from_path(self, path):
         for f in os.listdir(path):
@@ -443,6 +530,8 @@ class ExtensionManager(object):
                                   'file': ext_path})
                         continue
                     new_ext = new_ext_class()
+                    if self.manifest:
+                        self._record_extension(new_ext, mod_name, ext_path)
                     self.add_extension(new_ext)
             except Exception as exception:
                 LOG.warn("extension file %s wasnt loaded due to %s",
@@ -462,11 +551,51 @@ class ExtensionManager(object):
         self.extensions[alias] = ext
 
 
+class LazyExtension(object):
+    """Extension described by an entry of the extension manifest.
+
+    The description of the extension is read from the manifest entry, the
+    extension module is imported when one of its other methods is first
+    used.
+
+    """
+    def __init__(self, entry):
+        self.entry = entry
+        self._extension = None
+
+    def get_name(self):
+        return self.entry['name']
+
+    def get_alias(self):
+        return self.entry['alias']
+
+    def get_description(self):
+        return self.entry['description']
+
+    def get_namespace(self):
+        return self.entry['namespace']
+
+    def get_updated(self):
+        return self.entry['updated']
+
+    def _load(self):
+        if self._extension is None:
+            LOG.info(_('Loading extension file: %s'), self.entry['file'])
+            mod = imp.load_source(self.entry['module'], self.entry['file'])
+            self._extension = getattr(mod, self.entry['class'])()
+        return self._extension
+
+    def __getattr__(self, name):
+        if name in EXTENSION_HOOKS and name not in self.entry['hooks']:
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+
 class PluginAwareExtensionManager(ExtensionManager):
 
-    def __init__(self, path, plugin):
+    def __init__(self, path, plugin, manifest=None):
         self.plugin = plugin
-        super(PluginAwareExtensionManager, self).__init__(path)
+        super(PluginAwareExtensionManager, self).__init__(path, manifest)
 
     def _check_extension(self, extension):
         """Checks if plugin supports extension and implements the
@@ -543,3 +672,8 @@ def get_extensions_path(config=None):
         paths = ':'.join([config.get('api_extensions_path', ''), paths])
 
     return paths
+
+
+def get_extensions_manifest(config=None):
+    """Returns the path of the extension manifest, if configured"""
+    return config and config.get('api_extensions_manifest') or None
@@ -64,6 +64,7 @@ class Novatenant(object):
         parent_resource = dict(member_name="tenant",
                                collection_name="extensions/csco/tenants")
         member_actions = {'schedule_host': "PUT",
+                          'schedule_hosts': "PUT",
                           'associate_port': "PUT",
                           'detach_port': "PUT"}
         controller = NovatenantsController(QuantumManager.get_plugin())
@@ -86,11 +87,17 @@ class NovatenantsController(common.QuantumController):
         'param-name': 'instance_desc',
         'required': True}]
 
+    _schedule_hosts_ops_param_list = [{
+        'param-name': 'instances',
+        'required': True}]
+
     _serialization_metadata = {
         "application/xml": {
             "attributes": {
                 "novatenant": ["id", "name"],
+                "host": ["instance_id", "host_name"],
             },
+            "plurals": {"host_list": "host"},
         },
     }
 
@@ -137,6 +144,36 @@ class NovatenantsController(common.QuantumController):
         except qexception.PortNotFound as exp:
             return faults.Fault(faults.PortNotFound(exp))
 
+    def schedule_hosts(self, request, tenant_id, id):
+        """
+        Returns the hosts of a list of instances, each with an instance_id
+        and an instance_desc, in one call
+        """
+        try:
+            req_params = \
+                self._parse_request_params(request,
+                                           self._schedule_hosts_ops_param_list)
+            instances = req_params['instances']
+            if not isinstance(instances, list) or \
+               not all(isinstance(instance, dict) and
+                       'instance_id' in instance and
+                       isinstance(instance.get('instance_desc'), dict) and
+                       'project_id' in instance['instance_desc']
+                       for instance in instances):
+                msg = ("Failed to parse request. Each instance requires "
+                       "an instance_id and an instance_desc with a "
+                       "project_id")
+                raise exc.HTTPBadRequest(msg)
+        except exc.HTTPError as exp:
+            return faults.Fault(exp)
+        try:
+            hosts = self._plugin.schedule_hosts(tenant_id, instances)
+            builder = novatenant_view.get_view_builder(request)
+            result = builder.build_hosts(hosts)
+            return result
+        except qexception.PortNotFound as exp:
+            return faults.Fault(faults.PortNotFound(exp))
+
     def associate_port(self, request, tenant_id, id):
         content_type = request.best_match_content_type()
         try:
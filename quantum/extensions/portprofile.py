@@ -108,8 +108,21 @@ class PortprofilesController(common.QuantumController):
         return self._items(request, tenant_id, is_detail=False)
 
     def _items(self, request, tenant_id, is_detail):
-        """ Returns a list of portprofiles. """
-        portprofiles = self._plugin.get_all_portprofiles(tenant_id)
+        """ Returns a list of portprofiles.
+
+        The list is paginated with the limit and marker (id of the last
+        portprofile of the previous page) query parameters.
+        """
+        try:
+            limit = int(request.GET.get('limit', 0))
+            if limit < 0:
+                raise ValueError()
+        except ValueError:
+            return faults.Fault(exc.HTTPBadRequest(
+                explanation="limit must be a positive integer"))
+        portprofiles = self._plugin.get_all_portprofiles(
+            tenant_id, limit=limit or None,
+            marker=request.GET.get('marker'))
         builder = pprofiles_view.get_view_builder(request)
         result = [builder.build(portprofile, is_detail)['portprofile']
                   for portprofile in portprofiles]
@@ -23,9 +23,14 @@ instantiating the correct plugin that concretely implement quantum_plugin_base
 class.
 The caller should make sure that QuantumManager is a singleton.
 """
+import ConfigParser
 import gettext
+import inspect
 import logging
 import os
+import time
+
+import eventlet
 
 gettext.install('quantum', unicode=1)
 
@@ -46,6 +51,71 @@ def find_config(basepath):
     return None
 
 
+def lazy_init_from_config(config_file):
+    """Returns the lazy_init option of the [PLUGIN] section"""
+    if not config_file:
+        return False
+    parser = ConfigParser.ConfigParser()
+    parser.read(config_file)
+    try:
+        return parser.getboolean("PLUGIN", "lazy_init")
+    except (ConfigParser.Error, ValueError):
+        return False
+
+
+class DeferredPlugin(object):
+    """
+    Plugin instantiated in a green thread, so that the expensive plugin
+    initializations (like building the UCS inventory) don't delay the
+    startup of the API server.
+
+    The data attributes of the plugin class, like
+    supported_extension_aliases, are returned right away, the other
+    attributes wait for the plugin to be initialized.
+    """
+
+    def __init__(self, plugin_klass):
+        self._plugin_klass = plugin_klass
+        self._plugin = None
+        self.failed = False
+        self._thread = eventlet.spawn(self._initialize)
+
+    @property
+    def __class__(self):
+        # isinstance() checks against the plugin interfaces
+        return self._plugin_klass
+
+    def _initialize(self):
+        start = time.time()
+        try:
+            plugin = self._plugin_klass()
+        except Exception:
+            LOG.exception("Unable to initialize plugin %s" %
+                          self._plugin_klass.__name__)
+            self.failed = True
+            raise
+        LOG.info("Plugin %s initialized in %.3f seconds" %
+                 (self._plugin_klass.__name__, time.time() - start))
+        self._plugin = plugin
+        return plugin
+
+    def ready(self):
+        return self._plugin is not None
+
+    def wait(self):
+        """Returns the plugin once initialized"""
+        return self._thread.wait()
+
+    def __getattr__(self, name):
+        if self._plugin is not None:
+            return getattr(self._plugin, name)
+        attr = getattr(self._plugin_klass, name, None)
+        if (attr is not None and not callable(attr) and
+            not inspect.isdatadescriptor(attr)):
+            return attr
+        return getattr(self.wait(), name)
+
+
 class QuantumManager(object):
 
     _instance = None
@@ -79,10 +149,25 @@ class QuantumManager(object):
         else:
             LOG.debug("Successfully imported Quantum plug-in." \
                       "All compatibility tests passed")
-        self.plugin = plugin_klass()
+        if (options.get('lazy_plugin_init') or
+            lazy_init_from_config(self.configuration_file)):
+            LOG.debug("Initializing the plug-in in the background")
+            self.plugin = DeferredPlugin(plugin_klass)
+        else:
+            self.plugin = plugin_klass()
 
     @classmethod
     def get_plugin(cls, options=None, config_file=None):
         if cls._instance is None:
             cls._instance = cls(options, config_file)
         return cls._instance.plugin
+
+    @classmethod
+    def plugin_status(cls):
+        """Returns 'ready', 'initializing', 'failed' or 'not loaded'"""
+        if cls._instance is None:
+            return 'not loaded'
+        plugin = cls._instance.plugin
+        if not isinstance(plugin, DeferredPlugin) or plugin.ready():
+            return 'ready'
+        return plugin.failed and 'failed' or 'initializing'
@@ -0,0 +1,282 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+In-process metrics: counters, gauges and latency histograms with fixed
+buckets, kept in a registry. The registry is exported as JSON by
+MetricsApp and sent to a statsd daemon by StatsdEmitter. The registry
+also keeps the time of the last success and failure of the components
+(DB, plugin, devices), reported by the health checks.
+
+This module only depends on the standard library and webob, so that the
+agents can use it.
+"""
+
+from bisect import bisect_left
+import contextlib
+import functools
+import json
+import logging
+import socket
+import threading
+import time
+
+import webob
+import webob.dec
+
+
+LOG = logging.getLogger('quantum.metrics')
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000,
+                   10000)
+
+
+class Counter(object):
+    """Monotonic count of events"""
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, count=1):
+        self.value += count
+
+
+class Gauge(object):
+    """Last value of a measurement"""
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram(object):
+    """
+    Distribution of latencies in fixed buckets, the last bucket holds the
+    values above the highest bound
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def observe_since(self, start):
+        """Observes the milliseconds elapsed since start"""
+        self.observe((time.time() - start) * 1000)
+
+    def to_dict(self):
+        buckets = dict(zip(["%g" % bound for bound in self.bounds],
+                           self.buckets))
+        buckets["inf"] = self.buckets[-1]
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class Registry(object):
+    """Metrics by name, created on first use"""
+
+    def __init__(self):
+        self._metrics = {Counter: {}, Gauge: {}, Histogram: {}}
+        self._outcomes = {}
+
+    def _get(self, kind, name):
+        metrics = self._metrics[kind]
+        try:
+            return metrics[name]
+        except KeyError:
+            return metrics.setdefault(name, kind())
+
+    def counter(self, name):
+        return self._get(Counter, name)
+
+    def gauge(self, name):
+        return self._get(Gauge, name)
+
+    def histogram(self, name):
+        return self._get(Histogram, name)
+
+    def mark(self, name, success=True):
+        """Records the time of the last success or failure of name"""
+        key = success and 'last_success' or 'last_failure'
+        self._outcomes.setdefault(name, {})[key] = time.time()
+
+    def outcomes(self):
+        return dict([(name, outcome.copy()) for name, outcome in
+                     self._outcomes.items()])
+
+    def snapshot(self):
+        # items() copies the metrics atomically, the statsd emitter takes
+        # snapshots from a thread while requests add new metrics
+        return {
+            'counters': dict([(name, counter.value) for name, counter in
+                              self._metrics[Counter].items()]),
+            'gauges': dict([(name, gauge.value) for name, gauge in
+                            self._metrics[Gauge].items()]),
+            'histograms': dict([(name, histogram.to_dict())
+                                for name, histogram in
+                                self._metrics[Histogram].items()]),
+            'outcomes': self.outcomes()}
+
+    def reset(self):
+        for metrics in self._metrics.values():
+            metrics.clear()
+        self._outcomes.clear()
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+mark = REGISTRY.mark
+
+
+@contextlib.contextmanager
+def timer(name):
+    """
+    Observes the latency of the enclosed block in the <name>.latency
+    histogram, counts the failures in the <name>.errors counter and marks
+    the outcome of name
+    """
+    start = time.time()
+    try:
+        yield
+    except:
+        counter(name + ".errors").inc()
+        mark(name, False)
+        raise
+    else:
+        mark(name)
+    finally:
+        histogram(name + ".latency").observe_since(start)
+
+
+def timed(name):
+    """Decorator timing the calls of a function, see timer()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class StatsdEmitter(object):
+    """
+    Sends the metrics of a registry to a statsd daemon over UDP: the
+    counters and the histogram counts and sums as the increments since the
+    previous flush, and the gauges as their values.
+    """
+
+    MAX_PACKET_SIZE = 512
+
+    def __init__(self, host, port, interval=10, prefix="quantum",
+                 registry=REGISTRY):
+        self.address = (host, int(port))
+        self.interval = float(interval)
+        self.prefix = prefix
+        self.registry = registry
+        self._sent = {}
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _increment(self, name, value):
+        delta = value - self._sent.get(name, 0)
+        self._sent[name] = value
+        return delta
+
+    def _lines(self):
+        snapshot = self.registry.snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].iteritems()):
+            delta = self._increment(name, value)
+            if delta:
+                lines.append("%s.%s:%d|c" % (self.prefix, name, delta))
+        for name, value in sorted(snapshot['gauges'].iteritems()):
+            lines.append("%s.%s:%s|g" % (self.prefix, name, value))
+        for name, value in sorted(snapshot['histograms'].iteritems()):
+            delta = self._increment(name + ".count", value['count'])
+            if delta:
+                lines.append("%s.%s.count:%d|c" % (self.prefix, name, delta))
+                lines.append("%s.%s.sum:%d|c" %
+                             (self.prefix, name,
+                              self._increment(name + ".sum", value['sum'])))
+        return lines
+
+    def flush(self):
+        """Sends the metrics, batched in packets of MAX_PACKET_SIZE"""
+        packet = ""
+        for line in self._lines():
+            if packet and len(packet) + len(line) + 1 > self.MAX_PACKET_SIZE:
+                self._send(packet)
+                packet = ""
+            packet = packet and "%s\n%s" % (packet, line) or line
+        if packet:
+            self._send(packet)
+
+    def _send(self, packet):
+        try:
+            self._socket.sendto(packet, self.address)
+        except socket.error, e:
+            LOG.debug("Unable to send metrics to %s:%s: %s" %
+                      (self.address + (e,)))
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                LOG.exception("Unable to flush the metrics to %s:%s" %
+                              self.address)
+
+    def start(self):
+        """Flushes the metrics every interval seconds in a thread"""
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+
+class MetricsApp(object):
+    """WSGI app returning the metrics of a registry as JSON"""
+
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+
+    @classmethod
+    def factory(cls, global_config, **local_config):
+        """Paste factory."""
+        return cls()
+
+    @webob.dec.wsgify
+    def __call__(self, req):
+        return webob.Response(body=json.dumps(self.registry.snapshot()),
+                              content_type="application/json")
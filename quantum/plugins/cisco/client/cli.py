@@ -47,9 +47,8 @@ if os.path.exists(os.path.join(POSSIBLE_TOPDIR, 'quantum', '__init__.py')):
 
 gettext.install('quantum', unicode=1)
 
-from quantum.client import Client
-
 from quantum.plugins.cisco.common import cisco_constants as const
+from quantum.plugins.cisco.common.cisco_client import PooledClient
 
 LOG = logging.getLogger('quantum')
 FORMAT = 'json'
@@ -94,8 +93,8 @@ def build_args(cmd, cmdargs, arglist):
 def list_extensions(*args):
     """Invoking the action to get the supported extensions"""
     request_url = "/extensions"
-    client = Client(HOST, PORT, USE_SSL, format='json',
-                    action_prefix=ACTION_PREFIX_EXT, tenant="dummy")
+    client = PooledClient(HOST, PORT, USE_SSL, format='json',
+                          action_prefix=ACTION_PREFIX_EXT, tenant="dummy")
     data = client.do_request('GET', request_url)
     print("Obtained supported extensions from Quantum: %s" % data)
 
@@ -112,8 +111,8 @@ def schedule_host(tenant_id, instance_id, user_id=None):
                'project_id': project_id}}}
 
     request_url = "/novatenants/" + project_id + "/schedule_host"
-    client = Client(HOST, PORT, USE_SSL, format='json', tenant=TENANT_ID,
-                    action_prefix=ACTION_PREFIX_CSCO)
+    client = PooledClient(HOST, PORT, USE_SSL, format='json',
+                          tenant=TENANT_ID, action_prefix=ACTION_PREFIX_CSCO)
     data = client.do_request('PUT', request_url, body=instance_data_dict)
 
     hostname = data["host_list"]["host_1"]
@@ -134,8 +133,8 @@ def create_multiport(tenant_id, net_id_list, *args):
                    'ports_desc': {'key': 'value'}}}
 
     request_url = "/multiport"
-    client = Client(HOST, PORT, USE_SSL, format='json', tenant=tenant_id,
-                    action_prefix=ACTION_PREFIX_CSCO)
+    client = PooledClient(HOST, PORT, USE_SSL, format='json',
+                          tenant=tenant_id, action_prefix=ACTION_PREFIX_CSCO)
     data = client.do_request('POST', request_url, body=ports_info)
 
     print("Created ports: %s" % data)
@@ -0,0 +1,224 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2012 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+"""
+Quantum client sharing a pool of keep-alive HTTP connections per server,
+used by the Nova VIF driver and scheduler, the service insertion and the
+Cisco CLI instead of opening a connection for every request.
+
+The pool only uses the standard library, its locks and sleeps become
+green when eventlet monkey patches the process, as nova does.
+"""
+
+import httplib
+import logging
+import Queue
+import socket
+import threading
+import time
+
+from quantum.client import Client
+
+
+LOG = logging.getLogger(__name__)
+
+POOL_SIZE = 10
+TIMEOUT = 30
+RETRIES = 3
+BACKOFF = 0.5
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PooledResponse(object):
+    """
+    Response read in full, so that its connection can go back to the pool
+    before the caller reads it
+    """
+
+    def __init__(self, response):
+        self.status = response.status
+        self.reason = response.reason
+        self._headers = response.getheaders()
+        self._body = response.read()
+
+    def read(self, amt=None):
+        if amt is None:
+            body, self._body = self._body, ""
+        else:
+            body, self._body = self._body[:amt], self._body[amt:]
+        return body
+
+    def getheader(self, name, default=None):
+        for header, value in self._headers:
+            if header.lower() == name.lower():
+                return value
+        return default
+
+    def getheaders(self):
+        return self._headers
+
+
+class PooledConnection(object):
+    """
+    httplib connection lookalike handed to the Quantum client, the request
+    is sent by the pool when the response is asked for
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._request = None
+
+    def request(self, method, url, body=None, headers={}):
+        self._request = (method, url, body, headers)
+
+    def getresponse(self):
+        return self._pool.send(*self._request)
+
+    def close(self):
+        pass
+
+
+class ConnectionPool(object):
+    """
+    Keep-alive connections to one Quantum server. At most size connections
+    are open at a time, the callers wait for a free one beyond that. A
+    request failing on an idle connection, which the server may have
+    closed, is sent again right away on a new one. Failures to connect are
+    retried after backoff, 2 * backoff, ... seconds, up to retries times.
+    A request which failed or timed out once sent on a new connection is
+    not retried, since the server may have handled it and requests like
+    schedule_hosts are not idempotent.
+    """
+
+    def __init__(self, host, port, use_ssl=False, size=POOL_SIZE,
+                 timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF,
+                 key_file=None, cert_file=None):
+        self.host = host
+        self.port = int(port)
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._certs = dict([(name, value) for name, value in
+                            (('key_file', key_file),
+                             ('cert_file', cert_file)) if value])
+        self._idle = Queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def connection(self, *args, **kwargs):
+        """Connection class for the Quantum client"""
+        return PooledConnection(self)
+
+    def _new_connection(self):
+        if self.use_ssl:
+            return httplib.HTTPSConnection(self.host, self.port,
+                                           timeout=self.timeout,
+                                           **self._certs)
+        return httplib.HTTPConnection(self.host, self.port,
+                                      timeout=self.timeout)
+
+    def _get(self, reuse=True):
+        """Returns a connection and whether it was idle in the pool"""
+        self._slots.acquire()
+        if reuse:
+            try:
+                return self._idle.get_nowait(), True
+            except Queue.Empty:
+                pass
+        return self._new_connection(), False
+
+    def _put(self, conn):
+        if conn is not None:
+            self._idle.put(conn)
+        self._slots.release()
+
+    def send(self, method, url, body=None, headers={}):
+        """Sends a request and returns its response"""
+        attempt = 0
+        reuse = True
+        while True:
+            conn, reused = self._get(reuse)
+            if not reused:
+                try:
+                    conn.connect()
+                except socket.error, e:
+                    conn.close()
+                    self._put(None)
+                    if attempt >= self.retries:
+                        raise
+                    delay = self.backoff * 2 ** attempt
+                    attempt += 1
+                    LOG.debug("Connecting to %s:%s failed: %s, retrying "
+                              "%s %s in %ss" % (self.host, self.port, e,
+                                                method, url, delay))
+                    time.sleep(delay)
+                    continue
+            try:
+                conn.request(method, url, body, headers)
+                response = PooledResponse(conn.getresponse())
+            except socket.timeout:
+                conn.close()
+                self._put(None)
+                raise
+            except (httplib.HTTPException, socket.error):
+                conn.close()
+                self._put(None)
+                if reused:
+                    reuse = False
+                    continue
+                raise
+            if response.getheader('connection', '').lower() == 'close':
+                conn.close()
+            self._put(conn)
+            return response
+
+    def close(self):
+        """Closes the idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Queue.Empty:
+                return
+
+
+def get_pool(host, port, use_ssl=False, **kwargs):
+    """
+    Returns the connection pool of a server, created with kwargs on first
+    use, see ConnectionPool
+    """
+    key = (host, int(port), bool(use_ssl))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(host, port, use_ssl, **kwargs)
+        return _pools[key]
+
+
+class PooledClient(Client):
+    """Quantum client sending its requests over the shared pool"""
+
+    def __init__(self, host="127.0.0.1", port=9696, use_ssl=False,
+                 pool_size=POOL_SIZE, timeout=TIMEOUT, retries=RETRIES,
+                 **kwargs):
+        Client.__init__(self, host, port, use_ssl, **kwargs)
+        self._pool = get_pool(host, port, use_ssl, size=pool_size,
+                              timeout=timeout, retries=retries,
+                              key_file=kwargs.get('key_file'),
+                              cert_file=kwargs.get('cert_file'))
+
+    def get_connection_type(self):
+        return self._pool.connection
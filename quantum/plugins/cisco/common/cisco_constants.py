@@ -33,6 +33,7 @@ NETWORKNAME = 'name'
 NETWORKPORTS = 'ports'
 INTERFACEID = 'interface_id'
 PORTSTATE = 'state'
+OPSTATUS = 'op_status'
 PORTID = 'port_id'
 PPNAME = 'name'
 PPVLANID = 'vlan_id'
@@ -46,12 +47,14 @@ QOS = 'qos'
 
 ATTACHMENT = 'attachment'
 PORT_ID = 'port-id'
+PORT_OP_STATUS = 'port-op-status'
 
 NET_ID = 'net-id'
 NET_NAME = 'net-name'
 NET_PORTS = 'net-ports'
 NET_VLAN_NAME = 'net-vlan-name'
 NET_VLAN_ID = 'net-vlan-id'
+NET_OP_STATUS = 'net-op-status'
 NET_TENANTS = 'net-tenants'
 
 TENANT_ID = 'tenant-id'
@@ -140,6 +143,8 @@ BLADE_ID = 'blade_id'
 HOST_NAME = 'host_name'
 
 INSTANCE_ID = 'instance_id'
+INSTANCE_DESC = 'instance_desc'
+INSTANCES = 'instances'
 VIF_ID = 'vif_id'
 PROJECT_ID = 'project_id'
 
@@ -163,3 +168,21 @@ ASSOCIATION_STATUS = 'association_status'
 ATTACHED = 'attached'
 
 DETACHED = 'detached'
+
+TASK_PENDING = 'PENDING'
+
+TASK_RUNNING = 'RUNNING'
+
+TASK_FAILED = 'FAILED'
+
+PROVISIONING_QUEUE_DEPTH = 'queue_depth'
+
+PROVISIONING_RUNNING = 'running'
+
+PROVISIONING_COMPLETED = 'completed'
+
+PROVISIONING_FAILED = 'failed'
+
+PROVISIONING_AVG_LATENCY = 'avg_latency'
+
+PROVISIONING_MAX_LATENCY = 'max_latency'
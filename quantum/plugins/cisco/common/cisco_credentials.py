@@ -40,7 +40,11 @@ _creds_dictionary = cp.walk(cp.dummy)
 
 
 class Store(object):
-    """Credential Store"""
+    """
+    Credential Store, caches the credentials of the network admin in
+    memory and writes them through to the database
+    """
+    _credentials = {}
 
     @staticmethod
     def initialize():
@@ -54,32 +58,56 @@ class Store(object):
                 # if this class module is loaded more than once, in which
                 # case, the credentials are already populated
                 pass
+        Store._credentials.clear()
+        for credential in cdb.get_all_credentials(TENANT):
+            Store.cacheCredential(credential)
+
+    @staticmethod
+    def cacheCredential(credential):
+        """Update the cache from a credential database entry"""
+        if credential[const.TENANTID] != TENANT:
+            return
+        Store._credentials[credential[const.CREDENTIAL_NAME]] = {
+            const.USERNAME: credential[const.CREDENTIAL_USERNAME],
+            const.PASSWORD: credential[const.CREDENTIAL_PASSWORD]}
+
+    @staticmethod
+    def uncacheCredential(credential):
+        """Remove a credential database entry from the cache"""
+        if not credential or credential[const.TENANTID] != TENANT:
+            return
+        Store._credentials.pop(credential[const.CREDENTIAL_NAME], None)
 
     @staticmethod
     def putCredential(cred_name, username, password):
         """Set the username and password"""
         credential = cdb.add_credential(TENANT, cred_name, username, password)
+        Store.cacheCredential(credential)
 
     @staticmethod
     def getUsername(cred_name):
         """Get the username"""
-        credential = cdb.get_credential_name(TENANT, cred_name)
-        return credential[const.CREDENTIAL_USERNAME]
+        return Store.getCredential(cred_name)[const.USERNAME]
 
     @staticmethod
     def getPassword(cred_name):
         """Get the password"""
-        credential = cdb.get_credential_name(TENANT, cred_name)
-        return credential[const.CREDENTIAL_PASSWORD]
+        return Store.getCredential(cred_name)[const.PASSWORD]
 
     @staticmethod
     def getCredential(cred_name):
         """Get the username and password"""
-        credential = cdb.get_credential_name(TENANT, cred_name)
-        return {const.USERNAME: const.CREDENTIAL_USERNAME,
-                const.PASSWORD: const.CREDENTIAL_PASSWORD}
+        try:
+            return Store._credentials[cred_name]
+        except KeyError:
+            # Added by another server sharing the database
+            credential = cdb.get_credential_name(TENANT, cred_name)
+            Store.cacheCredential(credential)
+            return Store._credentials[cred_name]
 
     @staticmethod
     def deleteCredential(cred_name):
         """Delete a credential"""
-        cdb.remove_credential(TENANT, cred_name)
+        Store._credentials.pop(cred_name, None)
+        credential = cdb.get_credential_name(TENANT, cred_name)
+        cdb.remove_credential(TENANT, credential[const.CREDENTIAL_ID])
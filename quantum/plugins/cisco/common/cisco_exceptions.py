@@ -95,6 +95,12 @@ class VlanIDNotAvailable(exceptions.QuantumException):
     message = _("No Vlan ID available")
 
 
+class SegmentationIDNotAvailable(exceptions.QuantumException):
+    """No segmentation ID available"""
+    message = _("No segmentation ID available in the range " \
+                "%(range_start)s-%(range_end)s")
+
+
 class QosNotFound(exceptions.QuantumException):
     """QoS level with this ID cannot be found"""
     message = _("QoS level %(qos_id)s could not be found " \
@@ -20,6 +20,7 @@
 """
 
 import hashlib
+import inspect
 import logging
 import MySQLdb
 import traceback
@@ -39,26 +40,45 @@ def get16ByteUUID(uuid):
     return hashlib.md5(uuid).hexdigest()[:16]
 
 
-def make_net_dict(net_id, net_name, ports):
+def make_dispatch_table(obj):
+    """
+    Returns a dictionary of the public methods of an object, mapping their
+    name to a (bound method, number of arguments) tuple, so that calls can
+    be dispatched without introspecting the object each time
+    """
+    table = {}
+    for name, method in inspect.getmembers(obj, inspect.ismethod):
+        if name.startswith('_'):
+            continue
+        table[name] = (method, len(inspect.getargspec(method).args))
+    return table
+
+
+def make_net_dict(net_id, net_name, ports, op_status=None):
     """Helper funciton"""
     res = {const.NET_ID: net_id, const.NET_NAME: net_name}
     res[const.NET_PORTS] = ports
+    if op_status:
+        res[const.NET_OP_STATUS] = op_status
     return res
 
 
-def make_port_dict(port_id, port_state, net_id, attachment):
+def make_port_dict(port_id, port_state, net_id, attachment, op_status=None):
     """Helper funciton"""
     res = {const.PORT_ID: port_id, const.PORT_STATE: port_state}
     res[const.NET_ID] = net_id
     res[const.ATTACHMENT] = attachment
+    if op_status:
+        res[const.PORT_OP_STATUS] = op_status
     return res
 
 
 def make_portprofile_dict(tenant_id, profile_id, profile_name,
-                           qos):
+                           qos, profile_associations=None):
     """Helper funciton"""
-    profile_associations = make_portprofile_assc_list(tenant_id,
-                                                      profile_id)
+    if profile_associations is None:
+        profile_associations = make_portprofile_assc_list(tenant_id,
+                                                          profile_id)
     res = {const.PROFILE_ID: str(profile_id),
            const.PROFILE_NAME: profile_name,
            const.PROFILE_ASSOCIATIONS: profile_associations,
@@ -75,3 +95,44 @@ def make_portprofile_assc_list(tenant_id, profile_id):
         assc_list.append(port[const.PORTID])
 
     return assc_list
+
+
+def make_vlan_ranges(vlan_ids):
+    """
+    Compress a collection of VLAN IDs into the range syntax understood by
+    the switches, e.g. [10, 11, 12, 305] -> '10-12,305'
+    """
+    ranges = []
+    start = end = None
+    for vlan_id in sorted(set([int(vid) for vid in vlan_ids])):
+        if start is None:
+            start = end = vlan_id
+        elif vlan_id == end + 1:
+            end = vlan_id
+        else:
+            ranges.append((start, end))
+            start = end = vlan_id
+    if start is not None:
+        ranges.append((start, end))
+    return ','.join([str(first) if first == last else '%d-%d' % (first, last)
+                     for first, last in ranges])
+
+
+def parse_vlan_ranges(vlan_ranges):
+    """
+    Expand the range syntax used by the switches into a set of VLAN IDs,
+    e.g. '10-12,305' -> set([10, 11, 12, 305])
+    """
+    vlan_ids = set()
+    if not vlan_ranges or vlan_ranges.strip() == 'none':
+        return vlan_ids
+    for vlan_range in vlan_ranges.split(','):
+        vlan_range = vlan_range.strip()
+        if not vlan_range:
+            continue
+        if '-' in vlan_range:
+            first, last = vlan_range.split('-', 1)
+            vlan_ids.update(range(int(first), int(last) + 1))
+        else:
+            vlan_ids.add(int(vlan_range))
+    return vlan_ids
@@ -17,10 +17,12 @@
 # @author: Brad Hall, Nicira Networks, Inc.
 # @author: Dan Wendlandt, Nicira Networks, Inc.
 
-from sqlalchemy import create_engine
+from sqlalchemy import and_, create_engine, select
 from sqlalchemy.orm import sessionmaker, exc, joinedload
 
+from quantum.api.api_common import OperationalStatus
 from quantum.common import exceptions as q_exc
+from quantum.db import api as core_db
 from quantum.plugins.cisco.db import models
 
 _ENGINE = None
@@ -41,6 +43,7 @@ def configure_db(options):
                                 echo=False,
                                 echo_pool=True,
                                 pool_recycle=3600)
+        core_db.register_engine("cisco", _ENGINE)
         register_models()
 
 
@@ -76,11 +79,11 @@ def unregister_models():
     BASE.metadata.drop_all(_ENGINE)
 
 
-def network_create(tenant_id, name):
+def network_create(tenant_id, name, op_status=OperationalStatus.UNKNOWN):
     session = get_session()
 
     with session.begin():
-        net = models.Network(tenant_id, name)
+        net = models.Network(tenant_id, name, op_status)
         session.add(net)
         session.flush()
         return net
@@ -105,6 +108,28 @@ def network_id(net_name):
         raise q_exc.NetworkNotFound(net_name=net_name)
 
 
+def _select_rows(row_class, whereclause):
+    """Reads the rows matching whereclause with a column-only select"""
+    session = get_session()
+    result = session.execute(select(row_class.table.columns, whereclause))
+    return [row_class._make(row) for row in result]
+
+
+def network_list_rows(tenant_id):
+    """Returns the networks of a tenant as NetworkRow tuples"""
+    table = models.NetworkRow.table
+    return _select_rows(models.NetworkRow, table.c.tenant_id == tenant_id)
+
+
+def network_get_row(net_id):
+    """Returns a network as a NetworkRow tuple"""
+    table = models.NetworkRow.table
+    rows = _select_rows(models.NetworkRow, table.c.uuid == net_id)
+    if not rows:
+        raise q_exc.NetworkNotFound(net_id=net_id)
+    return rows[0]
+
+
 def network_get(net_id):
     session = get_session()
     try:
@@ -139,19 +164,40 @@ def network_destroy(net_id):
         raise q_exc.NetworkNotFound(net_id=net_id)
 
 
-def port_create(net_id, state=None):
+def port_create(net_id, state=None, op_status=OperationalStatus.UNKNOWN):
     # confirm network exists
     network_get(net_id)
 
     session = get_session()
     with session.begin():
-        port = models.Port(net_id)
+        port = models.Port(net_id, op_status)
         port['state'] = state or 'DOWN'
         session.add(port)
         session.flush()
         return port
 
 
+def ports_create(net_ids, state=None, op_status=OperationalStatus.UNKNOWN):
+    """Creates a port on each network of net_ids in one transaction"""
+    session = get_session()
+    with session.begin():
+        # confirm the networks exist
+        found = set([net.uuid for net in
+                     session.query(models.Network.uuid).\
+                       filter(models.Network.uuid.in_(set(net_ids)))])
+        for net_id in net_ids:
+            if net_id not in found:
+                raise q_exc.NetworkNotFound(net_id=net_id)
+        ports = []
+        for net_id in net_ids:
+            port = models.Port(net_id, op_status)
+            port['state'] = state or 'DOWN'
+            session.add(port)
+            ports.append(port)
+        session.flush()
+        return ports
+
+
 def port_list(net_id):
     session = get_session()
     return session.query(models.Port).\
@@ -160,6 +206,28 @@ def port_list(net_id):
       all()
 
 
+def port_list_rows(net_id):
+    """Returns the ports of a network as PortRow tuples"""
+    table = models.PortRow.table
+    rows = _select_rows(models.PortRow, table.c.network_id == net_id)
+    if not rows:
+        # confirm network exists
+        network_get_row(net_id)
+    return rows
+
+
+def port_get_row(net_id, port_id):
+    """Returns a port as a PortRow tuple"""
+    table = models.PortRow.table
+    rows = _select_rows(models.PortRow, and_(table.c.uuid == port_id,
+                                             table.c.network_id == net_id))
+    if not rows:
+        # confirm network exists
+        network_get_row(net_id)
+        raise q_exc.PortNotFound(net_id=net_id, port_id=port_id)
+    return rows[0]
+
+
 def port_get(net_id, port_id):
     # confirm network exists
     network_get(net_id)
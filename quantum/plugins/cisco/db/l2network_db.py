@@ -15,12 +15,19 @@
 #    under the License.
 # @author: Rohit Agarwalla, Cisco Systems, Inc.
 
-from sqlalchemy.orm import exc
+import datetime
+
+from sqlalchemy import and_, exc as sa_exc
+from sqlalchemy.orm import aliased, exc
 
 from quantum.common import exceptions as q_exc
+from quantum.db import vlan_allocator
 from quantum.plugins.cisco import l2network_plugin_configuration as conf
+from quantum.plugins.cisco.common import cisco_constants as const
 from quantum.plugins.cisco.common import cisco_exceptions as c_exc
 from quantum.plugins.cisco.db import l2network_models
+from quantum.plugins.cisco.db import models
+from quantum.plugins.cisco.db import ucs_models
 
 import logging as LOG
 import quantum.plugins.cisco.db.api as db
@@ -29,6 +36,9 @@ import quantum.plugins.cisco.db.ucs_db as udb
 import quantum.plugins.cisco.db.services_db as sdb
 
 
+_VLAN_ALLOCATOR = None
+
+
 def initialize():
     'Establish database connection and load models'
     options = {"sql_connection": "mysql://%s:%s@%s/%s" % (conf.DB_USER,
@@ -37,23 +47,16 @@ def initialize():
 
 
 def create_vlanids():
-    """Prepopulates the vlan_bindings table"""
+    """Prepopulates the vlan_ids table and loads the VLAN allocator"""
     LOG.debug("create_vlanids() called")
-    session = db.get_session()
-    try:
-        vlanid = session.query(l2network_models.VlanID).\
-          one()
-    except exc.MultipleResultsFound:
-        pass
-    except exc.NoResultFound:
-        start = int(conf.VLAN_START)
-        end = int(conf.VLAN_END)
-        while start <= end:
-            vlanid = l2network_models.VlanID(start)
-            session.add(vlanid)
-            start += 1
-        session.flush()
-    return
+    global _VLAN_ALLOCATOR
+    start = int(conf.VLAN_START)
+    end = int(conf.VLAN_END)
+    if _VLAN_ALLOCATOR:
+        _VLAN_ALLOCATOR.set_range(start, end)
+    else:
+        _VLAN_ALLOCATOR = vlan_allocator.VlanAllocator(
+            l2network_models.VlanID, db.get_session, start, end)
 
 
 def get_all_vlanids():
@@ -84,18 +87,11 @@ def is_vlanid_used(vlan_id):
 def release_vlanid(vlan_id):
     """Sets the vlanid state to be unused"""
     LOG.debug("release_vlanid() called")
-    session = db.get_session()
-    try:
-        vlanid = session.query(l2network_models.VlanID).\
-         filter_by(vlan_id=vlan_id).\
-          one()
-        vlanid["vlan_used"] = False
-        session.merge(vlanid)
-        session.flush()
-        return vlanid["vlan_used"]
-    except exc.NoResultFound:
+    if not _VLAN_ALLOCATOR:
+        create_vlanids()
+    if not _VLAN_ALLOCATOR.release(vlan_id):
         raise c_exc.VlanIDNotFound(vlan_id=vlan_id)
-    return
+    return False
 
 
 def delete_vlanid(vlan_id):
@@ -116,22 +112,12 @@ def delete_vlanid(vlan_id):
 def reserve_vlanid():
     """Reserves the first unused vlanid"""
     LOG.debug("reserve_vlanid() called")
-    session = db.get_session()
-    try:
-        rvlan = session.query(l2network_models.VlanID).\
-         filter_by(vlan_used=False).\
-          first()
-        if not rvlan:
-            raise exc.NoResultFound
-        rvlanid = session.query(l2network_models.VlanID).\
-         filter_by(vlan_id=rvlan["vlan_id"]).\
-          one()
-        rvlanid["vlan_used"] = True
-        session.merge(rvlanid)
-        session.flush()
-        return rvlan["vlan_id"]
-    except exc.NoResultFound:
+    if not _VLAN_ALLOCATOR:
+        create_vlanids()
+    vlan_id = _VLAN_ALLOCATOR.reserve()
+    if vlan_id is None:
         raise c_exc.VlanIDNotAvailable()
+    return vlan_id
 
 
 def get_all_vlanids_used():
@@ -147,6 +133,46 @@ def get_all_vlanids_used():
         return []
 
 
+def get_segmentation_ids(start, end):
+    """Gets the reserved segmentation IDs from start to end"""
+    LOG.debug("get_segmentation_ids() called")
+    session = db.get_session()
+    segmentation_ids = session.query(
+        l2network_models.SegmentationID.segmentation_id).\
+      filter(l2network_models.SegmentationID.segmentation_id >= start).\
+      filter(l2network_models.SegmentationID.segmentation_id <= end).\
+      all()
+    return [segmentation_id for segmentation_id, in segmentation_ids]
+
+
+def reserve_segmentation_id(segmentation_id, tenant_id):
+    """Reserves a segmentation ID, returns False if it is already taken"""
+    LOG.debug("reserve_segmentation_id() called")
+    session = db.get_session()
+    segmentation = l2network_models.SegmentationID(segmentation_id, tenant_id)
+    session.add(segmentation)
+    try:
+        session.flush()
+    except sa_exc.IntegrityError:
+        return False
+    return True
+
+
+def release_segmentation_id(segmentation_id):
+    """Releases a segmentation ID"""
+    LOG.debug("release_segmentation_id() called")
+    session = db.get_session()
+    try:
+        segmentation = session.query(l2network_models.SegmentationID).\
+          filter_by(segmentation_id=segmentation_id).\
+          one()
+        session.delete(segmentation)
+        session.flush()
+        return segmentation
+    except exc.NoResultFound:
+        pass
+
+
 def get_all_vlan_bindings():
     """Lists all the vlan to network associations"""
     LOG.debug("get_all_vlan_bindings() called")
@@ -223,6 +249,40 @@ def update_vlan_binding(netid, newvlanid=None, newvlanname=None):
         raise q_exc.NetworkNotFound(net_id=netid)
 
 
+def remove_network_cascade(netid):
+    """
+    Removes a network with its ports, vlan binding, port bindings and
+    port profile bindings in one transaction
+    """
+    LOG.debug("remove_network_cascade() called")
+    session = db.get_session()
+    with session.begin():
+        try:
+            net = session.query(models.Network).\
+              filter_by(uuid=netid).\
+              one()
+        except exc.NoResultFound:
+            raise q_exc.NetworkNotFound(net_id=netid)
+        port_ids = session.query(models.Port.uuid).\
+          filter_by(network_id=netid).\
+          subquery()
+        for model in (l2network_models.PortProfileBinding,
+                      ucs_models.PortBinding):
+            session.query(model).\
+              filter(model.port_id.in_(port_ids)).\
+              delete(synchronize_session=False)
+        session.query(l2network_models.VlanBinding).\
+          filter_by(network_id=netid).\
+          delete(synchronize_session=False)
+        session.query(models.Port).\
+          filter_by(network_id=netid).\
+          delete(synchronize_session=False)
+        session.query(models.Network).\
+          filter_by(uuid=netid).\
+          delete(synchronize_session=False)
+        return net
+
+
 def get_all_portprofiles():
     """Lists all the port profiles"""
     LOG.debug("get_all_portprofiles() called")
@@ -235,6 +295,61 @@ def get_all_portprofiles():
         return []
 
 
+def _get_portprofiles_with_bindings(session, tenantid, pp_query):
+    """
+    Returns the port profiles of pp_query, each with the list of the ports
+    of the tenant associated to it, fetched in one outer-joined query
+    """
+    pp_alias = aliased(l2network_models.PortProfile, pp_query.subquery())
+    binding = l2network_models.PortProfileBinding
+    rows = session.query(pp_alias, binding.port_id).\
+      outerjoin(binding, and_(binding.portprofile_id == pp_alias.uuid,
+                              binding.tenant_id == tenantid)).\
+      order_by(pp_alias.uuid, binding.port_id).\
+      all()
+    pps = []
+    for pp, port_id in rows:
+        if not pps or pps[-1][0] is not pp:
+            pps.append((pp, []))
+        if port_id:
+            pps[-1][1].append(port_id)
+    return pps
+
+
+def get_portprofiles_with_bindings(tenantid, limit=None, marker=None):
+    """
+    Lists the port profiles ordered by uuid, as (portprofile, port ids)
+    pairs where the port ids are the ports of the tenant associated to the
+    profile. At most limit profiles are listed, starting after the profile
+    whose uuid is marker.
+    """
+    LOG.debug("get_portprofiles_with_bindings() called")
+    session = db.get_session()
+    pp_query = session.query(l2network_models.PortProfile)
+    if marker:
+        pp_query = pp_query.filter(l2network_models.PortProfile.uuid > marker)
+    if limit:
+        pp_query = pp_query.order_by(l2network_models.PortProfile.uuid).\
+          limit(limit)
+    return _get_portprofiles_with_bindings(session, tenantid, pp_query)
+
+
+def get_portprofile_with_bindings(tenantid, ppid):
+    """
+    Lists a port profile with the ports of the tenant associated to it, as
+    a (portprofile, port ids) pair
+    """
+    LOG.debug("get_portprofile_with_bindings() called")
+    session = db.get_session()
+    pp_query = session.query(l2network_models.PortProfile).\
+      filter_by(uuid=ppid)
+    pps = _get_portprofiles_with_bindings(session, tenantid, pp_query)
+    if not pps:
+        raise c_exc.PortProfileNotFound(tenant_id=tenantid,
+                                        portprofile_id=ppid)
+    return pps[0]
+
+
 def get_portprofile(tenantid, ppid):
     """Lists a port profile"""
     LOG.debug("get_portprofile() called")
@@ -557,3 +672,110 @@ def update_credential(tenant_id, credential_id,
     except exc.NoResultFound:
         raise c_exc.CredentialNotFound(credential_id=credential_id,
                                          tenant_id=tenant_id)
+
+
+def add_provisioning_task(tenant_id, network_id, port_id, function_name,
+                          args):
+    """Queues a device operation for asynchronous provisioning"""
+    LOG.debug("add_provisioning_task() called")
+    session = db.get_session()
+    task = l2network_models.ProvisioningTask(tenant_id, network_id, port_id,
+                                             function_name, args,
+                                             datetime.datetime.utcnow())
+    session.add(task)
+    session.flush()
+    return task
+
+
+def get_all_provisioning_tasks(network_id=None):
+    """Lists the queued device operations, optionally for a network"""
+    LOG.debug("get_all_provisioning_tasks() called")
+    session = db.get_session()
+    query = session.query(l2network_models.ProvisioningTask)
+    if network_id:
+        query = query.filter_by(network_id=network_id)
+    return query.order_by(l2network_models.ProvisioningTask.id).all()
+
+
+def get_provisioning_task_count(status, network_id=None):
+    """Counts the queued device operations in the given status"""
+    LOG.debug("get_provisioning_task_count() called")
+    session = db.get_session()
+    query = session.query(l2network_models.ProvisioningTask).\
+      filter_by(status=status)
+    if network_id:
+        query = query.filter_by(network_id=network_id)
+    return query.count()
+
+
+def claim_provisioning_task(owner, stale_before, limit=100):
+    """
+    Claims the oldest queued device operation which can be processed.
+    Operations on the same network are processed in order, a running
+    operation started before stale_before is considered abandoned and can
+    be claimed again.
+    """
+    LOG.debug("claim_provisioning_task() called")
+    session = db.get_session()
+    model = l2network_models.ProvisioningTask
+    tasks = session.query(model).\
+      filter(model.status.in_([const.TASK_PENDING, const.TASK_RUNNING])).\
+      order_by(model.id).\
+      limit(limit).\
+      all()
+    busy_networks = set()
+    for task in tasks:
+        if task.network_id in busy_networks:
+            continue
+        busy_networks.add(task.network_id)
+        if task.status == const.TASK_RUNNING and \
+           task.started_at > stale_before:
+            continue
+        started_at = datetime.datetime.utcnow()
+        claimed = session.query(model).\
+          filter_by(id=task.id).\
+          filter_by(status=task.status).\
+          filter_by(started_at=task.started_at).\
+          update({"status": const.TASK_RUNNING,
+                  "owner": owner,
+                  "started_at": started_at},
+                 synchronize_session=False)
+        if claimed:
+            task.status = const.TASK_RUNNING
+            task.owner = owner
+            task.started_at = started_at
+            return task
+    return None
+
+
+def remove_provisioning_task(task_id):
+    """Removes a processed device operation from the queue"""
+    LOG.debug("remove_provisioning_task() called")
+    session = db.get_session()
+    try:
+        task = session.query(l2network_models.ProvisioningTask).\
+          filter_by(id=task_id).\
+          one()
+        session.delete(task)
+        session.flush()
+        return task
+    except exc.NoResultFound:
+        pass
+
+
+def fail_provisioning_task(task_id, error):
+    """Marks a queued device operation as failed"""
+    LOG.debug("fail_provisioning_task() called")
+    session = db.get_session()
+    try:
+        task = session.query(l2network_models.ProvisioningTask).\
+          filter_by(id=task_id).\
+          one()
+        task["status"] = const.TASK_FAILED
+        task["finished_at"] = datetime.datetime.utcnow()
+        task["error"] = error
+        session.merge(task)
+        session.flush()
+        return task
+    except exc.NoResultFound:
+        pass
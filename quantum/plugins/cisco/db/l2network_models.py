@@ -18,8 +18,10 @@
 import uuid
 
 from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from sqlalchemy import DateTime, Text
 from sqlalchemy.orm import relation, object_mapper
 
+from quantum.plugins.cisco.common import cisco_constants as const
 from quantum.plugins.cisco.db.models import BASE
 from quantum.plugins.cisco.db import models
 
@@ -101,6 +103,22 @@ class VlanBinding(BASE, L2NetworkBase):
           (self.vlan_id, self.vlan_name, self.network_id)
 
 
+class SegmentationID(BASE, L2NetworkBase):
+    """Represents a reserved segmentation ID"""
+    __tablename__ = 'segmentation_ids'
+
+    segmentation_id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(255))
+
+    def __init__(self, segmentation_id, tenant_id):
+        self.segmentation_id = segmentation_id
+        self.tenant_id = tenant_id
+
+    def __repr__(self):
+        return "<SegmentationID(%d,%s)>" % \
+          (self.segmentation_id, self.tenant_id)
+
+
 class PortProfile(BASE, L2NetworkBase):
     """Represents L2 network plugin level PortProfile for a network"""
     __tablename__ = 'portprofiles'
@@ -188,3 +206,36 @@ class Credential(BASE, L2NetworkBase):
         return "<Credentials(%s,%s,%s,%s,%s)>" % \
           (self.credential_id, self.tenant_id, self.credential_name,
            self.user_name, self.password)
+
+
+class ProvisioningTask(BASE, L2NetworkBase):
+    """Represents a device operation queued for asynchronous provisioning"""
+    __tablename__ = 'provisioning_tasks'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(255))
+    network_id = Column(String(255))
+    port_id = Column(String(255))
+    function_name = Column(String(255))
+    args = Column(Text)
+    status = Column(String(16))
+    owner = Column(String(255))
+    created_at = Column(DateTime)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    error = Column(Text)
+
+    def __init__(self, tenant_id, network_id, port_id, function_name, args,
+                 created_at):
+        self.tenant_id = tenant_id
+        self.network_id = network_id
+        self.port_id = port_id
+        self.function_name = function_name
+        self.args = args
+        self.status = const.TASK_PENDING
+        self.created_at = created_at
+
+    def __repr__(self):
+        return "<ProvisioningTask(%d,%s,%s,%s,%s)>" % \
+          (self.id, self.function_name, self.network_id, self.port_id,
+           self.status)
@@ -68,6 +68,34 @@ def add_portbinding(port_id, blade_intf_dn, portprofile_name,
         return port_binding
 
 
+def add_portbindings(port_bindings):
+    """
+    Adds the port bindings of a list of (port_id, blade_intf_dn,
+    portprofile_name, vlan_name, vlan_id, qos, tenant_id) in one
+    transaction
+    """
+    LOG.debug("add_portbindings() called")
+    session = db.get_session()
+    with session.begin():
+        port_ids = [port_binding[0] for port_binding in port_bindings]
+        existing = session.query(ucs_models.PortBinding).\
+          filter(ucs_models.PortBinding.port_id.in_(port_ids)).\
+          first()
+        if existing:
+            raise c_exc.PortVnicBindingAlreadyExists(port_id=existing.port_id)
+        added = []
+        for (port_id, blade_intf_dn, portprofile_name, vlan_name, vlan_id,
+             qos, tenant_id) in port_bindings:
+            port_binding = ucs_models.PortBinding(port_id, blade_intf_dn,
+                                                  portprofile_name, vlan_name,
+                                                  vlan_id, qos)
+            port_binding.tenant_id = tenant_id
+            session.add(port_binding)
+            added.append(port_binding)
+        session.flush()
+        return added
+
+
 def remove_portbinding(port_id):
     """Removes a port binding"""
     LOG.debug("db remove_portbinding() called")
@@ -83,6 +111,16 @@ def remove_portbinding(port_id):
         pass
 
 
+def remove_portbindings(port_ids):
+    """Removes the port bindings of a list of ports"""
+    LOG.debug("db remove_portbindings() called")
+    session = db.get_session()
+    with session.begin():
+        session.query(ucs_models.PortBinding).\
+          filter(ucs_models.PortBinding.port_id.in_(port_ids)).\
+          delete(synchronize_session=False)
+
+
 def update_portbinding(port_id, blade_intf_dn=None, portprofile_name=None,
                        vlan_name=None, vlan_id=None, qos=None,
                        tenant_id=None, instance_id=None,
@@ -133,6 +171,20 @@ def update_portbinding_instance_id(port_id, instance_id):
         raise c_exc.PortVnicNotFound(port_id=port_id)
 
 
+def update_portbindings_instance_id(port_instances):
+    """
+    Updates the instance ID of the port bindings of a list of
+    (port_id, instance_id) in one transaction
+    """
+    LOG.debug("db update_portbindings_instance_id() called")
+    session = db.get_session()
+    with session.begin():
+        for port_id, instance_id in port_instances:
+            session.query(ucs_models.PortBinding).\
+              filter_by(port_id=port_id).\
+              update({'instance_id': instance_id})
+
+
 def update_portbinding_vif_id(port_id, vif_id):
     """Updates port binding for the VIF ID"""
     LOG.debug("db update_portbinding_vif_id() called")
@@ -19,15 +19,17 @@
 #
 """
 
-import inspect
 import logging
 import re
+import sys
 
+from quantum.api.api_common import OperationalStatus
 from quantum.common import exceptions as exc
 from quantum.common import utils
 from quantum.quantum_plugin_base import QuantumPluginBase
 
 from quantum.plugins.cisco import l2network_plugin_configuration as conf
+from quantum.plugins.cisco import l2network_provisioning
 from quantum.plugins.cisco.common import cisco_constants as const
 from quantum.plugins.cisco.common import cisco_credentials as cred
 from quantum.plugins.cisco.common import cisco_exceptions as cexc
@@ -48,7 +50,14 @@ class L2Network(QuantumPluginBase):
         cdb.initialize()
         cred.Store.initialize()
         self._model = utils.import_object(conf.MODEL_CLASS)
+        self._model_functions = cutil.make_dispatch_table(self._model)
         self._vlan_mgr = utils.import_object(conf.MANAGER_CLASS)
+        self._provisioning = None
+        if conf.ASYNC_PROVISIONING:
+            self._provisioning = l2network_provisioning.ProvisioningQueue(
+                self._invoke_device_plugins, conf.PROVISIONING_WORKERS,
+                conf.PROVISIONING_POLL_INTERVAL,
+                conf.PROVISIONING_TASK_TIMEOUT)
         LOG.debug("L2Network plugin initialization done successfully\n")
 
     """
@@ -62,12 +71,13 @@ class L2Network(QuantumPluginBase):
         """
         LOG.debug("get_all_networks() called\n")
         self._invoke_device_plugins(self._func_name(), [tenant_id])
-        networks_list = db.network_list(tenant_id)
+        networks_list = db.network_list_rows(tenant_id)
         new_networks_list = []
         for network in networks_list:
             new_network_dict = cutil.make_net_dict(network[const.UUID],
                                                    network[const.NETWORKNAME],
-                                                   [])
+                                                   [],
+                                                   network[const.OPSTATUS])
             new_networks_list.append(new_network_dict)
 
         return new_networks_list
@@ -78,17 +88,28 @@ class L2Network(QuantumPluginBase):
         a symbolic name.
         """
         LOG.debug("create_network() called\n")
-        new_network = db.network_create(tenant_id, net_name)
+        new_network = db.network_create(tenant_id, net_name,
+                                        self._get_initial_op_status())
         new_net_id = new_network[const.UUID]
         vlan_id = self._get_vlan_for_tenant(tenant_id, net_name)
         vlan_name = self._get_vlan_name(new_net_id, str(vlan_id))
-        self._invoke_device_plugins(self._func_name(), [tenant_id, net_name,
-                                                     new_net_id, vlan_name,
-                                                     vlan_id])
         cdb.add_vlan_binding(vlan_id, vlan_name, new_net_id)
+        args = [tenant_id, net_name, new_net_id, vlan_name, vlan_id]
+        if self._provisioning:
+            self._provisioning.enqueue(tenant_id, new_net_id, None,
+                                       self._func_name(), args)
+        else:
+            try:
+                self._invoke_device_plugins(self._func_name(), args)
+            except Exception:
+                self._release_vlan_for_tenant(tenant_id, new_net_id)
+                cdb.remove_vlan_binding(new_net_id)
+                db.network_destroy(new_net_id)
+                raise
         new_net_dict = {const.NET_ID: new_net_id,
                         const.NET_NAME: net_name,
-                        const.NET_PORTS: []}
+                        const.NET_PORTS: [],
+                        const.NET_OP_STATUS: new_network[const.OPSTATUS]}
         return new_net_dict
 
     def delete_network(self, tenant_id, net_id):
@@ -97,23 +118,25 @@ class L2Network(QuantumPluginBase):
         belonging to the specified tenant.
         """
         LOG.debug("delete_network() called\n")
+        self._wait_for_provisioning(net_id)
         net = db.network_get(net_id)
         if net:
-            if len(net[const.NETWORKPORTS]) > 0:
-                ports_on_net = db.port_list(net_id)
-                for port in ports_on_net:
-                    if port[const.INTERFACEID]:
-                        raise exc.NetworkInUse(net_id=net_id)
-                for port in ports_on_net:
-                    self.delete_port(tenant_id, net_id, port[const.UUID])
+            # The ports are loaded with the network
+            ports_on_net = net[const.NETWORKPORTS]
+            for port in ports_on_net:
+                if port[const.INTERFACEID]:
+                    raise exc.NetworkInUse(net_id=net_id)
+            for port in ports_on_net:
+                self._invoke_device_plugins("delete_port", [tenant_id,
+                                                            net_id,
+                                                            port[const.UUID]])
 
             self._invoke_device_plugins(self._func_name(), [tenant_id, net_id])
             net_dict = cutil.make_net_dict(net[const.UUID],
                                            net[const.NETWORKNAME],
                                            [])
             self._release_vlan_for_tenant(tenant_id, net_id)
-            cdb.remove_vlan_binding(net_id)
-            db.network_destroy(net_id)
+            cdb.remove_network_cascade(net_id)
             return net_dict
         # Network not found
         raise exc.NetworkNotFound(net_id=net_id)
@@ -131,12 +154,14 @@ class L2Network(QuantumPluginBase):
             new_port = cutil.make_port_dict(port[const.UUID],
                                             port[const.PORTSTATE],
                                             port[const.NETWORKID],
-                                            port[const.INTERFACEID])
+                                            port[const.INTERFACEID],
+                                            port[const.OPSTATUS])
             ports_on_net.append(new_port)
 
         new_network = cutil.make_net_dict(network[const.UUID],
                                               network[const.NETWORKNAME],
-                                              ports_on_net)
+                                              ports_on_net,
+                                              network[const.OPSTATUS])
 
         return new_network
 
@@ -160,15 +185,15 @@ class L2Network(QuantumPluginBase):
         specified Virtual Network.
         """
         LOG.debug("get_all_ports() called\n")
-        network = db.network_get(net_id)
+        ports_list = db.port_list_rows(net_id)
         self._invoke_device_plugins(self._func_name(), [tenant_id, net_id])
-        ports_list = network[const.NETWORKPORTS]
         ports_on_net = []
         for port in ports_list:
             new_port = cutil.make_port_dict(port[const.UUID],
                                             port[const.PORTSTATE],
                                             port[const.NETWORKID],
-                                            port[const.INTERFACEID])
+                                            port[const.INTERFACEID],
+                                            port[const.OPSTATUS])
             ports_on_net.append(new_port)
 
         return ports_on_net
@@ -179,15 +204,19 @@ class L2Network(QuantumPluginBase):
         """
         LOG.debug("create_port() called\n")
 
-        port = db.port_create(net_id, port_state)
+        port = db.port_create(net_id, port_state,
+                              self._get_initial_op_status())
         unique_port_id_string = port[const.UUID]
-        self._invoke_device_plugins(self._func_name(), [tenant_id, net_id,
-                                                     port_state,
-                                                     unique_port_id_string])
+        self._provision_device_plugins(tenant_id, net_id,
+                                       unique_port_id_string,
+                                       self._func_name(),
+                                       [tenant_id, net_id, port_state,
+                                        unique_port_id_string])
         new_port_dict = cutil.make_port_dict(port[const.UUID],
                                              port[const.PORTSTATE],
                                              port[const.NETWORKID],
-                                             port[const.INTERFACEID])
+                                             port[const.INTERFACEID],
+                                             port[const.OPSTATUS])
         return new_port_dict
 
     def delete_port(self, tenant_id, net_id, port_id):
@@ -198,6 +227,7 @@ class L2Network(QuantumPluginBase):
         then the port can be deleted.
         """
         LOG.debug("delete_port() called\n")
+        self._wait_for_provisioning(net_id)
         network = db.network_get(net_id)
         port = db.port_get(net_id, port_id)
         attachment_id = port[const.INTERFACEID]
@@ -233,14 +263,14 @@ class L2Network(QuantumPluginBase):
         that is attached to this particular port.
         """
         LOG.debug("get_port_details() called\n")
-        network = db.network_get(net_id)
+        port = db.port_get_row(net_id, port_id)
         self._invoke_device_plugins(self._func_name(), [tenant_id, net_id,
                                                      port_id])
-        port = db.port_get(net_id, port_id)
         new_port_dict = cutil.make_port_dict(port[const.UUID],
                                              port[const.PORTSTATE],
                                              port[const.NETWORKID],
-                                             port[const.INTERFACEID])
+                                             port[const.INTERFACEID],
+                                             port[const.OPSTATUS])
         return new_port_dict
 
     def plug_interface(self, tenant_id, net_id, port_id,
@@ -263,11 +293,18 @@ class L2Network(QuantumPluginBase):
                       (attachment_id, remote_interface_id))
             raise exc.PortInUse(port_id=port_id, net_id=net_id,
                                 att_id=attachment_id)
-        self._invoke_device_plugins(self._func_name(), [tenant_id,
-                                                        net_id, port_id,
-                                                        attachment_id])
-        db.port_unset_attachment(net_id, port_id)
-        db.port_set_attachment(net_id, port_id, attachment_id)
+        if self._provisioning:
+            db.port_update(port_id, net_id,
+                           op_status=OperationalStatus.PROVISIONING)
+            db.port_unset_attachment(net_id, port_id)
+            db.port_set_attachment(net_id, port_id, attachment_id)
+        self._provision_device_plugins(tenant_id, net_id, port_id,
+                                       self._func_name(),
+                                       [tenant_id, net_id, port_id,
+                                        attachment_id])
+        if not self._provisioning:
+            db.port_unset_attachment(net_id, port_id)
+            db.port_set_attachment(net_id, port_id, attachment_id)
         #Note: The remote_interface_id gets associated with the port
         # when the VM is instantiated. The plug interface call results
         # in putting the port on the VLAN associated with this network
@@ -278,6 +315,7 @@ class L2Network(QuantumPluginBase):
         specified Virtual Network.
         """
         LOG.debug("unplug_interface() called\n")
+        self._wait_for_provisioning(net_id)
         network = db.network_get(net_id)
         port = db.port_get(net_id, port_id)
         attachment_id = port[const.INTERFACEID]
@@ -294,16 +332,17 @@ class L2Network(QuantumPluginBase):
     """
     Extension API implementation
     """
-    def get_all_portprofiles(self, tenant_id):
+    def get_all_portprofiles(self, tenant_id, limit=None, marker=None):
         """Get all port profiles"""
         LOG.debug("get_all_portprofiles() called\n")
-        pplist = cdb.get_all_portprofiles()
+        pplist = cdb.get_portprofiles_with_bindings(tenant_id, limit, marker)
         new_pplist = []
-        for portprofile in pplist:
+        for portprofile, port_ids in pplist:
             new_pp = cutil.make_portprofile_dict(tenant_id,
                                                  portprofile[const.UUID],
                                                  portprofile[const.PPNAME],
-                                                 portprofile[const.PPQOS])
+                                                 portprofile[const.PPQOS],
+                                                 port_ids)
             new_pplist.append(new_pp)
 
         return new_pplist
@@ -312,7 +351,8 @@ class L2Network(QuantumPluginBase):
         """Get port profile details"""
         LOG.debug("get_portprofile_details() called\n")
         try:
-            portprofile = cdb.get_portprofile(tenant_id, profile_id)
+            portprofile, port_ids = cdb.get_portprofile_with_bindings(
+                tenant_id, profile_id)
         except Exception:
             raise cexc.PortProfileNotFound(tenant_id=tenant_id,
                                            portprofile_id=profile_id)
@@ -320,7 +360,8 @@ class L2Network(QuantumPluginBase):
         new_pp = cutil.make_portprofile_dict(tenant_id,
                                              portprofile[const.UUID],
                                              portprofile[const.PPNAME],
-                                             portprofile[const.PPQOS])
+                                             portprofile[const.PPQOS],
+                                             port_ids)
         return new_pp
 
     def create_portprofile(self, tenant_id, profile_name, qos):
@@ -454,6 +495,7 @@ class L2Network(QuantumPluginBase):
         LOG.debug("create_credential() called\n")
         credential = cdb.add_credential(tenant_id, credential_name,
                                         user_name, password)
+        cred.Store.cacheCredential(credential)
         return credential
 
     def delete_credential(self, tenant_id, credential_id):
@@ -465,6 +507,7 @@ class L2Network(QuantumPluginBase):
             raise cexc.CredentialNotFound(tenant_id=tenant_id,
                                           credential_id=credential_id)
         credential = cdb.remove_credential(tenant_id, credential_id)
+        cred.Store.uncacheCredential(credential)
         return credential
 
     def rename_credential(self, tenant_id, credential_id, new_name):
@@ -476,6 +519,7 @@ class L2Network(QuantumPluginBase):
             raise cexc.CredentialNotFound(tenant_id=tenant_id,
                                           credential_id=credential_id)
         credential = cdb.update_credential(tenant_id, credential_id, new_name)
+        cred.Store.cacheCredential(credential)
         return credential
 
     def schedule_host(self, tenant_id, instance_id, instance_desc):
@@ -486,6 +530,17 @@ class L2Network(QuantumPluginBase):
                                                                instance_desc])
         return host_list
 
+    def schedule_hosts(self, tenant_id, instances):
+        """
+        Provides the hostnames on which dynamic vnics are reserved for a
+        list of instances, each a dict with the instance_id and the
+        instance_desc
+        """
+        LOG.debug("schedule_hosts() called\n")
+        host_list = self._invoke_device_plugins(self._func_name(), [tenant_id,
+                                                                    instances])
+        return host_list
+
     def associate_port(self, tenant_id, instance_id, instance_desc):
         """
         Get the portprofile name and the device name for the dynamic vnic
@@ -504,6 +559,16 @@ class L2Network(QuantumPluginBase):
                                                                instance_id,
                                                                instance_desc])
 
+    def get_provisioning_stats(self):
+        """
+        Returns the depth of the provisioning queue and the provisioning
+        latency when asynchronous provisioning is enabled
+        """
+        LOG.debug("get_provisioning_stats() called\n")
+        if not self._provisioning:
+            return {}
+        return self._provisioning.get_stats()
+
     def create_multiport(self, tenant_id, net_id_list, port_state, ports_desc):
         """
         Creates multiple ports on the specified Virtual Network.
@@ -513,8 +578,7 @@ class L2Network(QuantumPluginBase):
         ports_id_list = []
         ports_dict_list = []
 
-        for net_id in net_id_list:
-            port = db.port_create(net_id, port_state)
+        for port in db.ports_create(net_id_list, port_state):
             ports_id_list.append(port[const.UUID])
             port_dict = {const.PORT_ID: port[const.UUID]}
             ports_dict_list.append(port_dict)
@@ -532,7 +596,30 @@ class L2Network(QuantumPluginBase):
         """
         All device-specific calls are delegated to the model
         """
-        return getattr(self._model, function_name)(args)
+        return self._model_functions[function_name][0](args)
+
+    def _provision_device_plugins(self, tenant_id, net_id, port_id,
+                                  function_name, args):
+        """
+        Configures the devices, either right away or through the
+        provisioning queue if asynchronous provisioning is enabled
+        """
+        if self._provisioning:
+            self._provisioning.enqueue(tenant_id, net_id, port_id,
+                                       function_name, args)
+        else:
+            self._invoke_device_plugins(function_name, args)
+
+    def _wait_for_provisioning(self, net_id):
+        """Wait for the queued device operations on a network"""
+        if self._provisioning and not self._provisioning.wait(net_id):
+            LOG.warn("Provisioning of network %s still in progress" % net_id)
+
+    def _get_initial_op_status(self):
+        """Operational status of newly created networks and ports"""
+        if self._provisioning:
+            return OperationalStatus.PROVISIONING
+        return OperationalStatus.UNKNOWN
 
     def _get_vlan_for_tenant(self, tenant_id, net_name):
         """Get vlan ID"""
@@ -555,4 +642,4 @@ class L2Network(QuantumPluginBase):
 
     def _func_name(self, offset=0):
         """Getting the name of the calling funciton"""
-        return inspect.stack()[1 + offset][3]
+        return sys._getframe(1 + offset).f_code.co_name
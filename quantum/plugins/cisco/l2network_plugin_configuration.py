@@ -45,11 +45,21 @@ MAX_NETWORKS = SECTION_CONF['max_networks']
 
 SECTION_CONF = CONF_PARSER_OBJ['MODEL']
 MODEL_CLASS = SECTION_CONF['model_class']
+MAX_CALLS_PER_DEVICE = int(SECTION_CONF.get('max_calls_per_device', 1))
+
+SECTION_CONF = CONF_PARSER_OBJ.get('PROVISIONING', {})
+ASYNC_PROVISIONING = SECTION_CONF.get('async_provisioning',
+                                      'False').lower() == 'true'
+PROVISIONING_WORKERS = int(SECTION_CONF.get('workers', 4))
+PROVISIONING_POLL_INTERVAL = float(SECTION_CONF.get('poll_interval', 1))
+PROVISIONING_TASK_TIMEOUT = int(SECTION_CONF.get('task_timeout', 600))
 
 CONF_FILE = find_config_file({'plugin': 'cisco'}, None, "cisco_plugins.ini")
 
 SECTION_CONF = CONF_PARSER_OBJ['SEGMENTATION']
 MANAGER_CLASS = SECTION_CONF['manager_class']
+SEGMENT_START = int(SECTION_CONF.get('segment_start', 1))
+SEGMENT_END = int(SECTION_CONF.get('segment_end', 16777215))
 
 
 CONF_PARSER_OBJ = confp.CiscoConfigParser(CONF_FILE)
@@ -0,0 +1,184 @@
+"""
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2011 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+"""
+
+from collections import deque
+import datetime
+import json
+import logging
+import os
+import platform
+
+import eventlet
+from eventlet import queue
+
+from quantum.api.api_common import OperationalStatus
+from quantum import metrics
+from quantum.plugins.cisco.common import cisco_constants as const
+from quantum.plugins.cisco.db import api as db
+from quantum.plugins.cisco.db import l2network_db as cdb
+
+LOG = logging.getLogger(__name__)
+
+
+def _total_seconds(delta):
+    """timedelta.total_seconds, which Python 2.6 lacks"""
+    return (delta.days * 86400 + delta.seconds +
+            delta.microseconds / 1000000.0)
+
+
+class ProvisioningQueue(object):
+    """
+    Persistent queue of device operations for the L2Network plugin.
+    The operations are stored in the provisioning_tasks table and
+    processed by background workers, which flip the operational status
+    of the network or port to UP or DOWN once the devices are configured.
+    The queue depth, the task counts and the provisioning latency are
+    recorded in the metrics registry, as cisco.provisioning.*.
+    """
+
+    def __init__(self, invoke_function, workers, poll_interval,
+                 task_timeout, latency_samples=1000):
+        self._invoke_function = invoke_function
+        self._poll_interval = poll_interval
+        self._task_timeout_seconds = float(task_timeout)
+        self._task_timeout = datetime.timedelta(seconds=task_timeout)
+        self._owner = "%s-%d" % (platform.node(), os.getpid())
+        self._doorbell = queue.LightQueue()
+        self._latencies = deque(maxlen=latency_samples)
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._workers = [eventlet.spawn(self._worker)
+                         for _i in range(workers)]
+
+    def stop(self):
+        """Stops the background workers"""
+        for worker in self._workers:
+            worker.kill()
+        self._workers = []
+
+    def enqueue(self, tenant_id, network_id, port_id, function_name, args):
+        """Queue a device operation for a network or a port"""
+        task = cdb.add_provisioning_task(tenant_id, network_id, port_id,
+                                         function_name, json.dumps(args))
+        LOG.debug("Queued provisioning task %s" % task)
+        self._update_queue_depth()
+        self._doorbell.put(task.id)
+        return task
+
+    def wait(self, network_id, timeout=None):
+        """
+        Wait until the queued device operations for a network have been
+        processed, returns False if they did not complete in time
+        """
+        if timeout is None:
+            timeout = self._task_timeout_seconds
+        with eventlet.Timeout(timeout, False):
+            while self._is_busy(network_id):
+                eventlet.sleep(self._poll_interval)
+            return True
+        return False
+
+    def get_stats(self):
+        """Returns the queue depth and the provisioning latency"""
+        latencies = list(self._latencies)
+        avg_latency = None
+        max_latency = None
+        if latencies:
+            avg_latency = sum(latencies) / len(latencies)
+            max_latency = max(latencies)
+        return {const.PROVISIONING_QUEUE_DEPTH:
+                    cdb.get_provisioning_task_count(const.TASK_PENDING),
+                const.PROVISIONING_RUNNING: self._running,
+                const.PROVISIONING_COMPLETED: self._completed,
+                const.PROVISIONING_FAILED: self._failed,
+                const.PROVISIONING_AVG_LATENCY: avg_latency,
+                const.PROVISIONING_MAX_LATENCY: max_latency}
+
+    def _update_queue_depth(self):
+        try:
+            metrics.gauge("cisco.provisioning.queue_depth").set(
+                cdb.get_provisioning_task_count(const.TASK_PENDING))
+        except Exception:
+            LOG.exception("Unable to count the provisioning tasks")
+
+    def _is_busy(self, network_id):
+        """Checks if there are unprocessed operations for a network"""
+        for status in (const.TASK_PENDING, const.TASK_RUNNING):
+            if cdb.get_provisioning_task_count(status, network_id):
+                return True
+        return False
+
+    def _worker(self):
+        """Background worker processing the queued operations"""
+        while True:
+            try:
+                stale_before = datetime.datetime.utcnow() - \
+                        self._task_timeout
+                task = cdb.claim_provisioning_task(self._owner, stale_before)
+            except Exception:
+                LOG.exception("Unable to claim a provisioning task")
+                task = None
+            if task:
+                self._process(task)
+                continue
+            try:
+                self._doorbell.get(timeout=self._poll_interval)
+            except queue.Empty:
+                pass
+
+    def _process(self, task):
+        """Invoke the device plugins for a claimed operation"""
+        LOG.debug("Processing provisioning task %s" % task)
+        self._running += 1
+        metrics.gauge("cisco.provisioning.running").set(self._running)
+        self._update_queue_depth()
+        try:
+            self._invoke_function(task.function_name, json.loads(task.args))
+        except Exception, exc:
+            LOG.exception("Provisioning task %s failed" % task)
+            self._failed += 1
+            metrics.counter("cisco.provisioning.failed").inc()
+            cdb.fail_provisioning_task(task.id, str(exc))
+            self._set_op_status(task, OperationalStatus.DOWN)
+        else:
+            self._completed += 1
+            metrics.counter("cisco.provisioning.completed").inc()
+            cdb.remove_provisioning_task(task.id)
+            self._set_op_status(task, OperationalStatus.UP)
+        finally:
+            self._running -= 1
+            metrics.gauge("cisco.provisioning.running").set(self._running)
+        latency = _total_seconds(datetime.datetime.utcnow() - task.created_at)
+        self._latencies.append(latency)
+        metrics.histogram("cisco.provisioning.latency").observe(
+            latency * 1000)
+
+    def _set_op_status(self, task, op_status):
+        """Set the operational status of the provisioned network or port"""
+        try:
+            if task.port_id:
+                db.port_update(task.port_id, task.network_id,
+                               op_status=op_status)
+            else:
+                db.network_update(task.network_id, task.tenant_id,
+                                  op_status=op_status)
+        except Exception:
+            LOG.exception("Unable to set the operational status for %s" %
+                          task)
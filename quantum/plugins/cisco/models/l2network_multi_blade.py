@@ -19,10 +19,12 @@
 #
 """
 
-from copy import deepcopy
-import inspect
 import logging
 import platform
+import sys
+
+import eventlet
+from eventlet import semaphore
 
 from quantum.common import exceptions as exc
 from quantum.common import utils
@@ -30,6 +32,7 @@ from quantum.plugins.cisco.l2network_model_base import L2NetworkModelBase
 from quantum.plugins.cisco import l2network_plugin_configuration as conf
 from quantum.plugins.cisco.common import cisco_constants as const
 from quantum.plugins.cisco.common import cisco_exceptions as cexc
+from quantum.plugins.cisco.common import cisco_utils as cutil
 
 LOG = logging.getLogger(__name__)
 
@@ -41,25 +44,35 @@ class L2NetworkMultiBlade(L2NetworkModelBase):
     following topology:
     One or more UCSM (each with one or more chasses connected)
     All UCSM connected to a single Nexus Switch
+    The calls to the individual devices are dispatched concurrently
     """
     _plugins = {}
     _inventory = {}
+    _plugin_functions = {}
+    _inventory_functions = {}
+    _device_semaphores = {}
+    _first_devices = {}
 
     def __init__(self):
         for key in conf.PLUGINS[const.PLUGINS].keys():
             self._plugins[key] = utils.import_object(
                 conf.PLUGINS[const.PLUGINS][key])
+            self._plugin_functions[(key, None)] = \
+                    cutil.make_dispatch_table(self._plugins[key])
             LOG.debug("Loaded device plugin %s\n" % \
                     conf.PLUGINS[const.PLUGINS][key])
             if key in conf.PLUGINS[const.INVENTORY].keys():
                 self._inventory[key] = utils.import_object(
                     conf.PLUGINS[const.INVENTORY][key])
+                self._inventory_functions[key] = \
+                        cutil.make_dispatch_table(self._inventory[key])
                 LOG.debug("Loaded device inventory %s\n" % \
                         conf.PLUGINS[const.INVENTORY][key])
+        self._pool = eventlet.GreenPool()
 
     def _func_name(self, offset=0):
         """Get the name of the calling function"""
-        return inspect.stack()[1 + offset][3]
+        return sys._getframe(1 + offset).f_code.co_name
 
     def _invoke_plugin_per_device(self, plugin_key, function_name, args):
         """Invoke only device plugin for all the devices in the system"""
@@ -68,22 +81,129 @@ class L2NetworkMultiBlade(L2NetworkModelBase):
             LOG.info("%s: %s with args %s ignored" \
                      % (plugin_key, function_name, args))
             return
+        # Return a list of return values from each device
+        return self._invoke_devices(self._get_device_calls(plugin_key,
+                                                           function_name,
+                                                           args),
+                                    function_name, args)
+
+    def _invoke_plugins_per_device(self, plugin_keys, function_name, args,
+                                   rollback_function_name=None,
+                                   rollback_args=None):
+        """
+        Invoke the device plugins for all the devices of all the plugins
+        concurrently. If the call fails on any of the devices, the
+        rollback function is invoked on the devices where it succeeded.
+        """
+        device_calls = []
+        for plugin_key in plugin_keys:
+            if not plugin_key in self._plugins.keys():
+                LOG.info("No %s Plugin loaded" % plugin_key)
+                LOG.info("%s: %s with args %s ignored" \
+                         % (plugin_key, function_name, args))
+                continue
+            device_calls.extend(self._get_device_calls(plugin_key,
+                                                       function_name, args))
+        return self._invoke_devices(device_calls, function_name, args,
+                                    rollback_function_name, rollback_args)
+
+    def _get_device_calls(self, plugin_key, function_name, args):
+        """
+        Returns the (plugin_key, device_params) pairs a call has to be
+        dispatched to, one per device reported by the inventory
+        """
         device_params = self._invoke_inventory(plugin_key, function_name,
                                                args)
         device_ips = device_params[const.DEVICE_IP]
         if not device_ips:
-            # Return in a list
-            return [self._invoke_plugin(plugin_key, function_name, args,
-                                device_params)]
-        else:
-            # Return a list of return values from each device
-            output = []
-            for device_ip in device_ips:
-                new_device_params = deepcopy(device_params)
-                new_device_params[const.DEVICE_IP] = device_ip
-                output.append(self._invoke_plugin(plugin_key, function_name,
-                                args, new_device_params))
-            return output
+            return [(plugin_key, device_params)]
+        device_calls = []
+        for device_ip in device_ips:
+            new_device_params = dict(device_params)
+            new_device_params[const.DEVICE_IP] = device_ip
+            device_calls.append((plugin_key, new_device_params))
+        return device_calls
+
+    def _invoke_devices(self, device_calls, function_name, args,
+                        rollback_function_name=None, rollback_args=None):
+        """
+        Dispatch the call to all the devices in parallel and wait for all
+        of them to complete. The results are returned in the order of the
+        device calls; if any of the devices failed, the first error is
+        re-raised once the rollback has been done.
+        """
+        threads = []
+        for plugin_key, device_params in device_calls:
+            thread = self._pool.spawn(self._invoke_device, plugin_key,
+                                      function_name, list(args),
+                                      dict(device_params))
+            threads.append((plugin_key, device_params, thread))
+
+        output = []
+        succeeded = []
+        errors = []
+        for plugin_key, device_params, thread in threads:
+            try:
+                output.append(thread.wait())
+                succeeded.append((plugin_key, device_params))
+            except Exception:
+                LOG.exception("%s: %s failed on device %s" % \
+                              (plugin_key, function_name,
+                               device_params.get(const.DEVICE_IP)))
+                errors.append(sys.exc_info())
+
+        if errors:
+            if rollback_function_name:
+                self._rollback_devices(succeeded, rollback_function_name,
+                                       rollback_args)
+            exc_type, exc_value, exc_traceback = errors[0]
+            raise exc_type, exc_value, exc_traceback
+        return output
+
+    def _rollback_devices(self, device_calls, function_name, args):
+        """Compensate the devices on which a failed call went through"""
+        for plugin_key, device_params in device_calls:
+            LOG.info("%s: rolling back with %s on device %s" % \
+                     (plugin_key, function_name,
+                      device_params.get(const.DEVICE_IP)))
+            try:
+                self._invoke_device(plugin_key, function_name, list(args),
+                                    dict(device_params))
+            except Exception:
+                LOG.exception("%s: rollback %s failed on device %s" % \
+                              (plugin_key, function_name,
+                               device_params.get(const.DEVICE_IP)))
+
+    def _invoke_device(self, plugin_key, function_name, args, kwargs):
+        """
+        Invoke the device plugin, bounding the number of concurrent calls
+        to the same device
+        """
+        device_key = (plugin_key, kwargs.get(const.DEVICE_IP))
+        if not device_key in self._device_semaphores:
+            self._device_semaphores[device_key] = \
+                    semaphore.Semaphore(conf.MAX_CALLS_PER_DEVICE)
+        with self._device_semaphores[device_key]:
+            return self._invoke_plugin(plugin_key, function_name, args,
+                                       kwargs)
+
+    def _get_device_functions(self, plugin_key, device_ip):
+        """
+        Returns the dispatch table of the plugin object for a device, each
+        device gets its own instance since the device plugins keep per
+        device state. The first device reuses the instance loaded at
+        startup, so a plugin with a single device is only loaded once.
+        """
+        device_key = (plugin_key, device_ip)
+        if not device_key in self._plugin_functions:
+            if not plugin_key in self._first_devices:
+                self._first_devices[plugin_key] = device_ip
+                functions = self._plugin_functions[(plugin_key, None)]
+            else:
+                functions = cutil.make_dispatch_table(utils.import_object(
+                    conf.PLUGINS[const.PLUGINS][plugin_key]))
+            self._plugin_functions[device_key] = functions
+        return self._plugin_functions[device_key]
 
     def _invoke_inventory(self, plugin_key, function_name, args):
         """Invoke only the inventory implementation"""
@@ -93,14 +213,16 @@ class L2NetworkMultiBlade(L2NetworkModelBase):
                      % (plugin_key, function_name, args))
             return {const.DEVICE_IP: []}
         else:
-            return getattr(self._inventory[plugin_key], function_name)(args)
+            return self._inventory_functions[plugin_key][function_name][0](
+                args)
 
     def _invoke_plugin(self, plugin_key, function_name, args, kwargs):
         """Invoke only the device plugin"""
         # If there are more args than needed, add them to kwargs
-        func = getattr(self._plugins[plugin_key], function_name)
+        func, arg_count = self._get_device_functions(
+            plugin_key, kwargs.get(const.DEVICE_IP))[function_name]
 
-        if args.__len__() + 1 > inspect.getargspec(func).args.__len__():
+        if args.__len__() + 1 > arg_count:
             kwargs.update(args.pop())
 
         return func(*args, **kwargs)
@@ -111,25 +233,18 @@ class L2NetworkMultiBlade(L2NetworkModelBase):
 
     def create_network(self, args):
         """Support for the Quantum core API call"""
-        output = []
-        ucs_output = self._invoke_plugin_per_device(const.UCS_PLUGIN,
-                                       self._func_name(), args)
-        nexus_output = self._invoke_plugin_per_device(const.NEXUS_PLUGIN,
-                                       self._func_name(), args)
-        output.extend(ucs_output or [])
-        output.extend(nexus_output or [])
-        return output
+        # args: tenant_id, net_name, net_id, vlan_name, vlan_id
+        return self._invoke_plugins_per_device([const.UCS_PLUGIN,
+                                                const.NEXUS_PLUGIN],
+                                               self._func_name(), args,
+                                               "delete_network",
+                                               [args[0], args[2]])
 
     def delete_network(self, args):
         """Support for the Quantum core API call"""
-        output = []
-        ucs_output = self._invoke_plugin_per_device(const.UCS_PLUGIN,
-                                       self._func_name(), args)
-        nexus_output = self._invoke_plugin_per_device(const.NEXUS_PLUGIN,
-                                       self._func_name(), args)
-        output.extend(ucs_output or [])
-        output.extend(nexus_output or [])
-        return output
+        return self._invoke_plugins_per_device([const.UCS_PLUGIN,
+                                                const.NEXUS_PLUGIN],
+                                               self._func_name(), args)
 
     def get_network_details(self, args):
         """Not implemented for this model"""
@@ -137,14 +252,9 @@ class L2NetworkMultiBlade(L2NetworkModelBase):
 
     def update_network(self, args):
         """Support for the Quantum core API call"""
-        output = []
-        ucs_output = self._invoke_plugin_per_device(const.UCS_PLUGIN,
-                                       self._func_name(), args)
-        nexus_output = self._invoke_plugin_per_device(const.NEXUS_PLUGIN,
-                                       self._func_name(), args)
-        output.extend(ucs_output or [])
-        output.extend(nexus_output or [])
-        return output
+        return self._invoke_plugins_per_device([const.UCS_PLUGIN,
+                                                const.NEXUS_PLUGIN],
+                                               self._func_name(), args)
 
     def get_all_ports(self, args):
         """Not implemented for this model"""
@@ -184,6 +294,12 @@ class L2NetworkMultiBlade(L2NetworkModelBase):
         return self._invoke_inventory(const.UCS_PLUGIN, self._func_name(),
                                       args)
 
+    def schedule_hosts(self, args):
+        """Provides the hostnames on which dynamic vnics are reserved"""
+        LOG.debug("schedule_hosts() called\n")
+        return self._invoke_inventory(const.UCS_PLUGIN, self._func_name(),
+                                      args)
+
     def associate_port(self, args):
         """
         Get the portprofile name and the device name for the dynamic vnic
@@ -20,9 +20,9 @@
 """
 
 from copy import deepcopy
-import inspect
 import logging
 import platform
+import sys
 
 from quantum.common import exceptions as exc
 from quantum.common import utils
@@ -56,7 +56,7 @@ class L2NetworkSingleBlade(L2NetworkModelBase):
 
     def _func_name(self, offset=0):
         """Get the name of the calling function"""
-        return inspect.stack()[1 + offset][3]
+        return sys._getframe(1 + offset).f_code.co_name
 
     def _invoke_plugin_per_device(self, plugin_key, function_name, args):
         """Invoke only device plugin for all the devices in the system"""
@@ -158,6 +158,12 @@ class L2NetworkSingleBlade(L2NetworkModelBase):
         return self._invoke_inventory(const.UCS_PLUGIN, self._func_name(),
                                       args)
 
+    def schedule_hosts(self, args):
+        """Provides the hostnames on which dynamic vnics are reserved"""
+        LOG.debug("schedule_hosts() called\n")
+        return self._invoke_inventory(const.UCS_PLUGIN, self._func_name(),
+                                      args)
+
     def associate_port(self, args):
         """
         Get the portprofile name and the device namei for the dynamic vnic
@@ -35,6 +35,7 @@ NEXUS_IP_ADDRESS = SECTION['nexus_ip_address']
 NEXUS_FIRST_PORT = SECTION['nexus_first_port']
 NEXUS_SECOND_PORT = SECTION['nexus_second_port']
 NEXUS_SSH_PORT = SECTION['nexus_ssh_port']
+NEXUS_SYNC_INTERVAL = int(SECTION.get('nexus_sync_interval', 0))
 
 SECTION = CP['DRIVER']
 NEXUS_DRIVER = SECTION['name']
@@ -22,8 +22,11 @@ Implements a Nexus-OS NETCONF over SSHv2 API Client
 """
 
 import logging
+import re
 
+from quantum import metrics
 from quantum.plugins.cisco.common import cisco_constants as const
+from quantum.plugins.cisco.common import cisco_utils as cutil
 from quantum.plugins.cisco.db import l2network_db as cdb
 from quantum.plugins.cisco.nexus import cisco_nexus_snippets as snipp
 
@@ -109,6 +112,40 @@ class CiscoNEXUSDriver():
         LOG.debug("NexusDriver: %s" % confstr)
         mgr.edit_config(target='running', config=confstr)
 
+    def add_vlan_to_trunk_int(self, mgr, interface, vlanid):
+        """
+        Adds the given VLANs to the allowed list of a trunk interface on
+        Nexus Switch, leaving the VLANs already allowed untouched
+        """
+        confstr = snipp.CMD_VLAN_INT_ADD_SNIPPET % (interface, vlanid)
+        confstr = self.create_xml_snippet(confstr)
+        LOG.debug("NexusDriver: %s" % confstr)
+        mgr.edit_config(target='running', config=confstr)
+
+    def remove_vlan_from_trunk_int(self, mgr, interface, vlanid):
+        """
+        Removes the given VLANs from the allowed list of a trunk interface
+        on Nexus Switch, leaving the other allowed VLANs untouched
+        """
+        confstr = snipp.CMD_VLAN_INT_REMOVE_SNIPPET % (interface, vlanid)
+        confstr = self.create_xml_snippet(confstr)
+        LOG.debug("NexusDriver: %s" % confstr)
+        mgr.edit_config(target='running', config=confstr)
+
+    def get_vlans_on_trunk_int(self, mgr, interface):
+        """
+        Returns the set of VLAN IDs allowed on a trunk interface on Nexus
+        Switch
+        """
+        filterstr = snipp.FILTER_SHOW_INT_SWITCHPORT_SNIPPET % interface
+        reply = mgr.get(filter=('subtree', filterstr))
+        match = re.search(r'<trunk_vlans>\s*([^<]*?)\s*</trunk_vlans>',
+                          str(reply))
+        if not match:
+            return set()
+        return cutil.parse_vlan_ranges(match.group(1))
+
+    @metrics.timed("cisco.nexus.create_vlan")
     def create_vlan(self, vlan_name, vlan_id, nexus_host, nexus_user,
                     nexus_password, nexus_first_interface,
                     nexus_second_interface, nexus_ssh_port):
@@ -119,13 +156,10 @@ class CiscoNEXUSDriver():
         with self.nxos_connect(nexus_host, int(nexus_ssh_port), nexus_user,
                                nexus_password) as man:
             self.enable_vlan(man, vlan_id, vlan_name)
-            vlan_ids = self.build_vlans_cmd()
-            LOG.debug("NexusDriver VLAN IDs: %s" % vlan_ids)
-            self.enable_vlan_on_trunk_int(man, nexus_first_interface,
-                                          vlan_ids)
-            self.enable_vlan_on_trunk_int(man, nexus_second_interface,
-                                          vlan_ids)
+            self.add_vlan_to_trunk_int(man, nexus_first_interface, vlan_id)
+            self.add_vlan_to_trunk_int(man, nexus_second_interface, vlan_id)
 
+    @metrics.timed("cisco.nexus.delete_vlan")
     def delete_vlan(self, vlan_id, nexus_host, nexus_user, nexus_password,
                     nexus_first_interface, nexus_second_interface,
                     nexus_ssh_port):
@@ -136,19 +170,48 @@ class CiscoNEXUSDriver():
         with self.nxos_connect(nexus_host, int(nexus_ssh_port), nexus_user,
                                nexus_password) as man:
             self.disable_vlan(man, vlan_id)
-            self.disable_vlan_on_trunk_int(man, nexus_first_interface,
-                                           vlan_id)
-            self.disable_vlan_on_trunk_int(man, nexus_second_interface,
-                                           vlan_id)
-
-    def build_vlans_cmd(self):
-        """
-        Builds a string with all the VLANs on the same Switch
-        """
-        assigned_vlan = cdb.get_all_vlanids_used()
-        vlans = ''
-        for vlanid in assigned_vlan:
-            vlans = str(vlanid["vlan_id"]) + ',' + vlans
+            self.remove_vlan_from_trunk_int(man, nexus_first_interface,
+                                            vlan_id)
+            self.remove_vlan_from_trunk_int(man, nexus_second_interface,
+                                            vlan_id)
+
+    @metrics.timed("cisco.nexus.sync_vlans")
+    def sync_vlans(self, interface_vlans, nexus_host, nexus_user,
+                   nexus_password, nexus_ssh_port):
+        """
+        Reconciles the allowed VLANs of the trunk interfaces on Nexus Switch
+        with the expected ones, given a dict of interface -> set of VLAN IDs.
+        Interfaces already in sync are left untouched, the others get their
+        full allowed list pushed in compressed range syntax. Returns the
+        interfaces which were resynced.
+        """
+        resynced = []
+        with self.nxos_connect(nexus_host, int(nexus_ssh_port), nexus_user,
+                               nexus_password) as man:
+            for interface, vlan_ids in interface_vlans.iteritems():
+                expected = set([int(vlan_id) for vlan_id in vlan_ids])
+                current = self.get_vlans_on_trunk_int(man, interface)
+                if current == expected:
+                    continue
+                LOG.debug("NexusDriver: interface %s out of sync, "
+                          "missing VLANs %s, extra VLANs %s" %
+                          (interface,
+                           cutil.make_vlan_ranges(expected - current),
+                           cutil.make_vlan_ranges(current - expected)))
+                self.enable_vlan_on_trunk_int(man, interface,
+                                              self.build_vlans_cmd(expected))
+                resynced.append(interface)
+        return resynced
+
+    def build_vlans_cmd(self, vlan_ids=None):
+        """
+        Builds a string with all the VLANs on the same Switch, in compressed
+        range syntax
+        """
+        if vlan_ids is None:
+            vlan_ids = [vlanid["vlan_id"]
+                        for vlanid in cdb.get_all_vlanids_used()]
+        vlans = cutil.make_vlan_ranges(vlan_ids)
         if vlans == '':
             vlans = 'none'
-        return vlans.strip(',')
+        return vlans
@@ -22,6 +22,8 @@ PlugIn for Nexus OS driver
 """
 import logging
 
+import eventlet
+
 from quantum.common import exceptions as exc
 from quantum.common import utils
 from quantum.plugins.cisco.common import cisco_constants as const
@@ -40,6 +42,7 @@ class NexusPlugin(L2DevicePluginBase):
     Nexus PLugIn Main Class
     """
     _networks = {}
+    _synced_switches = set()
 
     def __init__(self):
         """
@@ -48,11 +51,18 @@ class NexusPlugin(L2DevicePluginBase):
         self._client = utils.import_object(conf.NEXUS_DRIVER)
         LOG.debug("Loaded driver %s\n" % conf.NEXUS_DRIVER)
         self._nexus_ip = conf.NEXUS_IP_ADDRESS
-        self._nexus_username = cred.Store.getUsername(conf.NEXUS_IP_ADDRESS)
-        self._nexus_password = cred.Store.getPassword(conf.NEXUS_IP_ADDRESS)
+        credential = cred.Store.getCredential(conf.NEXUS_IP_ADDRESS)
+        self._nexus_username = credential[const.USERNAME]
+        self._nexus_password = credential[const.PASSWORD]
         self._nexus_first_port = conf.NEXUS_FIRST_PORT
         self._nexus_second_port = conf.NEXUS_SECOND_PORT
         self._nexus_ssh_port = conf.NEXUS_SSH_PORT
+        # One reconciliation loop per switch, however many plugin objects
+        # are loaded for it
+        if conf.NEXUS_SYNC_INTERVAL > 0 and \
+           self._nexus_ip not in self._synced_switches:
+            self._synced_switches.add(self._nexus_ip)
+            eventlet.spawn(self._sync_vlans_loop, conf.NEXUS_SYNC_INTERVAL)
 
     def get_all_networks(self, tenant_id):
         """
@@ -173,6 +183,36 @@ class NexusPlugin(L2DevicePluginBase):
         """
         LOG.debug("NexusPlugin:unplug_interface() called\n")
 
+    def sync_vlans(self):
+        """
+        Reconciles the VLANs allowed on the trunk interfaces of the switch
+        with the nexusport bindings, pushing the full allowed list only to
+        the interfaces which are out of sync
+        """
+        LOG.debug("NexusPlugin:sync_vlans() called\n")
+        interface_vlans = {self._nexus_first_port: set(),
+                           self._nexus_second_port: set()}
+        for binding in nxos_db.get_all_nexusport_bindings():
+            interface_vlans.setdefault(binding[const.PORTID], set()).add(
+                                                binding[const.VLANID])
+        return self._client.sync_vlans(interface_vlans, self._nexus_ip,
+                self._nexus_username, self._nexus_password,
+                self._nexus_ssh_port)
+
+    def _sync_vlans_loop(self, interval):
+        """
+        Periodically reconciles the switch state with the DB
+        """
+        while True:
+            eventlet.sleep(interval)
+            try:
+                resynced = self.sync_vlans()
+                if resynced:
+                    LOG.info("NexusPlugin: resynced VLANs on interfaces %s" %
+                             resynced)
+            except Exception:
+                LOG.exception("NexusPlugin: VLAN reconciliation failed")
+
     def _get_vlan_id_for_network(self, tenant_id, network_id):
         """
         Obtain the VLAN ID given the Network ID
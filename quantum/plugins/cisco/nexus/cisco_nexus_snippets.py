@@ -146,6 +146,54 @@ CMD_NO_VLAN_INT_SNIPPET = """
 """
 
 
+CMD_VLAN_INT_ADD_SNIPPET = """
+        <interface>
+          <ethernet>
+            <interface>%s</interface>
+            <__XML__MODE_if-ethernet-switch>
+              <switchport>
+                <trunk>
+                  <allowed>
+                    <vlan>
+                      <add>
+                        <__XML__BLK_Cmd_switchport_trunk_allowed_allow-vlans>
+                          <add-vlans>%s</add-vlans>
+                        </__XML__BLK_Cmd_switchport_trunk_allowed_allow-vlans>
+                      </add>
+                    </vlan>
+                  </allowed>
+                </trunk>
+              </switchport>
+            </__XML__MODE_if-ethernet-switch>
+          </ethernet>
+        </interface>
+"""
+
+
+CMD_VLAN_INT_REMOVE_SNIPPET = """
+        <interface>
+          <ethernet>
+            <interface>%s</interface>
+            <__XML__MODE_if-ethernet-switch>
+              <switchport>
+                <trunk>
+                  <allowed>
+                    <vlan>
+                      <remove>
+                        <__XML__BLK_Cmd_switchport_trunk_allowed_allow-vlans>
+                          <remove-vlans>%s</remove-vlans>
+                        </__XML__BLK_Cmd_switchport_trunk_allowed_allow-vlans>
+                      </remove>
+                    </vlan>
+                  </allowed>
+                </trunk>
+              </switchport>
+            </__XML__MODE_if-ethernet-switch>
+          </ethernet>
+        </interface>
+"""
+
+
 FILTER_SHOW_VLAN_BRIEF_SNIPPET = """
       <show xmlns="http://www.cisco.com/nxos:1.0:vlan_mgr_cli">
         <vlan>
@@ -153,3 +201,15 @@ FILTER_SHOW_VLAN_BRIEF_SNIPPET = """
         </vlan>
       </show>
 """
+
+
+FILTER_SHOW_INT_SWITCHPORT_SNIPPET = """
+      <show xmlns="http://www.cisco.com/nxos:1.0:if_manager">
+        <interface>
+          <ethernet>
+            <interface>%s</interface>
+            <switchport/>
+          </ethernet>
+        </interface>
+      </show>
+"""
@@ -17,12 +17,17 @@
 # @author: Sumit Naiksatam, Cisco Systems, Inc.
 #
 
+import time
+
+import eventlet
+from eventlet import event
+from eventlet import queue
+
 from nova import exception as excp
 from nova import flags
 from nova import log as logging
 from nova.scheduler import driver
-from quantum.client import Client
-from quantum.common.wsgi import Serializer
+from quantum.plugins.cisco.common.cisco_client import PooledClient
 
 LOG = logging.getLogger('quantum.plugins.cisco.nova.quantum_aware_scheduler')
 
@@ -31,6 +36,18 @@ flags.DEFINE_string('quantum_host', "127.0.0.1",
                      'IP address of the quantum network service.')
 flags.DEFINE_integer('quantum_port', 9696,
                      'Listening port for Quantum network service')
+flags.DEFINE_integer('quantum_pool_size', 10,
+                     'Maximum number of connections to the Quantum service')
+flags.DEFINE_integer('quantum_request_timeout', 30,
+                     'Timeout of the requests to Quantum, in seconds')
+flags.DEFINE_integer('quantum_request_retries', 3,
+                     'Number of retries of a request to Quantum failing '
+                     'on a connection error')
+flags.DEFINE_integer('quantum_schedule_batch_window', 10,
+                     'Milliseconds during which concurrent schedule requests '
+                     'are collected and sent to Quantum in one request')
+flags.DEFINE_integer('quantum_schedule_batch_size', 50,
+                     'Maximum number of instances scheduled in one request')
 
 HOST = FLAGS.quantum_host
 PORT = FLAGS.quantum_port
@@ -40,7 +57,72 @@ ACTION_PREFIX_CSCO = ACTION_PREFIX_EXT + \
         '/extensions/csco/tenants/{tenant_id}'
 TENANT_ID = 'nova'
 CSCO_EXT_NAME = 'Cisco Nova Tenant'
-ACTION = '/schedule_host'
+ACTION = '/schedule_hosts'
+
+
+def _client(tenant, action_prefix):
+    """Quantum client sending its requests over the shared pool"""
+    return PooledClient(HOST, PORT, USE_SSL,
+                        pool_size=FLAGS.quantum_pool_size,
+                        timeout=FLAGS.quantum_request_timeout,
+                        retries=FLAGS.quantum_request_retries,
+                        format='json', tenant=tenant,
+                        action_prefix=action_prefix)
+
+
+class HostScheduleBatcher(object):
+    """
+    Collects the concurrent schedule requests during the batch window and
+    sends them to Quantum in one schedule_hosts request
+    """
+
+    def __init__(self, client, window, size):
+        self._client = client
+        self._window = window / 1000.0
+        self._size = size
+        self._requests = queue.LightQueue()
+        self._thread = None
+
+    def schedule(self, instance_id, instance_desc):
+        """Returns the host name of an instance"""
+        result = event.Event()
+        self._requests.put((instance_id, instance_desc, result))
+        if self._thread is None:
+            self._thread = eventlet.spawn(self._run)
+        return result.wait()
+
+    def _next_batch(self):
+        batch = [self._requests.get()]
+        deadline = time.time() + self._window
+        while len(batch) < self._size:
+            try:
+                batch.append(self._requests.get(
+                    timeout=max(deadline - time.time(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self._send(self._next_batch())
+
+    def _send(self, batch):
+        body = {'novatenant':
+                {'instances': [{'instance_id': instance_id,
+                                'instance_desc': instance_desc}
+                               for instance_id, instance_desc, _r in batch]}}
+        try:
+            data = self._client.do_request(
+                'PUT', "/novatenants/" + TENANT_ID + ACTION, body=body)
+            hosts = dict([(str(host['instance_id']), host['host_name'])
+                          for host in data['host_list']])
+        except Exception, e:
+            for _i, _d, result in batch:
+                result.send_exception(e)
+            return
+        LOG.debug(_("Quantum service returned hosts: %s") % hosts)
+        for instance_id, _d, result in batch:
+            result.send(hosts.get(str(instance_id)))
 
 
 class QuantumPortAwareScheduler(driver.Scheduler):
@@ -49,11 +131,14 @@ class QuantumPortAwareScheduler(driver.Scheduler):
     Obtains the hostname from Quantum using an extension API
     """
     def __init__(self):
+        self._batcher = HostScheduleBatcher(
+            _client(TENANT_ID, ACTION_PREFIX_CSCO),
+            FLAGS.quantum_schedule_batch_window,
+            FLAGS.quantum_schedule_batch_size)
         # We have to send a dummy tenant name here since the client
         # needs some tenant name, but the tenant name will not be used
         # since the extensions URL does not require it
-        client = Client(HOST, PORT, USE_SSL, format='json',
-                        action_prefix=ACTION_PREFIX_EXT, tenant="dummy")
+        client = _client("dummy", ACTION_PREFIX_EXT)
         request_url = "/extensions"
         data = client.do_request('GET', request_url)
         LOG.debug("Obtained supported extensions from Quantum: %s" % data)
@@ -75,19 +160,9 @@ class QuantumPortAwareScheduler(driver.Scheduler):
         project_id = \
                 kwargs['request_spec']['instance_properties']['project_id']
 
-        instance_data_dict = \
-                {'novatenant': \
-                 {'instance_id': instance_id,
-                  'instance_desc': \
-                  {'user_id': user_id,
-                   'project_id': project_id}}}
-
-        client = Client(HOST, PORT, USE_SSL, format='json', tenant=TENANT_ID,
-                        action_prefix=ACTION_PREFIX_CSCO)
-        request_url = "/novatenants/" + project_id + ACTION
-        data = client.do_request('PUT', request_url, body=instance_data_dict)
-
-        hostname = data["host_list"]["host_1"]
+        hostname = self._batcher.schedule(instance_id,
+                                          {'user_id': user_id,
+                                           'project_id': project_id})
         if not hostname:
             raise driver.NoValidHost(_("Scheduler was unable to locate a host"
                                        " for this request. Is the appropriate"
@@ -25,8 +25,7 @@ from nova.network import linux_net
 from nova.virt.libvirt import netutils
 from nova import utils
 from nova.virt.vif import VIFDriver
-from quantum.client import Client
-from quantum.common.wsgi import Serializer
+from quantum.plugins.cisco.common.cisco_client import PooledClient
 
 LOG = logging.getLogger('quantum.plugins.cisco.nova.vifdirect')
 
@@ -35,6 +34,13 @@ flags.DEFINE_string('quantum_host', "127.0.0.1",
                      'IP address of the quantum network service.')
 flags.DEFINE_integer('quantum_port', 9696,
                      'Listening port for Quantum network service')
+flags.DEFINE_integer('quantum_pool_size', 10,
+                     'Maximum number of connections to the Quantum service')
+flags.DEFINE_integer('quantum_request_timeout', 30,
+                     'Timeout of the requests to Quantum, in seconds')
+flags.DEFINE_integer('quantum_request_retries', 3,
+                     'Number of retries of a request to Quantum failing '
+                     'on a connection error')
 
 HOST = FLAGS.quantum_host
 PORT = FLAGS.quantum_port
@@ -49,14 +55,23 @@ ASSOCIATE_ACTION = '/associate_port'
 DETACH_ACTION = '/detach_port'
 
 
+def _client(tenant, action_prefix):
+    """Quantum client sending its requests over the shared pool"""
+    return PooledClient(HOST, PORT, USE_SSL,
+                        pool_size=FLAGS.quantum_pool_size,
+                        timeout=FLAGS.quantum_request_timeout,
+                        retries=FLAGS.quantum_request_retries,
+                        format='json', tenant=tenant,
+                        action_prefix=action_prefix)
+
+
 class Libvirt802dot1QbhDriver(VIFDriver):
     """VIF driver for 802.1Qbh"""
     def __init__(self):
         # We have to send a dummy tenant name here since the client
         # needs some tenant name, but the tenant name will not be used
         # since the extensions URL does not require it
-        client = Client(HOST, PORT, USE_SSL, format='json',
-                        action_prefix=ACTION_PREFIX_EXT, tenant="dummy")
+        client = _client("dummy", ACTION_PREFIX_EXT)
         request_url = "/extensions"
         data = client.do_request('GET', request_url)
         LOG.debug("Obtained supported extensions from Quantum: %s" % data)
@@ -87,8 +102,7 @@ class Libvirt802dot1QbhDriver(VIFDriver):
                    'project_id': project_id,
                    'vif_id': vif_id}}}
 
-        client = Client(HOST, PORT, USE_SSL, format='json', tenant=TENANT_ID,
-                        action_prefix=ACTION_PREFIX_CSCO)
+        client = _client(TENANT_ID, ACTION_PREFIX_CSCO)
         request_url = "/novatenants/" + project_id + action
         data = client.do_request('PUT', request_url, body=instance_data_dict)
 
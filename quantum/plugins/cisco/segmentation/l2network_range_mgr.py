@@ -0,0 +1,165 @@
+"""
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2011 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+"""
+
+from bisect import bisect_right
+import logging
+
+from quantum.plugins.cisco import l2network_plugin_configuration as conf
+from quantum.plugins.cisco.common import cisco_constants as const
+from quantum.plugins.cisco.common import cisco_exceptions as cexc
+from quantum.plugins.cisco.db import l2network_db as cdb
+from quantum.plugins.cisco.l2network_segmentation_base \
+        import L2NetworkSegmentationMgrBase
+
+LOG = logging.getLogger(__name__)
+
+
+class FreeExtents(object):
+    """
+    Free IDs of a range, kept as sorted disjoint [start, end] extents so
+    that the size does not depend on the size of the range. IDs are
+    located by bisection.
+    """
+
+    def __init__(self, start, end, used_ids=()):
+        self._starts = []
+        self._ends = []
+        next_free = start
+        for used_id in sorted(used_ids):
+            if used_id < next_free or used_id > end:
+                continue
+            if used_id > next_free:
+                self._starts.append(next_free)
+                self._ends.append(used_id - 1)
+            next_free = used_id + 1
+        if next_free <= end:
+            self._starts.append(next_free)
+            self._ends.append(end)
+
+    def __len__(self):
+        """Returns the number of extents"""
+        return len(self._starts)
+
+    def free_count(self):
+        """Returns the number of free IDs"""
+        return sum([end - start + 1
+                    for start, end in zip(self._starts, self._ends)])
+
+    def is_free(self, free_id):
+        """Checks if an ID is free"""
+        index = bisect_right(self._starts, free_id) - 1
+        return index >= 0 and free_id <= self._ends[index]
+
+    def lowest_free(self):
+        """Returns the lowest free ID, or None"""
+        if not self._starts:
+            return None
+        return self._starts[0]
+
+    def take(self, used_id):
+        """Removes an ID from the free IDs, returns False if not free"""
+        index = bisect_right(self._starts, used_id) - 1
+        if index < 0 or used_id > self._ends[index]:
+            return False
+        start = self._starts[index]
+        end = self._ends[index]
+        if start == end:
+            del self._starts[index]
+            del self._ends[index]
+        elif used_id == start:
+            self._starts[index] = used_id + 1
+        elif used_id == end:
+            self._ends[index] = used_id - 1
+        else:
+            self._ends[index] = used_id - 1
+            self._starts.insert(index + 1, used_id + 1)
+            self._ends.insert(index + 1, end)
+        return True
+
+    def put(self, free_id):
+        """Adds an ID to the free IDs, returns False if already free"""
+        index = bisect_right(self._starts, free_id)
+        if index > 0 and free_id <= self._ends[index - 1]:
+            return False
+        merge_left = index > 0 and self._ends[index - 1] == free_id - 1
+        merge_right = index < len(self._starts) and \
+                self._starts[index] == free_id + 1
+        if merge_left and merge_right:
+            self._ends[index - 1] = self._ends[index]
+            del self._starts[index]
+            del self._ends[index]
+        elif merge_left:
+            self._ends[index - 1] = free_id
+        elif merge_right:
+            self._starts[index] = free_id
+        else:
+            self._starts.insert(index, free_id)
+            self._ends.insert(index, free_id)
+        return True
+
+
+class L2NetworkRangeMgr(L2NetworkSegmentationMgrBase):
+    """
+    Segmentation Manager for large ID spaces, such as 24-bit VXLAN or GRE
+    keys. Only the reserved IDs are stored in the DB, the free IDs are
+    tracked in memory as extents and rebuilt from the DB at startup.
+    """
+    RELOAD_WINDOW = 64
+
+    def __init__(self):
+        self._start = conf.SEGMENT_START
+        self._end = conf.SEGMENT_END
+        self.reload()
+
+    def reload(self):
+        """Rebuild the free IDs from the DB"""
+        self._free = FreeExtents(self._start, self._end,
+                                 cdb.get_segmentation_ids(self._start,
+                                                          self._end))
+
+    def reserve_segmentation_id(self, tenant_id, net_name, **kwargs):
+        """Get the lowest available segmentation ID"""
+        reloaded = False
+        while True:
+            segmentation_id = self._free.lowest_free()
+            if segmentation_id is None:
+                if reloaded:
+                    raise cexc.SegmentationIDNotAvailable(
+                        range_start=self._start, range_end=self._end)
+                self.reload()
+                reloaded = True
+                continue
+            self._free.take(segmentation_id)
+            if cdb.reserve_segmentation_id(segmentation_id, tenant_id):
+                return segmentation_id
+            # Reserved by another server, and likely the IDs following it
+            LOG.debug("Segmentation ID %s already reserved" %
+                      segmentation_id)
+            for used_id in cdb.get_segmentation_ids(
+                segmentation_id, segmentation_id + self.RELOAD_WINDOW):
+                self._free.take(used_id)
+
+    def release_segmentation_id(self, tenant_id, net_id, **kwargs):
+        """Release the ID"""
+        binding = cdb.get_vlan_binding(net_id)
+        segmentation_id = binding[const.VLANID]
+        cdb.release_segmentation_id(segmentation_id)
+        if self._start <= segmentation_id <= self._end:
+            self._free.put(segmentation_id)
+        return False
@@ -27,19 +27,22 @@ Currently has four functionalities:
 """
 
 
+import contextlib
 import logging
 import logging.handlers
 import os
 import subprocess
 import re
 import sys
+import threading
+import time
 
 from optparse import OptionParser
-from quantum.client import Client
 from quantum.plugins.cisco.db import api as db
 from quantum.plugins.cisco.db import l2network_db as l2db
 from quantum.plugins.cisco.db import services_db as sdb
 from quantum.plugins.cisco.common import cisco_constants as const
+from quantum.plugins.cisco.common.cisco_client import PooledClient
 from quantum.plugins.cisco.services import services_constants as servconts
 from quantum.plugins.cisco.services import services_logistics as servlogcs
 
@@ -47,91 +50,167 @@ from quantum.plugins.cisco.services import services_logistics as servlogcs
 LOG = logging.getLogger(__name__)
 
 
+class StageTimer(object):
+    """Wall clock time of the stages of a workflow"""
+
+    def __init__(self):
+        self.stages = []
+        self._start = time.time()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        print "%s..." % name
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.time() - start))
+        print "Completed"
+
+    def report(self):
+        print "Time per stage:"
+        for name, elapsed in self.stages:
+            print "    %-48s %8.2fs" % (name, elapsed)
+        print "    %-48s %8.2fs" % ("Total", time.time() - self._start)
+
+
+def run_parallel(func, args_list):
+    """
+    Calls func with each tuple of args_list in its own thread, returns the
+    results in order and raises the first error
+    """
+    results = [None] * len(args_list)
+    errors = []
+
+    def run(idx, args):
+        try:
+            results[idx] = func(*args)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(idx, args))
+               for idx, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def boot_vm(image_id):
+    """Starts booting a VM, returns the process reporting its name"""
+    print ("Creating VM with image: %s" % (image_id))
+    return subprocess.Popen([servconts.CREATE_VM_CMD, image_id],
+                            stdout=subprocess.PIPE)
+
+
+def booted_vm_name(process):
+    """Returns the name of the VM booted by process"""
+    result = process.communicate()[0].splitlines()
+    tokens = re.search("i-[a-f0-9]*", str(result[1]))
+    return tokens.group(0)
+
+
+def delete_booted_vm(process):
+    """Deletes the VM booted by process, once its name is known"""
+    try:
+        vm_name = booted_vm_name(process)
+    except Exception:
+        LOG.exception("Unable to get the name of the VM to delete")
+        return
+    print ("Deleting VM: %s" % (vm_name))
+    subprocess.call([servconts.DELETE_VM_CMD, vm_name])
+
+
+def attach_vm_port(client, network_id, port_id):
+    """Plugs the interface of the VM associated to the port"""
+    attachment = client.show_port_attachment(network_id, port_id)
+    attachment = attachment[servconts.ATTACHMENT][servconts.ID][:36]
+    LOG.debug("Plugging virtual interface: %s into port: %s on network: %s" %
+              (attachment, port_id, network_id))
+    attach_data = {servconts.ATTACHMENT: {servconts.ID: '%s' % attachment}}
+    client.attach_resource(network_id, port_id, attach_data)
+
+
 def insert_inpath_service(tenant_id, service_image_id,
              management_net_name, northbound_net_name,
              southbound_net_name, *args):
-    """Inserting a network service between two networks"""
-    print ("Creating Network for Services and Servers")
+    """
+    Inserting a network service between two networks
+
+    The networks and their ports are created in parallel, or with one
+    multiport request for the UCS plugin, while the VM boots. With the UCS
+    plugin the VM is only booted once the ports exist, since its host is
+    the one on which they are reserved; the service is registered while
+    it boots. The VM is deleted if the networks or ports can't be created.
+    """
+    timer = StageTimer()
     service_logic = servlogcs.ServicesLogistics()
-    net_list = {}
-    multiport_net_list = []
     networks_name_list = [management_net_name, northbound_net_name, \
                           southbound_net_name]
-    client = Client(HOST, PORT, USE_SSL, format='json', tenant=tenant_id)
-    for net in networks_name_list:
-        data = {servconts.NETWORK: {servconts.NAME: net}}
-        net_list[net] = client.create_network(data)
-        net_list[net][servconts.PORTS] = []
-        LOG.debug("Network %s Created with ID: %s " % (net, \
-                        net_list[net][servconts.NETWORK][servconts.ID]))
-    print "Completed"
-    print ("Creating Ports on Services and Server Networks")
-    LOG.debug("Operation 'create_port' executed.")
-    if not service_logic.verify_plugin(const.UCS_PLUGIN):
-        for net in networks_name_list:
-            net_list[net][servconts.PORTS].append
-            (client.create_port
-            (net_list[net][servconts.NETWORK][servconts.ID]))
-        LOG.debug("Operation 'create_port' executed.")
-    else:
-        for net in networks_name_list:
-            nets = net_list[net][servconts.NETWORK][servconts.ID]
-            multiport_net_list.append(nets)
-        data = create_multiport(tenant_id, multiport_net_list)
-        net_idx = 0
-        for net in networks_name_list:
-            port_id = data[servconts.PORTS][net_idx][servconts.ID]
-            net_list[net][servconts.PORTS].append(port_id)
-            LOG.debug("Port UUID: %s on network: %s" % \
-                       (data[servconts.PORTS][net_idx][servconts.ID], net))
-            net_idx = net_idx + 1
-    print "Completed"
+    client = PooledClient(HOST, PORT, USE_SSL, format='json',
+                          tenant=tenant_id)
+    ucs_plugin = service_logic.verify_plugin(const.UCS_PLUGIN)
+    vm_process = None
+    if not ucs_plugin:
+        vm_process = boot_vm(service_image_id)
+
     try:
-        create_vm_args = []
-        create_vm_args.append(servconts.CREATE_VM_CMD)
-        create_vm_args.append(service_image_id)
-        print ("Creating VM with image: %s" % (service_image_id))
-        process = subprocess.Popen(create_vm_args, stdout=subprocess.PIPE)
-        result = process.stdout.readlines()
-        tokens = re.search("i-[a-f0-9]*", str(result[1]))
-        service_vm_name = tokens.group(0)
-        print ("Image: %s instantiated successfully" % (service_vm_name))
+        with timer.stage("Creating Network for Services and Servers"):
+            nets = run_parallel(client.create_network,
+                                [({servconts.NETWORK: {servconts.NAME: net}},)
+                                 for net in networks_name_list])
+            net_ids = [net[servconts.NETWORK][servconts.ID] for net in nets]
+            for net, net_id in zip(networks_name_list, net_ids):
+                LOG.debug("Network %s Created with ID: %s " % (net, net_id))
 
+        with timer.stage("Creating Ports on Services and Server Networks"):
+            if not ucs_plugin:
+                ports = run_parallel(client.create_port,
+                                     [(net_id,) for net_id in net_ids])
+                port_ids = [port[servconts.PORT][servconts.ID]
+                            for port in ports]
+            else:
+                data = create_multiport(tenant_id, net_ids)
+                port_ids = [port[servconts.ID]
+                            for port in data[servconts.PORTS]]
+                vm_process = boot_vm(service_image_id)
+            for net, port_id in zip(networks_name_list, port_ids):
+                LOG.debug("Port UUID: %s on network: %s" % (port_id, net))
+    except Exception:
+        if vm_process:
+            delete_booted_vm(vm_process)
+        raise
+
+    try:
+        with timer.stage("Waiting for the VM name"):
+            service_vm_name = booted_vm_name(vm_process)
+            print ("Image: %s instantiated successfully" % (service_vm_name))
     except Exception as exc:
         print exc
+        timer.report()
+        return
 
-    service_logic.image_status(service_vm_name)
-    print "Completed"
-    print "Attaching Ports To VM Service interfaces"
     try:
-        idx = 0
-        for net in networks_name_list:
-            network_id = net_list[net][servconts.NETWORK][servconts.ID]
-            port_id = net_list[net][servconts.PORTS][idx]
-            attachment = client.show_port_attachment(network_id, port_id)
-            attachment = attachment[servconts.ATTACHMENT][servconts.ID][:36]
-            LOG.debug("Plugging virtual interface: %s of VM %s \
-                            into port: %s on network: %s" %
-                            (attachment, service_vm_name, port_id, net))
-            attach_data = {servconts.ATTACHMENT: {servconts.ID: '%s' %
-                                                  attachment}}
-            client.attach_resource(network_id, port_id, attach_data)
+        with timer.stage("Registering Service in DB"):
+            l2db.initialize()
+            sdb.add_services_binding(service_vm_name, *net_ids)
     except Exception as exc:
         print exc
-    print "Completed"
+
+    with timer.stage("Waiting for the VM to run"):
+        service_logic.image_status(service_vm_name)
+
     try:
-        LOG.debug("Registering Service in DB")
-        l2db.initialize()
-        for uuid_net in db.network_id(networks_name_list[0]):
-            mngnet_id = str(uuid_net.uuid)
-        for uuid_net in db.network_id(networks_name_list[1]):
-            nbnet_id = str(uuid_net.uuid)
-        for uuid_net in db.network_id(networks_name_list[2]):
-            sbnet_id = str(uuid_net.uuid)
-        sdb.add_services_binding(service_vm_name, mngnet_id, nbnet_id,
-                                 sbnet_id)
+        with timer.stage("Attaching Ports To VM Service interfaces"):
+            run_parallel(attach_vm_port,
+                         [(client, net_id, port_id)
+                          for net_id, port_id in zip(net_ids, port_ids)])
     except Exception as exc:
         print exc
+    timer.report()
 
 
 def delete_service(tenant_id, service_instance_id, *args):
@@ -152,7 +231,8 @@ def delete_service(tenant_id, service_instance_id, *args):
     result = subprocess.call(vms_list)
     service_logic.image_shutdown_verification(service_instance_id)
 
-    client = Client(HOST, PORT, USE_SSL, format='json', tenant=tenant_id)
+    client = PooledClient(HOST, PORT, USE_SSL, format='json',
+                          tenant=tenant_id)
     service_nets = sdb.get_service_bindings(service_instance_id)
     print ("Terminating Ports and Networks")
     network_name = db.network_get(service_nets.mngnet_id)
@@ -194,7 +274,8 @@ def connect_vm(tenant_id, vm_image_id, service_instance_id, *args):
     Starts a VMs and is connected to southbound network
     """
     l2db.initialize()
-    client = Client(HOST, PORT, USE_SSL, format='json', tenant=tenant_id)
+    client = PooledClient(HOST, PORT, USE_SSL, format='json',
+                          tenant=tenant_id)
     print ("Connecting %s to Service %s " % (vm_image_id, service_instance_id))
     service_logic = servlogcs.ServicesLogistics()
     service_nets = sdb.get_service_bindings(service_instance_id)
@@ -237,8 +318,9 @@ def create_multiport(tenant_id, networks_list, *args):
                    'net_id_list': networks_list,
                    'ports_desc': {'key': 'value'}}}
     request_url = "/multiport"
-    client = Client(HOST, PORT, USE_SSL, format='json', tenant=tenant_id,
-                action_prefix=servconts.ACTION_PREFIX_CSCO)
+    client = PooledClient(HOST, PORT, USE_SSL, format='json',
+                          tenant=tenant_id,
+                          action_prefix=servconts.ACTION_PREFIX_CSCO)
     data = client.do_request('POST', request_url, body=ports_info)
     return data
 
@@ -33,3 +33,8 @@ ATTACHMENT = 'attachment'
 CREATE_VM_CMD = '/usr/bin/euca-run-instances'
 DELETE_VM_CMD = '/usr/bin/euca-terminate-instances'
 DESCRIBE_VM_CMD = '/usr/bin/euca-describe-instances'
+# Waits for the VM state, in seconds
+VM_BOOT_TIMEOUT = 120
+VM_SHUTDOWN_TIMEOUT = 60
+WAIT_INITIAL_DELAY = 0.5
+WAIT_MAX_DELAY = 8
@@ -21,10 +21,8 @@ Logistic components for Service Insertion utility
 
 import logging
 import subprocess
-import re
 import time
 
-from quantum.common import utils
 from quantum.plugins.cisco import l2network_plugin_configuration as conf
 from quantum.plugins.cisco.db import services_db as sdb
 from quantum.plugins.cisco.common import cisco_constants as const
@@ -40,49 +38,53 @@ class ServicesLogistics():
     def __init__(self):
         pass
 
-    def image_shutdown_verification(self, image_name):
+    def _describe_image(self, image_name):
+        """Returns the output lines describing the VM"""
+        process = subprocess.Popen([servconts.DESCRIBE_VM_CMD, image_name],
+                                   stdout=subprocess.PIPE)
+        return process.communicate()[0].splitlines()
+
+    def _wait_until(self, condition, timeout):
+        """
+        Checks the condition after delays growing exponentially from
+        WAIT_INITIAL_DELAY to WAIT_MAX_DELAY seconds, until it is true or
+        timeout seconds have passed, returns the last result
+        """
+        deadline = time.time() + timeout
+        delay = servconts.WAIT_INITIAL_DELAY
+        while True:
+            time.sleep(max(min(delay, deadline - time.time()), 0))
+            if condition():
+                return True
+            if time.time() >= deadline:
+                return False
+            delay = min(delay * 2, servconts.WAIT_MAX_DELAY)
+
+    def image_shutdown_verification(self, image_name,
+                                    timeout=servconts.VM_SHUTDOWN_TIMEOUT):
         """
         Verifies that the VM has been properly shutdown
         """
         try:
-            service_args = []
-            service_args.append(servconts.DESCRIBE_VM_CMD)
-            service_args.append(image_name)
-            counter = 0
-            flag = False
-            while not flag and counter <= 5:
-                counter = counter + 1
-                time.sleep(2.5)
-                process = subprocess.Popen(service_args, \
-                                           stdout=subprocess.PIPE)
-                result = process.stdout.readlines()
-                if not result:
-                    flag = True
+            return self._wait_until(
+                lambda: not self._describe_image(image_name), timeout)
         except Exception, exc:
             print exc
 
-    def image_status(self, image_name):
+    def image_status(self, image_name, timeout=servconts.VM_BOOT_TIMEOUT):
         """
         Checks the status of the image
         """
+        def running():
+            result = self._describe_image(image_name)
+            return len(result) > 1 and "running" in result[1]
+
         try:
-            service_args = []
-            service_args.append(servconts.DESCRIBE_VM_CMD)
-            service_args.append(image_name)
-            counter = 0
-            flag = False
-            while not flag and counter <= 10:
-                counter = counter + 1
-                time.sleep(2.5)
-                process = subprocess.Popen(service_args, \
-                                    stdout=subprocess.PIPE)
-                result = process.stdout.readlines()
-                if result:
-                    tokens = re.search("running", str(result[1]))
-                    if tokens:
-                        service_status = tokens.group(0)
-                        if service_status == "running":
-                            flag = True
+            if not self._wait_until(running, timeout):
+                print ("VM %s is not running after %ss" %
+                       (image_name, timeout))
+                return False
+            return True
         except Exception as exc:
             print exc
 
@@ -103,11 +105,7 @@ class ServicesLogistics():
         """
         Verifies the PlugIn available
         """
-        _plugins = {}
-        for key in conf.PLUGINS[const.PLUGINS].keys():
-            _plugins[key] = \
-                utils.import_object(conf.PLUGINS[const.PLUGINS][key])
-        if not plugin_key in _plugins.keys():
+        if not plugin_key in conf.PLUGINS[const.PLUGINS].keys():
             LOG.debug("No %s Plugin loaded" % plugin_key)
             return False
         else:
@@ -0,0 +1,91 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2011 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+"""
+Micro-benchmark of the per-call overhead of the L2Network plugin dispatch.
+
+Runs get_all_networks through the L2Network plugin (with no device plugins
+loaded, against an in-memory DB) and compares it with the DB call the
+plugin makes, db.network_list_rows, so the difference is the cost of the
+plugin and model dispatch. The cost of
+the former inspect.stack() based dispatch is reported for reference.
+
+    python -m quantum.plugins.cisco.tests.benchmark.l2network_dispatch
+"""
+
+import inspect
+import optparse
+import sys
+import timeit
+
+from quantum.plugins.cisco import l2network_plugin
+from quantum.plugins.cisco import l2network_plugin_configuration as conf
+from quantum.plugins.cisco.common import cisco_constants as const
+from quantum.plugins.cisco.db import api as db
+
+
+TENANT_ID = "benchmark_tenant"
+
+
+def _stack_func_name():
+    """The function name lookup formerly done on every call"""
+    return inspect.stack()[1][3]
+
+
+def _time_per_call(func, calls, repeat):
+    """Best time per call in microseconds"""
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=calls)) / calls * 1000000
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-n", "--networks", type="int", default=10,
+                      help="Number of networks of the tenant")
+    parser.add_option("-c", "--calls", type="int", default=1000,
+                      help="Number of calls per measurement")
+    parser.add_option("-r", "--repeat", type="int", default=5,
+                      help="Number of measurements")
+    options, _args = parser.parse_args()
+
+    db.configure_db({'sql_connection': 'sqlite:///:memory:'})
+    # Benchmark the dispatch only, without any device plugin
+    conf.PLUGINS = {const.PLUGINS: {}, const.INVENTORY: {}}
+    conf.ASYNC_PROVISIONING = False
+    plugin = l2network_plugin.L2Network()
+    for i in range(options.networks):
+        db.network_create(TENANT_ID, "net%d" % i)
+
+    db_time = _time_per_call(lambda: db.network_list_rows(TENANT_ID),
+                             options.calls, options.repeat)
+    plugin_time = _time_per_call(lambda: plugin.get_all_networks(TENANT_ID),
+                                 options.calls, options.repeat)
+    stack_time = _time_per_call(_stack_func_name, options.calls,
+                                options.repeat)
+
+    print "get_all_networks, %d networks, best of %d x %d calls" % \
+            (options.networks, options.repeat, options.calls)
+    print "  DB network_list_rows:        %10.1f us/call" % db_time
+    print "  L2Network.get_all_networks:  %10.1f us/call" % plugin_time
+    print "  plugin overhead:             %10.1f us/call" % \
+            (plugin_time - db_time)
+    print "  inspect.stack() lookup:      %10.1f us/call (former dispatch, " \
+          "paid twice per call)" % stack_time
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2012 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+"""
+
+import BaseHTTPServer
+import logging as LOG
+import socket
+import threading
+import unittest
+
+from quantum.plugins.cisco.common import cisco_client
+
+LOG.basicConfig(level=LOG.WARN)
+LOG.getLogger(__name__)
+
+
+class KeepAliveHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Answers every request, closes the connection after /close, and
+    without answering on /drop
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self.server.requests.append(self.path)
+        if self.path == "/drop":
+            self.close_connection = True
+            return
+        body = self.path
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Closed without telling the client, as an idle timeout does
+        self.close_connection = self.path == "/close"
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingPool(cisco_client.ConnectionPool):
+
+    opened = 0
+
+    def _new_connection(self):
+        self.opened += 1
+        return cisco_client.ConnectionPool._new_connection(self)
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0),
+                                                KeepAliveHandler)
+        self.server.connections = set()
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.pool = CountingPool("127.0.0.1", self.server.server_port,
+                                 timeout=5, backoff=0)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive(self):
+        LOG.debug("test_keep_alive - START")
+        for i in range(5):
+            response = self.pool.send("GET", "/networks/%s" % i)
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.read(), "/networks/%s" % i)
+        self.assertEqual(self.pool.opened, 1)
+        self.assertEqual(len(self.server.connections), 1)
+        LOG.debug("test_keep_alive - END")
+
+    def test_closed_connection_is_replaced(self):
+        LOG.debug("test_closed_connection_is_replaced - START")
+        self.pool.send("GET", "/close")
+        response = self.pool.send("GET", "/networks")
+        self.assertEqual(response.read(), "/networks")
+        self.assertEqual(self.pool.opened, 2)
+        LOG.debug("test_closed_connection_is_replaced - END")
+
+    def test_connection_error_retries(self):
+        LOG.debug("test_connection_error_retries - START")
+        self.server.shutdown()
+        self.server.server_close()
+        pool = CountingPool("127.0.0.1", self.server.server_port, retries=2,
+                            backoff=0)
+        self.assertRaises(socket.error, pool.send, "GET", "/networks")
+        self.assertEqual(pool.opened, 3)
+        LOG.debug("test_connection_error_retries - END")
+
+    def test_sent_request_is_not_retried(self):
+        LOG.debug("test_sent_request_is_not_retried - START")
+        self.assertRaises(cisco_client.httplib.HTTPException,
+                          self.pool.send, "GET", "/drop")
+        self.assertEqual(self.server.requests, ["/drop"])
+        self.assertEqual(self.pool.opened, 1)
+        LOG.debug("test_sent_request_is_not_retried - END")
+
+    def test_get_pool(self):
+        LOG.debug("test_get_pool - START")
+        pool = cisco_client.get_pool("127.0.0.1", 9696)
+        self.assertTrue(cisco_client.get_pool("127.0.0.1", "9696") is pool)
+        self.assertFalse(cisco_client.get_pool("127.0.0.1", 9696, True) is
+                         pool)
+        LOG.debug("test_get_pool - END")
@@ -506,6 +506,7 @@ class NovatenantExtensionTest(unittest.TestCase):
         parent_resource = dict(member_name="tenant",
                                collection_name="extensions/csco/tenants")
         member_actions = {'schedule_host': "PUT",
+                          'schedule_hosts': "PUT",
                           'associate_port': "PUT"}
         controller = novatenant.NovatenantsController(
                                QuantumManager.get_plugin())
@@ -545,6 +546,48 @@ class NovatenantExtensionTest(unittest.TestCase):
         self.assertEqual(400, host_response.status_int)
         LOG.debug("test_schedule_hostBADRequest - END")
 
+    def test_schedule_hosts(self):
+        """ Test get hosts of several instances"""
+        LOG.debug("test_schedule_hosts - START")
+        instance = self.test_associate_data['novatenant']
+        req_body = json.dumps({'novatenant': {'instances': [instance]}})
+        hosts_path = self.novatenants_path + "001/schedule_hosts"
+        hosts_response = self.test_app.put(
+                                  hosts_path, req_body,
+                                  content_type=self.contenttype)
+        self.assertEqual(200, hosts_response.status_int)
+        resp_body = json.loads(hosts_response.body)
+        self.assertEqual(1, len(resp_body['host_list']))
+        self.assertEqual(instance['instance_id'],
+                         resp_body['host_list'][0]['instance_id'])
+        LOG.debug("test_schedule_hosts - END")
+
+    def test_schedule_hostsBADRequest(self):
+        """ Test get hosts with an instance without description"""
+        LOG.debug("test_schedule_hostsBADRequest - START")
+        req_body = json.dumps({'novatenant':
+                               {'instances': [{'instance_id': 1}]}})
+        hosts_path = self.novatenants_path + "001/schedule_hosts"
+        hosts_response = self.test_app.put(
+                                 hosts_path, req_body,
+                                content_type=self.contenttype, status='*')
+        self.assertEqual(400, hosts_response.status_int)
+        LOG.debug("test_schedule_hostsBADRequest - END")
+
+    def test_schedule_hostsNoProjectId(self):
+        """ Test get hosts with an instance without project_id"""
+        LOG.debug("test_schedule_hostsNoProjectId - START")
+        req_body = json.dumps({'novatenant':
+                               {'instances': [{'instance_id': 1,
+                                               'instance_desc':
+                                               {'user_id': 'root'}}]}})
+        hosts_path = self.novatenants_path + "001/schedule_hosts"
+        hosts_response = self.test_app.put(
+                                 hosts_path, req_body,
+                                content_type=self.contenttype, status='*')
+        self.assertEqual(400, hosts_response.status_int)
+        LOG.debug("test_schedule_hostsNoProjectId - END")
+
     def test_associate_port(self):
         """ Test get associate port """
         LOG.debug("test_associate_port - START")
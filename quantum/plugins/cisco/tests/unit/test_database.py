@@ -22,7 +22,10 @@ that tests the database api method calls
 import logging as LOG
 import unittest
 
+from quantum.common import exceptions as q_exc
 from quantum.plugins.cisco.common import cisco_constants as const
+from quantum.plugins.cisco.common import cisco_credentials as cred
+from quantum.plugins.cisco.common import cisco_exceptions as cexc
 
 import quantum.plugins.cisco.db.api as db
 import quantum.plugins.cisco.db.l2network_db as l2network_db
@@ -710,6 +713,25 @@ class UcsDBTest(unittest.TestCase):
         self.teardown_portbinding()
         self.teardown_network_port()
 
+    def testq_create_portbindings(self):
+        """create port bindings in bulk"""
+        net1 = self.quantum.create_network("t1", "netid1")
+        net2 = self.quantum.create_network("t1", "netid2")
+        ports = db.ports_create([net1["net-id"], net2["net-id"]])
+        self.assertTrue(len(ports) == 2)
+        ucs_db.add_portbindings([(port.uuid, "vnic%s" % i, "pp%s" % i,
+                                  "vlan%s" % i, 10 + i, None, "t1")
+                                 for i, port in enumerate(ports)])
+        self.assertRaises(cexc.PortVnicBindingAlreadyExists,
+                          ucs_db.add_portbindings,
+                          [(ports[0].uuid, "vnic2", "pp2", "vlan2", 12, None,
+                            "t1")])
+        port_bindings = self.dbtest.get_all_port_bindings()
+        self.assertTrue(len(port_bindings) == 2)
+        ucs_db.remove_portbindings([port.uuid for port in ports])
+        self.assertTrue(len(self.dbtest.get_all_port_bindings()) == 0)
+        self.teardown_network_port()
+
     def teardown_portbinding(self):
         """tear down port binding"""
         LOG.debug("Tearing Down Port Binding")
@@ -1068,6 +1090,114 @@ class L2networkDBTest(unittest.TestCase):
         self.assertFalse(used)
         #counting on default teardown here to clear db
 
+    def testn_provisioning_tasks(self):
+        """test provisioning task queue methods"""
+        net1 = self.quantum.create_network("t1", "netid1")
+        net2 = self.quantum.create_network("t1", "netid2")
+        task1 = l2network_db.add_provisioning_task("t1", net1["net-id"],
+                                                   None, "create_network",
+                                                   "[]")
+        task2 = l2network_db.add_provisioning_task("t1", net1["net-id"],
+                                                   "port1", "create_port",
+                                                   "[]")
+        task3 = l2network_db.add_provisioning_task("t1", net2["net-id"],
+                                                   None, "create_network",
+                                                   "[]")
+        self.assertEqual(l2network_db.get_provisioning_task_count(
+                                            const.TASK_PENDING), 3)
+        stale_before = task1.created_at
+        claimed = l2network_db.claim_provisioning_task("w1", stale_before)
+        self.assertEqual(claimed.id, task1.id)
+        # tasks on the same network are processed in order
+        claimed = l2network_db.claim_provisioning_task("w2", stale_before)
+        self.assertEqual(claimed.id, task3.id)
+        self.assertEqual(l2network_db.claim_provisioning_task("w3",
+                                                              stale_before),
+                         None)
+        l2network_db.remove_provisioning_task(task1.id)
+        claimed = l2network_db.claim_provisioning_task("w1", stale_before)
+        self.assertEqual(claimed.id, task2.id)
+        l2network_db.fail_provisioning_task(task3.id, "failed")
+        tasks = l2network_db.get_all_provisioning_tasks(net2["net-id"])
+        self.assertEqual(tasks[0]["status"], const.TASK_FAILED)
+        self.teardown_network()
+
+    def testo_credential_store(self):
+        """test credential store cache and write-through"""
+        cred.Store.putCredential("10.0.0.1", "admin", "secret")
+        credential = l2network_db.get_credential_name(cred.TENANT,
+                                                      "10.0.0.1")
+        self.assertEqual(credential["user_name"], "admin")
+        self.assertEqual(cred.Store.getCredential("10.0.0.1"),
+                         {const.USERNAME: "admin",
+                          const.PASSWORD: "secret"})
+        l2network_db.update_credential(cred.TENANT,
+                                       credential["credential_id"],
+                                       new_password="newsecret")
+        cred.Store.initialize()
+        self.assertEqual(cred.Store.getPassword("10.0.0.1"), "newsecret")
+        cred.Store.deleteCredential("10.0.0.1")
+        self.assertRaises(cexc.CredentialNameNotFound,
+                          cred.Store.getCredential, "10.0.0.1")
+
+    def testp_portprofiles_with_bindings(self):
+        """test listing portprofiles with their bindings"""
+        net1 = self.quantum.create_network("t1", "netid1")
+        port1 = self.quantum.create_port(net1["net-id"])
+        pp1 = self.dbtest.create_portprofile("t1", "portprofile1", 10, "qos1")
+        pp2 = self.dbtest.create_portprofile("t1", "portprofile2", 20, "qos2")
+        self.dbtest.create_pp_binding("t1", port1["port-id"],
+                                      pp1["portprofile-id"], "0")
+        pps = dict([(str(pp.uuid), port_ids) for pp, port_ids in
+                    l2network_db.get_portprofiles_with_bindings("t1")])
+        self.assertEqual(pps, {pp1["portprofile-id"]: [port1["port-id"]],
+                               pp2["portprofile-id"]: []})
+        pp, port_ids = l2network_db.get_portprofile_with_bindings(
+            "t2", pp1["portprofile-id"])
+        self.assertEqual(port_ids, [])
+
+        page1 = l2network_db.get_portprofiles_with_bindings("t1", limit=1)
+        page2 = l2network_db.get_portprofiles_with_bindings(
+            "t1", limit=1, marker=page1[0][0].uuid)
+        self.assertEqual(len(page1), 1)
+        self.assertEqual(len(page2), 1)
+        self.assertNotEqual(page1[0][0].uuid, page2[0][0].uuid)
+        self.teardown_portprofilebinding()
+        self.teardown_port()
+        self.teardown_network()
+        self.teardown_portprofile()
+
+    def testq_remove_network_cascade(self):
+        """test removing a network with its ports and bindings"""
+        net1 = self.quantum.create_network("t1", "netid1")
+        net2 = self.quantum.create_network("t1", "netid2")
+        port1 = self.quantum.create_port(net1["net-id"])
+        port2 = self.quantum.create_port(net2["net-id"])
+        self.dbtest.create_vlan_binding(10, "vlan1", net1["net-id"])
+        pp1 = self.dbtest.create_portprofile("t1", "portprofile1", 10, "qos1")
+        pp2 = self.dbtest.create_portprofile("t1", "portprofile2", 20, "qos2")
+        self.dbtest.create_pp_binding("t1", port1["port-id"],
+                                      pp1["portprofile-id"], "0")
+        self.dbtest.create_pp_binding("t1", port2["port-id"],
+                                      pp2["portprofile-id"], "0")
+        ucs_db.add_portbinding(port1["port-id"], "vnic1", "pp1", "vlan1", 10,
+                               "qos1")
+        l2network_db.remove_network_cascade(net1["net-id"])
+        nets = self.quantum.get_all_networks("t1")
+        self.assertEqual([net["net-id"] for net in nets], [net2["net-id"]])
+        self.assertEqual(self.dbtest.get_all_vlan_bindings(), [])
+        pp_bindings = self.dbtest.get_all_pp_bindings()
+        self.assertEqual([pp_binding["port-id"] for pp_binding in pp_bindings],
+                         [port2["port-id"]])
+        self.assertEqual(ucs_db.get_all_portbindings(), [])
+        self.assertRaises(q_exc.NetworkNotFound,
+                          l2network_db.remove_network_cascade,
+                          net1["net-id"])
+        self.teardown_portprofilebinding()
+        self.teardown_port()
+        self.teardown_network()
+        self.teardown_portprofile()
+
     def teardown_network(self):
         """tearDown Network table"""
         LOG.debug("Tearing Down Network")
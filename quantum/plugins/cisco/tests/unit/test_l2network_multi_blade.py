@@ -364,3 +364,64 @@ class TestMultiBlade(unittest.TestCase):
 
         self.assertEqual(self.port_id, interface[0][const.PORTID])
         LOG.debug("test_unplug_interface - END")
+
+
+class FakeDevicePlugin(object):
+    """Device plugin counting its instances"""
+    instances = 0
+
+    def __init__(self):
+        FakeDevicePlugin.instances += 1
+
+    def create_network(self, tenant_id, net_name, net_id, vlan_name,
+                       vlan_id, **kwargs):
+        return self
+
+
+class TestMultiBladeDevicePlugins(unittest.TestCase):
+    """
+    Tests for the device plugin objects of the multi-blade model
+    """
+
+    def setUp(self):
+        self._conf_plugins = conf.PLUGINS
+        self._saved = dict((name, getattr(
+            l2network_multi_blade.L2NetworkMultiBlade, name).copy())
+            for name in ('_plugins', '_plugin_functions', '_first_devices'))
+        for name in self._saved:
+            getattr(l2network_multi_blade.L2NetworkMultiBlade, name).clear()
+        conf.PLUGINS = {const.PLUGINS:
+                        {'fake_plugin': "%s.FakeDevicePlugin" % __name__},
+                        const.INVENTORY: {}}
+        FakeDevicePlugin.instances = 0
+
+    def tearDown(self):
+        conf.PLUGINS = self._conf_plugins
+        for name, saved in self._saved.items():
+            functions = getattr(l2network_multi_blade.L2NetworkMultiBlade,
+                                name)
+            functions.clear()
+            functions.update(saved)
+
+    def test_first_device_reuses_plugin(self):
+        """The plugin loaded at startup serves the first device"""
+        LOG.debug("test_first_device_reuses_plugin - START")
+        model = l2network_multi_blade.L2NetworkMultiBlade()
+        self.assertEqual(FakeDevicePlugin.instances, 1)
+        args = [tenant_id, net_name, net_id, vlan_name(net_id), vlan_id]
+        first = model._invoke_plugin('fake_plugin', 'create_network',
+                                     list(args),
+                                     {const.DEVICE_IP: "10.0.0.1"})
+        self.assertEqual(FakeDevicePlugin.instances, 1)
+        self.assertTrue(first is model._plugins['fake_plugin'])
+
+        # Other devices get their own plugin object
+        second = model._invoke_plugin('fake_plugin', 'create_network',
+                                      list(args),
+                                      {const.DEVICE_IP: "10.0.0.2"})
+        self.assertEqual(FakeDevicePlugin.instances, 2)
+        self.assertFalse(second is first)
+        self.assertTrue(model._invoke_plugin(
+            'fake_plugin', 'create_network', list(args),
+            {const.DEVICE_IP: "10.0.0.1"}) is first)
+        LOG.debug("test_first_device_reuses_plugin - END")
@@ -0,0 +1,106 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2012 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import logging
+import unittest
+
+import eventlet
+
+from quantum.api.api_common import OperationalStatus
+from quantum import metrics
+from quantum.plugins.cisco.common import cisco_constants as const
+from quantum.plugins.cisco.db import api as db
+from quantum.plugins.cisco.db import l2network_db as cdb
+from quantum.plugins.cisco import l2network_provisioning
+
+
+LOG = logging.getLogger('quantum.tests.test_l2network_provisioning')
+
+
+class TestProvisioningQueue(unittest.TestCase):
+
+    def setUp(self):
+        db.configure_db({'sql_connection': 'sqlite:///:memory:'})
+        metrics.REGISTRY.reset()
+        self.tenant_id = "test_tenant_cisco1"
+        self.net_id = db.network_create(self.tenant_id, "net1").uuid
+        self.calls = []
+        self.queue = l2network_provisioning.ProvisioningQueue(
+            self._invoke, workers=1, poll_interval=0.01, task_timeout=5)
+
+    def tearDown(self):
+        self.queue.stop()
+        db.clear_db()
+
+    def _invoke(self, function_name, args):
+        self.calls.append((function_name, args))
+        if function_name == "fail":
+            raise Exception("device error")
+        if function_name == "sleep":
+            eventlet.sleep(args[0])
+
+    def _enqueue(self, function_name, args):
+        return self.queue.enqueue(self.tenant_id, self.net_id, None,
+                                  function_name, args)
+
+    def test_enqueue_and_wait(self):
+        LOG.debug("test_enqueue_and_wait - START")
+        self._enqueue("create_network", [self.tenant_id, "net1"])
+        self.assertTrue(self.queue.wait(self.net_id))
+        self.assertEqual(self.calls,
+                         [("create_network", [self.tenant_id, "net1"])])
+        self.assertEqual(db.network_get(self.net_id).op_status,
+                         OperationalStatus.UP)
+        self.assertEqual(cdb.get_all_provisioning_tasks(self.net_id), [])
+
+        stats = self.queue.get_stats()
+        self.assertEqual(stats[const.PROVISIONING_QUEUE_DEPTH], 0)
+        self.assertEqual(stats[const.PROVISIONING_COMPLETED], 1)
+        self.assertEqual(stats[const.PROVISIONING_FAILED], 0)
+        self.assertTrue(stats[const.PROVISIONING_MAX_LATENCY] >= 0)
+        snapshot = metrics.REGISTRY.snapshot()
+        self.assertEqual(
+            snapshot['counters']["cisco.provisioning.completed"], 1)
+        self.assertEqual(
+            snapshot['histograms']["cisco.provisioning.latency"]['count'], 1)
+        self.assertEqual(snapshot['gauges']["cisco.provisioning.running"], 0)
+        LOG.debug("test_enqueue_and_wait - END")
+
+    def test_wait_timeout(self):
+        LOG.debug("test_wait_timeout - START")
+        self._enqueue("sleep", [0.5])
+        self.assertFalse(self.queue.wait(self.net_id, timeout=0.1))
+        self.assertEqual(self.queue.get_stats()[const.PROVISIONING_RUNNING],
+                         1)
+        self.assertTrue(self.queue.wait(self.net_id))
+        LOG.debug("test_wait_timeout - END")
+
+    def test_failed_task(self):
+        LOG.debug("test_failed_task - START")
+        self._enqueue("fail", [])
+        self.assertTrue(self.queue.wait(self.net_id))
+        tasks = cdb.get_all_provisioning_tasks(self.net_id)
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(tasks[0]["status"], const.TASK_FAILED)
+        self.assertEqual(db.network_get(self.net_id).op_status,
+                         OperationalStatus.DOWN)
+        self.assertEqual(self.queue.get_stats()[const.PROVISIONING_FAILED],
+                         1)
+        self.assertEqual(
+            metrics.REGISTRY.snapshot()['counters']
+            ["cisco.provisioning.failed"], 1)
+        LOG.debug("test_failed_task - END")
@@ -0,0 +1,189 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2012 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import logging
+import re
+import unittest
+
+from quantum.plugins.cisco.common import cisco_credentials as cred
+from quantum.plugins.cisco.db import api as db
+from quantum.plugins.cisco.db import nexus_db as nxos_db
+from quantum.plugins.cisco.nexus import cisco_nexus_configuration as conf
+from quantum.plugins.cisco.nexus import cisco_nexus_network_driver
+from quantum.plugins.cisco.nexus import cisco_nexus_plugin
+from quantum.plugins.cisco.nexus import cisco_nexus_snippets as snipp
+
+
+LOG = logging.getLogger('quantum.tests.test_nexus_driver')
+
+FIRST_PORT = "1/10"
+SECOND_PORT = "1/11"
+
+
+class FakeNexusManager(object):
+    """
+    Stands for an ncclient manager connected to a Nexus switch, with the
+    VLANs allowed on its trunk interfaces, recording the configurations
+    """
+
+    def __init__(self, trunk_vlans):
+        self.trunk_vlans = trunk_vlans
+        self.configs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def get(self, filter):
+        interface = re.search(r'<interface>([^<]*)</interface>',
+                              filter[1]).group(1)
+        if interface not in self.trunk_vlans:
+            return "<rpc-reply><data/></rpc-reply>"
+        return ("<rpc-reply><data><trunk_vlans>\n  %s\n</trunk_vlans>"
+                "</data></rpc-reply>" % self.trunk_vlans[interface])
+
+    def edit_config(self, target, config):
+        self.configs.append(config)
+
+
+class FakeNexusDriver(cisco_nexus_network_driver.CiscoNEXUSDriver):
+    """Nexus driver connected to a FakeNexusManager"""
+
+    manager = FakeNexusManager({})
+
+    def nxos_connect(self, nexus_host, nexus_ssh_port, nexus_user,
+                     nexus_password):
+        return self.manager
+
+
+class FakeEventlet(object):
+    """Records the greenthreads spawned by the Nexus plugin"""
+
+    def __init__(self):
+        self.spawned = []
+
+    def spawn(self, func, *args):
+        self.spawned.append((func, args))
+
+
+class TestNexusDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = FakeNexusDriver()
+
+    def _sync(self, trunk_vlans, interface_vlans):
+        self.driver.manager = FakeNexusManager(trunk_vlans)
+        return self.driver.sync_vlans(interface_vlans, "1.1.1.1", "admin",
+                                      "secret", "22")
+
+    def _trunk_config(self, interface, vlans):
+        return self.driver.create_xml_snippet(
+            snipp.CMD_VLAN_INT_SNIPPET % (interface, vlans))
+
+    def test_get_vlans_on_trunk_int(self):
+        LOG.debug("test_get_vlans_on_trunk_int - START")
+        manager = FakeNexusManager({FIRST_PORT: "10-12,305"})
+        self.assertEqual(
+            self.driver.get_vlans_on_trunk_int(manager, FIRST_PORT),
+            set([10, 11, 12, 305]))
+        self.assertEqual(
+            self.driver.get_vlans_on_trunk_int(manager, SECOND_PORT), set())
+        LOG.debug("test_get_vlans_on_trunk_int - END")
+
+    def test_sync_vlans_already_present(self):
+        LOG.debug("test_sync_vlans_already_present - START")
+        resynced = self._sync({FIRST_PORT: "10-12"},
+                              {FIRST_PORT: set(["10", 11, 12]),
+                               SECOND_PORT: set()})
+        self.assertEqual(resynced, [])
+        self.assertEqual(self.driver.manager.configs, [])
+        LOG.debug("test_sync_vlans_already_present - END")
+
+    def test_sync_vlans_added(self):
+        LOG.debug("test_sync_vlans_added - START")
+        resynced = self._sync({FIRST_PORT: "10-11", SECOND_PORT: "10-12"},
+                              {FIRST_PORT: set([10, 11, 12]),
+                               SECOND_PORT: set([10, 11, 12])})
+        self.assertEqual(resynced, [FIRST_PORT])
+        self.assertEqual(self.driver.manager.configs,
+                         [self._trunk_config(FIRST_PORT, "10-12")])
+        LOG.debug("test_sync_vlans_added - END")
+
+    def test_sync_vlans_removed(self):
+        LOG.debug("test_sync_vlans_removed - START")
+        resynced = self._sync({FIRST_PORT: "10-12,305", SECOND_PORT: "305"},
+                              {FIRST_PORT: set([10, 11, 12]),
+                               SECOND_PORT: set()})
+        self.assertEqual(sorted(resynced), [FIRST_PORT, SECOND_PORT])
+        self.assertEqual(sorted(self.driver.manager.configs),
+                         sorted([self._trunk_config(FIRST_PORT, "10-12"),
+                                 self._trunk_config(SECOND_PORT, "none")]))
+        LOG.debug("test_sync_vlans_removed - END")
+
+
+class TestNexusPluginSync(unittest.TestCase):
+
+    def setUp(self):
+        db.configure_db({'sql_connection': 'sqlite:///:memory:'})
+        cred.Store.putCredential(conf.NEXUS_IP_ADDRESS, "admin", "secret")
+        self._nexus_driver = conf.NEXUS_DRIVER
+        self._sync_interval = conf.NEXUS_SYNC_INTERVAL
+        self._eventlet = cisco_nexus_plugin.eventlet
+        conf.NEXUS_DRIVER = "%s.FakeNexusDriver" % __name__
+        cisco_nexus_plugin.eventlet = FakeEventlet()
+        cisco_nexus_plugin.NexusPlugin._synced_switches.clear()
+
+    def tearDown(self):
+        conf.NEXUS_DRIVER = self._nexus_driver
+        conf.NEXUS_SYNC_INTERVAL = self._sync_interval
+        cisco_nexus_plugin.eventlet = self._eventlet
+        cisco_nexus_plugin.NexusPlugin._synced_switches.clear()
+        db.clear_db()
+
+    def test_sync_loop_disabled(self):
+        LOG.debug("test_sync_loop_disabled - START")
+        for interval in (0, -1):
+            conf.NEXUS_SYNC_INTERVAL = interval
+            cisco_nexus_plugin.NexusPlugin()
+        self.assertEqual(cisco_nexus_plugin.eventlet.spawned, [])
+        LOG.debug("test_sync_loop_disabled - END")
+
+    def test_sync_loop_enabled(self):
+        LOG.debug("test_sync_loop_enabled - START")
+        conf.NEXUS_SYNC_INTERVAL = 30
+        plugin = cisco_nexus_plugin.NexusPlugin()
+        # Another plugin object for the same switch does not start a
+        # second loop
+        cisco_nexus_plugin.NexusPlugin()
+        self.assertEqual(cisco_nexus_plugin.eventlet.spawned,
+                         [(plugin._sync_vlans_loop, (30,))])
+        LOG.debug("test_sync_loop_enabled - END")
+
+    def test_sync_vlans_from_bindings(self):
+        LOG.debug("test_sync_vlans_from_bindings - START")
+        conf.NEXUS_SYNC_INTERVAL = 0
+        plugin = cisco_nexus_plugin.NexusPlugin()
+        plugin._nexus_first_port = FIRST_PORT
+        plugin._nexus_second_port = SECOND_PORT
+        nxos_db.add_nexusport_binding(FIRST_PORT, 267)
+        nxos_db.add_nexusport_binding(SECOND_PORT, 267)
+        plugin._client.manager = FakeNexusManager({FIRST_PORT: "267",
+                                                   SECOND_PORT: "267,268"})
+        self.assertEqual(plugin.sync_vlans(), [SECOND_PORT])
+        LOG.debug("test_sync_vlans_from_bindings - END")
@@ -22,6 +22,7 @@ from quantum.plugins.cisco.common import cisco_credentials as creds
 from quantum.plugins.cisco.db import l2network_db as cdb
 from quantum.plugins.cisco.db import api as db
 from quantum.plugins.cisco.common import cisco_credentials as cred
+from quantum.plugins.cisco.common import cisco_utils as cutil
 from quantum.plugins.cisco.nexus import cisco_nexus_plugin
 
 LOG = logging.getLogger('quantum.tests.test_nexus')
@@ -287,6 +288,21 @@ class TestNexusPlugin(unittest.TestCase):
         self.tearDownNetwork(tenant_id, new_net_dict[const.NET_ID])
         LOG.debug("test_get_vlan_id_for_network - END")
 
+    def test_vlan_ranges(self):
+        """
+        Tests compression and expansion of the trunk VLAN range syntax.
+        """
+
+        LOG.debug("test_vlan_ranges - START")
+        vlan_ids = [305, 10, 12, 11, "200", 201, 12]
+        vlan_ranges = cutil.make_vlan_ranges(vlan_ids)
+        self.assertEqual(vlan_ranges, "10-12,200-201,305")
+        self.assertEqual(cutil.parse_vlan_ranges(vlan_ranges),
+                         set([10, 11, 12, 200, 201, 305]))
+        self.assertEqual(cutil.make_vlan_ranges([]), "")
+        self.assertEqual(cutil.parse_vlan_ranges("none"), set())
+        LOG.debug("test_vlan_ranges - END")
+
     def create_network(self, tenant_id, net_name):
         """Create a network"""
         net_dict = {}
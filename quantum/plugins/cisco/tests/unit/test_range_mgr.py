@@ -0,0 +1,115 @@
+"""
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2011 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+"""
+
+import unittest
+import logging as LOG
+
+from quantum.plugins.cisco import l2network_plugin_configuration as conf
+from quantum.plugins.cisco.common import cisco_exceptions as c_exc
+from quantum.plugins.cisco.db import api as db
+from quantum.plugins.cisco.db import l2network_db as cdb
+from quantum.plugins.cisco.segmentation import l2network_range_mgr
+from quantum.plugins.cisco.segmentation.l2network_range_mgr \
+                                import L2NetworkRangeMgr
+
+LOG.basicConfig(level=LOG.WARN)
+LOG.getLogger(__name__)
+
+
+class Test_Free_Extents(unittest.TestCase):
+
+    def test_take_put(self):
+        LOG.debug("test_take_put - START")
+        free = l2network_range_mgr.FreeExtents(1, 16777215, [1, 5])
+        self.assertEqual(len(free), 2)
+        self.assertEqual(free.lowest_free(), 2)
+        self.assertTrue(free.take(1000))
+        self.assertFalse(free.take(1000))
+        self.assertFalse(free.is_free(1000))
+        self.assertEqual(len(free), 3)
+        self.assertEqual(free.free_count(), 16777215 - 3)
+        self.assertTrue(free.put(1000))
+        self.assertFalse(free.put(1000))
+        self.assertTrue(free.put(5))
+        self.assertEqual(len(free), 1)
+        self.assertEqual(free.free_count(), 16777215 - 1)
+        LOG.debug("test_take_put - END")
+
+
+class Test_L2Network_Range_Mgr(unittest.TestCase):
+
+    def setUp(self):
+        db.configure_db({'sql_connection': 'sqlite:///:memory:'})
+        cdb.initialize()
+        self.tenant_id = "network_admin"
+        self.net_name = "TestNetwork1"
+        self.vlan_name = "TestVlan1"
+        self.range_mgr = L2NetworkRangeMgr()
+
+    def tearDown(self):
+        db.clear_db()
+
+    def test_reserve_segmentation_id(self):
+        LOG.debug("test_reserve_segmentation_id - START")
+        segmentation_id = self.range_mgr.reserve_segmentation_id(
+            self.tenant_id, self.net_name)
+        self.assertEqual(segmentation_id, conf.SEGMENT_START)
+        self.assertEqual(cdb.get_segmentation_ids(conf.SEGMENT_START,
+                                                  conf.SEGMENT_END),
+                         [segmentation_id])
+        LOG.debug("test_reserve_segmentation_id - END")
+
+    def test_reserve_segmentation_id_shared(self):
+        LOG.debug("test_reserve_segmentation_id_shared - START")
+        # Another server allocating from the same DB
+        other_mgr = L2NetworkRangeMgr()
+        segmentation_id = self.range_mgr.reserve_segmentation_id(
+            self.tenant_id, self.net_name)
+        other_id = other_mgr.reserve_segmentation_id(self.tenant_id,
+                                                     self.net_name)
+        self.assertEqual(other_id, segmentation_id + 1)
+        LOG.debug("test_reserve_segmentation_id_shared - END")
+
+    def test_release_segmentation_id(self):
+        LOG.debug("test_release_segmentation_id - START")
+        net = db.network_create(self.tenant_id, self.net_name)
+        segmentation_id = self.range_mgr.reserve_segmentation_id(
+            self.tenant_id, self.net_name)
+        cdb.add_vlan_binding(segmentation_id, self.vlan_name, net.uuid)
+        self.range_mgr.release_segmentation_id(self.tenant_id, net.uuid)
+        self.assertEqual(cdb.get_segmentation_ids(conf.SEGMENT_START,
+                                                  conf.SEGMENT_END), [])
+        self.assertEqual(self.range_mgr.reserve_segmentation_id(
+            self.tenant_id, self.net_name), segmentation_id)
+        LOG.debug("test_release_segmentation_id - END")
+
+    def test_reserve_segmentation_id_NA(self):
+        LOG.debug("test_reserve_segmentation_id_NA - START")
+        segment_range = conf.SEGMENT_START, conf.SEGMENT_END
+        conf.SEGMENT_START, conf.SEGMENT_END = 1, 1
+        try:
+            range_mgr = L2NetworkRangeMgr()
+            range_mgr.reserve_segmentation_id(self.tenant_id, self.net_name)
+            self.assertRaises(c_exc.SegmentationIDNotAvailable,
+                              range_mgr.reserve_segmentation_id,
+                              self.tenant_id,
+                              self.net_name)
+        finally:
+            conf.SEGMENT_START, conf.SEGMENT_END = segment_range
+        LOG.debug("test_reserve_segmentation_id_NA - END")
@@ -18,6 +18,7 @@
 # @author: Sumit Naiksatam, Cisco Systems, Inc.
 #
 """
+from collections import deque
 from copy import deepcopy
 import logging
 
@@ -79,6 +80,12 @@ const.PROFILE_ID
 const.INSTANCE_ID
 const.VIF_ID
 """
+"""
+_rsvd_intf_index holds, by tenant, the reserved interfaces which are not
+yet assigned to an instance, in the order of their reservation:
+{tenant_id: deque([(ucsm_ip, chassis_id, blade_id, blade-intf-dn), ...])}
+The entries are checked against _inventory_state when they are used.
+"""
 
 
 class UCSInventory(L2NetworkDeviceInventoryBase):
@@ -90,6 +97,7 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
     _inventory = {}
     _host_names = {}
     _inventory_state = {}
+    _rsvd_intf_index = {}
 
     def __init__(self):
         self._client = cisco_ucs_network_driver.CiscoUCSMDriver()
@@ -126,8 +134,9 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
         """Populate the state of all the blades"""
         for ucsm_ip in self._inventory.keys():
             self._inventory_state[ucsm_ip] = {ucsm_ip: {}}
-            ucsm_username = cred.Store.getUsername(ucsm_ip)
-            ucsm_password = cred.Store.getPassword(ucsm_ip)
+            credential = cred.Store.getCredential(ucsm_ip)
+            ucsm_username = credential[const.USERNAME]
+            ucsm_password = credential[const.PASSWORD]
             chasses_state = {}
             self._inventory_state[ucsm_ip] = chasses_state
             ucsm = self._inventory[ucsm_ip]
@@ -142,9 +151,73 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
                                                                ucsm_password)
                     blades_dict[blade_id] = blade_data
 
+        self._build_rsvd_intf_index()
         LOG.debug("UCS Inventory state is: %s\n" % self._inventory_state)
         return True
 
+    def _build_rsvd_intf_index(self):
+        """Index the reserved interfaces not assigned to an instance"""
+        self._rsvd_intf_index.clear()
+        for ucsm_ip in self._inventory_state.keys():
+            ucsm = self._inventory_state[ucsm_ip]
+            for chassis_id in ucsm.keys():
+                for blade_id in ucsm[chassis_id]:
+                    blade_data = ucsm[chassis_id][blade_id]
+                    blade_intf_data = blade_data[const.BLADE_INTF_DATA]
+                    for blade_intf in blade_intf_data.keys():
+                        intf_data = blade_intf_data[blade_intf]
+                        if self._is_unassigned_rsvd_intf(intf_data):
+                            self._index_rsvd_intf(intf_data[const.TENANTID],
+                                                  ucsm_ip, chassis_id,
+                                                  blade_id, blade_intf)
+
+    def _is_unassigned_rsvd_intf(self, intf_data, tenant_id=None):
+        """
+        Return True if the interface is reserved, for tenant_id if given,
+        and not assigned to an instance
+        """
+        return (intf_data[const.BLADE_INTF_RESERVATION] ==
+                const.BLADE_INTF_RESERVED and
+                intf_data[const.TENANTID] is not None and
+                (tenant_id is None or
+                 intf_data[const.TENANTID] == tenant_id) and
+                intf_data[const.INSTANCE_ID] is None)
+
+    def _index_rsvd_intf(self, tenant_id, ucsm_ip, chassis_id, blade_id,
+                         blade_intf):
+        """Add a reserved interface to the index of its tenant"""
+        self._rsvd_intf_index.setdefault(tenant_id, deque()).append(
+            (ucsm_ip, chassis_id, blade_id, blade_intf))
+
+    def _unindex_rsvd_intf(self, tenant_id, ucsm_ip, chassis_id, blade_id,
+                           blade_intf):
+        """Remove a reserved interface from the index of its tenant"""
+        try:
+            self._rsvd_intf_index[tenant_id].remove(
+                (ucsm_ip, chassis_id, blade_id, blade_intf))
+        except (KeyError, ValueError):
+            pass
+
+    def _pop_rsvd_intf(self, tenant_id):
+        """
+        Return the first reserved interface of the tenant not assigned to
+        an instance, as (ucsm_ip, chassis_id, blade_id, blade_intf,
+        intf_data), and remove it from the index. The entries which no
+        longer match the inventory state are dropped.
+        """
+        index = self._rsvd_intf_index.get(tenant_id)
+        while index:
+            ucsm_ip, chassis_id, blade_id, blade_intf = index.popleft()
+            try:
+                blade_data = \
+                        self._inventory_state[ucsm_ip][chassis_id][blade_id]
+                intf_data = blade_data[const.BLADE_INTF_DATA][blade_intf]
+            except KeyError:
+                continue
+            if self._is_unassigned_rsvd_intf(intf_data, tenant_id):
+                return ucsm_ip, chassis_id, blade_id, blade_intf, intf_data
+        return None
+
     def _get_host_name(self, ucsm_ip, chassis_id, blade_id):
         """Get the hostname based on the blade info"""
         host_key = ucsm_ip + "-" + chassis_id + "-" + blade_id
@@ -263,36 +336,49 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
         device_params = {const.DEVICE_IP: [rsvd_info[const.UCSM_IP]]}
         return device_params
 
+    def _assign_rsvd_intf(self, tenant_id, instance_id):
+        """
+        Assign a reserved interface of the tenant to the instance in the
+        inventory state, return the hostname of its blade and the port
+        bound to the interface
+        """
+        rsvd_intf = self._pop_rsvd_intf(tenant_id)
+        if not rsvd_intf:
+            LOG.warn("Could not find a reserved dynamic nic for tenant: %s" %
+                     tenant_id)
+            return None, None
+        ucsm_ip, chassis_id, blade_id, blade_intf, intf_data = rsvd_intf
+        intf_data[const.INSTANCE_ID] = instance_id
+        host_name = self._get_host_name(ucsm_ip, chassis_id, blade_id)
+        return host_name, intf_data[const.PORTID]
+
     def _get_host_name_for_rsvd_intf(self, tenant_id, instance_id):
         """
         Return the hostname of the blade with a reserved instance
         for this tenant
         """
-        for ucsm_ip in self._inventory_state.keys():
-            ucsm = self._inventory_state[ucsm_ip]
-            for chassis_id in ucsm.keys():
-                for blade_id in ucsm[chassis_id]:
-                    blade_data = ucsm[chassis_id][blade_id]
-                    blade_intf_data = blade_data[const.BLADE_INTF_DATA]
-                    for blade_intf in blade_intf_data.keys():
-                        tmp = deepcopy(blade_intf_data[blade_intf])
-                        intf_data = blade_intf_data[blade_intf]
-                        if (intf_data[const.BLADE_INTF_RESERVATION] ==
-                           const.BLADE_INTF_RESERVED and
-                           intf_data[const.TENANTID] == tenant_id and
-                           intf_data[const.INSTANCE_ID] is None):
-                            intf_data[const.INSTANCE_ID] = instance_id
-                            host_name = self._get_host_name(ucsm_ip,
-                                                            chassis_id,
-                                                            blade_id)
-                            port_binding = udb.get_portbinding_dn(blade_intf)
-                            port_id = port_binding[const.PORTID]
-                            udb.update_portbinding(port_id,
-                                                   instance_id=instance_id)
-                            return host_name
-        LOG.warn("Could not find a reserved dynamic nic for tenant: %s" %
-                 tenant_id)
-        return None
+        host_name, port_id = self._assign_rsvd_intf(tenant_id, instance_id)
+        if port_id:
+            udb.update_portbinding_instance_id(port_id, instance_id)
+        return host_name
+
+    def _get_host_names_for_rsvd_intfs(self, instances):
+        """
+        Return the hostnames of the blades with reserved interfaces for a
+        list of (tenant_id, instance_id), the port bindings are updated in
+        one transaction
+        """
+        host_names = []
+        port_instances = []
+        for tenant_id, instance_id in instances:
+            host_name, port_id = self._assign_rsvd_intf(tenant_id,
+                                                        instance_id)
+            if port_id:
+                port_instances.append((port_id, instance_id))
+            host_names.append(host_name)
+        if port_instances:
+            udb.update_portbindings_instance_id(port_instances)
+        return host_names
 
     def _get_instance_port(self, tenant_id, instance_id, vif_id):
         """
@@ -372,6 +458,9 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
                            vif_id:
                             intf_data[const.VIF_ID] = None
                             intf_data[const.INSTANCE_ID] = None
+                            self._index_rsvd_intf(tenant_id, ucsm_ip,
+                                                  chassis_id, blade_id,
+                                                  blade_intf)
                             port_binding = udb.get_portbinding_dn(blade_intf)
                             port_id = port_binding[const.PORTID]
                             udb.update_portbinding(port_id, instance_id=None,
@@ -461,12 +550,14 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
         """Reload the inventory from a conf file"""
         self._load_inventory()
 
-    def reserve_blade_interface(self, ucsm_ip, chassis_id, blade_id,
-                                blade_data_dict, tenant_id, port_id,
-                                portprofile_name):
-        """Reserve an interface on a blade"""
-        ucsm_username = cred.Store.getUsername(ucsm_ip)
-        ucsm_password = cred.Store.getPassword(ucsm_ip)
+    def _get_updated_blade_intf_data(self, ucsm_ip, chassis_id, blade_id):
+        """
+        Return the interface data of a blade with its UCSM-specific state
+        read from UCSM and the other state copied from the inventory
+        """
+        credential = cred.Store.getCredential(ucsm_ip)
+        ucsm_username = credential[const.USERNAME]
+        ucsm_password = credential[const.PASSWORD]
         """
         We are first getting the updated UCSM-specific blade
         interface state
@@ -497,9 +588,16 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
                     old_intf_data[const.INSTANCE_ID]
             blade_intf_data[blade_intf][const.VIF_ID] = \
                     old_intf_data[const.VIF_ID]
+        return blade_intf_data
 
-        blade_data[const.BLADE_UNRESERVED_INTF_COUNT] = \
-                chassis_data[blade_id][const.BLADE_UNRESERVED_INTF_COUNT]
+    def reserve_blade_interface(self, ucsm_ip, chassis_id, blade_id,
+                                blade_data_dict, tenant_id, port_id,
+                                portprofile_name):
+        """Reserve an interface on a blade"""
+        blade_intf_data = self._get_updated_blade_intf_data(ucsm_ip,
+                                                            chassis_id,
+                                                            blade_id)
+        chassis_data = self._inventory_state[ucsm_ip][chassis_id]
         """
         Now we will reserve an interface if its available
         """
@@ -520,6 +618,8 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
                 """
                 chassis_data[blade_id][const.BLADE_INTF_DATA] = blade_intf_data
                 chassis_data[blade_id][const.BLADE_UNRESERVED_INTF_COUNT] -= 1
+                self._index_rsvd_intf(tenant_id, ucsm_ip, chassis_id,
+                                      blade_id, blade_intf)
                 host_name = self._get_host_name(ucsm_ip, chassis_id,
                                                        blade_id)
                 reserved_nic_dict = {const.RESERVED_NIC_HOSTNAME: host_name,
@@ -533,18 +633,75 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
                 return reserved_nic_dict
 
         LOG.warn("Dynamic nic %s could not be reserved for port-id: %s" %
-                 (blade_data, port_id))
+                 (blade_intf_data, port_id))
         return False
 
+    def reserve_blade_interfaces(self, ucsm_ip, chassis_id, blade_id,
+                                 blade_data_dict, tenant_id, port_profiles,
+                                 vlan_name, vlan_id, qos=None):
+        """
+        Reserve an interface on a blade for each (port_id, portprofile_name)
+        of port_profiles, reading the blade state once and adding the port
+        bindings in one transaction. Raise NoMoreNics if the blade does not
+        have enough unreserved interfaces.
+        """
+        blade_intf_data = self._get_updated_blade_intf_data(ucsm_ip,
+                                                            chassis_id,
+                                                            blade_id)
+        unreserved = [blade_intf for blade_intf, intf_data in
+                      sorted(blade_intf_data.items())
+                      if intf_data[const.BLADE_INTF_RESERVATION] ==
+                      const.BLADE_INTF_UNRESERVED]
+        if len(unreserved) < len(port_profiles):
+            LOG.warn("%s dynamic nics could not be reserved on blade %s" %
+                     (len(port_profiles), blade_id))
+            raise cexc.NoMoreNics()
+
+        host_name = self._get_host_name(ucsm_ip, chassis_id, blade_id)
+        reserved_nics = []
+        port_bindings = []
+        for blade_intf, (port_id, portprofile_name) in zip(unreserved,
+                                                           port_profiles):
+            intf_data = blade_intf_data[blade_intf]
+            intf_data[const.BLADE_INTF_RESERVATION] = \
+                    const.BLADE_INTF_RESERVED
+            intf_data[const.TENANTID] = tenant_id
+            intf_data[const.PORTID] = port_id
+            intf_data[const.INSTANCE_ID] = None
+            reserved_nics.append(
+                {const.RESERVED_NIC_HOSTNAME: host_name,
+                 const.RESERVED_NIC_NAME:
+                 intf_data[const.BLADE_INTF_RHEL_DEVICE_NAME],
+                 const.BLADE_INTF_DN: blade_intf})
+            port_bindings.append((port_id, blade_intf, portprofile_name,
+                                  vlan_name, vlan_id, qos, tenant_id))
+        udb.add_portbindings(port_bindings)
+
+        """
+        We are replacing the older blade interface state with new
+        """
+        chassis_data = self._inventory_state[ucsm_ip][chassis_id]
+        chassis_data[blade_id][const.BLADE_INTF_DATA] = blade_intf_data
+        chassis_data[blade_id][const.BLADE_UNRESERVED_INTF_COUNT] -= \
+                len(port_profiles)
+        for reserved_nic in reserved_nics:
+            self._index_rsvd_intf(tenant_id, ucsm_ip, chassis_id, blade_id,
+                                  reserved_nic[const.BLADE_INTF_DN])
+        LOG.debug("Reserved blade interfaces: %s\n" % reserved_nics)
+        return reserved_nics
+
     def unreserve_blade_interface(self, ucsm_ip, chassis_id, blade_id,
                                   interface_dn):
         """Unreserve a previously reserved interface on a blade"""
-        ucsm_username = cred.Store.getUsername(ucsm_ip)
-        ucsm_password = cred.Store.getPassword(ucsm_ip)
+        credential = cred.Store.getCredential(ucsm_ip)
+        ucsm_username = credential[const.USERNAME]
+        ucsm_password = credential[const.PASSWORD]
         blade_data = self._inventory_state[ucsm_ip][chassis_id][blade_id]
 
         blade_data[const.BLADE_UNRESERVED_INTF_COUNT] += 1
         blade_intf = blade_data[const.BLADE_INTF_DATA][interface_dn]
+        self._unindex_rsvd_intf(blade_intf[const.TENANTID], ucsm_ip,
+                                chassis_id, blade_id, interface_dn)
         blade_intf[const.BLADE_INTF_RESERVATION] = const.BLADE_INTF_UNRESERVED
         blade_intf[const.TENANTID] = None
         blade_intf[const.PORTID] = None
@@ -668,6 +825,24 @@ class UCSInventory(L2NetworkDeviceInventoryBase):
         LOG.debug("host_list is: %s" % host_list)
         return host_list
 
+    def schedule_hosts(self, args):
+        """
+        Provides the hostnames on which dynamic vnics are reserved for a
+        list of instances, each a dict with the instance_id and the
+        instance_desc
+        """
+        LOG.debug("schedule_hosts() called\n")
+        instances = args[1]
+        host_names = self._get_host_names_for_rsvd_intfs(
+            [(instance[const.INSTANCE_DESC][const.PROJECT_ID],
+              instance[const.INSTANCE_ID]) for instance in instances])
+        host_list = {const.HOST_LIST: [
+            {const.INSTANCE_ID: instance[const.INSTANCE_ID],
+             const.HOST_NAME: host_name}
+            for instance, host_name in zip(instances, host_names)]}
+        LOG.debug("host_list is: %s" % host_list)
+        return host_list
+
     def associate_port(self, args):
         """
         Get the portprofile name and the device name for the dynamic vnic
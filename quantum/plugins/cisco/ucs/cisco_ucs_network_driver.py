@@ -27,6 +27,7 @@ import httplib
 import logging
 from xml.etree import ElementTree as et
 
+from quantum import metrics
 from quantum.plugins.cisco.common import cisco_exceptions as cexc
 from quantum.plugins.cisco.common import cisco_constants as const
 from quantum.plugins.cisco.ucs import cisco_getvif as gvif
@@ -59,9 +60,13 @@ CREATE_VLAN = "<configConfMos cookie=\"" + COOKIE_VALUE + \
 VLAN_NAME + "\" status=\"created\">" \
 "</fabricVlan> </pair> </inConfigs> </configConfMos>"
 
-CREATE_PROFILE = "<configConfMos cookie=\"" + COOKIE_VALUE + \
-"\" inHierarchical=\"true\"> <inConfigs>" \
-"<pair key=\"fabric/lan/profiles/vnic-" + PROFILE_NAME + \
+CONFIGS_VALUE = "configs_placeholder"
+
+CONFIG_CONF_MOS = "<configConfMos cookie=\"" + COOKIE_VALUE + \
+"\" inHierarchical=\"true\"> <inConfigs>" + CONFIGS_VALUE + \
+" </inConfigs> </configConfMos>"
+
+PROFILE_PAIR = "<pair key=\"fabric/lan/profiles/vnic-" + PROFILE_NAME + \
 "\"> <vnicProfile descr=\"Profile created by " \
 "Cisco OpenStack Quantum Plugin\" " \
 "dn=\"fabric/lan/profiles/vnic-" + PROFILE_NAME + \
@@ -70,17 +75,21 @@ CREATE_PROFILE = "<configConfMos cookie=\"" + COOKIE_VALUE + \
 "qosPolicyName=\"\" status=\"created\"> " \
 "<vnicEtherIf defaultNet=\"yes\" name=\"" + VLAN_NAME + \
 "\" rn=\"if-" + VLAN_NAME + "\" > </vnicEtherIf> " \
-"</vnicProfile> </pair> </inConfigs> </configConfMos>"
+"</vnicProfile> </pair>"
 
-ASSOCIATE_PROFILE = "<configConfMos cookie=\"" + COOKIE_VALUE + \
-"\" inHierarchical=\"true\"> <inConfigs> <pair " \
+PROFILE_CLIENT_PAIR = "<pair " \
 "key=\"fabric/lan/profiles/vnic-" + PROFILE_NAME + \
 "/cl-" + PROFILE_CLIENT + "\"> <vmVnicProfCl dcName=\".*\" " \
 "descr=\"\" dn=\"fabric/lan/profiles/vnic-" + \
 PROFILE_NAME + "/cl-" + PROFILE_CLIENT + \
-"\"name=\"" + PROFILE_CLIENT + "\" orgPath=\".*\" " \
+"\" name=\"" + PROFILE_CLIENT + "\" orgPath=\".*\" " \
 "status=\"created\" swName=\"default$\"> </vmVnicProfCl>" \
-"</pair> </inConfigs> </configConfMos>"
+"</pair>"
+
+CREATE_PROFILE = CONFIG_CONF_MOS.replace(CONFIGS_VALUE, PROFILE_PAIR)
+
+ASSOCIATE_PROFILE = CONFIG_CONF_MOS.replace(CONFIGS_VALUE,
+                                            " " + PROFILE_CLIENT_PAIR)
 
 CHANGE_VLAN_IN_PROFILE = "<configConfMos cookie=\"" + COOKIE_VALUE + \
 "\" inHierarchical=\"true\"> <inConfigs>" \
@@ -141,6 +150,7 @@ class CiscoUCSMDriver():
     def __init__(self):
         pass
 
+    @metrics.timed("cisco.ucsm.post_data")
     def _post_data(self, ucsm_ip, ucsm_username, ucsm_password, data):
         """Send command to UCSM in http request"""
         conn = httplib.HTTPSConnection(ucsm_ip)
@@ -194,6 +204,17 @@ class CiscoUCSMDriver():
         data = data.replace(PROFILE_CLIENT, profile_client_name)
         return data
 
+    def _create_profiles_post_data(self, profiles):
+        """Create command for a list of (profile_name, vlan_name)"""
+        configs = []
+        for profile_name, vlan_name in profiles:
+            configs.append(PROFILE_PAIR.replace(PROFILE_NAME, profile_name).\
+                           replace(VLAN_NAME, vlan_name))
+            configs.append(PROFILE_CLIENT_PAIR.\
+                           replace(PROFILE_NAME, profile_name).\
+                           replace(PROFILE_CLIENT, profile_name[-16:]))
+        return CONFIG_CONF_MOS.replace(CONFIGS_VALUE, " ".join(configs))
+
     def _change_vlaninprof_post_data(self, profile_name, old_vlan_name,
                                           new_vlan_name):
         """Create command"""
@@ -283,6 +304,15 @@ class CiscoUCSMDriver():
                                                      profile_name[-16:])
         self._post_data(ucsm_ip, ucsm_username, ucsm_password, data)
 
+    def create_profiles(self, profiles, ucsm_ip, ucsm_username,
+                        ucsm_password):
+        """
+        Create request for UCSM creating the profiles of a list of
+        (profile_name, vlan_name) and their clients
+        """
+        data = self._create_profiles_post_data(profiles)
+        self._post_data(ucsm_ip, ucsm_username, ucsm_password, data)
+
     def change_vlan_in_profile(self, profile_name, old_vlan_name,
                                new_vlan_name, ucsm_ip, ucsm_username,
                                ucsm_password):
@@ -257,7 +257,9 @@ class UCSVICPlugin(L2DevicePluginBase):
     def create_multiport(self, tenant_id, net_id_list, ports_num, port_id_list,
                      **kwargs):
         """
-        Creates a port on the specified Virtual Network.
+        Creates a port on each of the specified Virtual Networks, on the
+        same blade: the blade interfaces are reserved together and the
+        port profiles are created with one UCSM request.
         """
         LOG.debug("UCSVICPlugin:create_multiport() called\n")
         self._set_ucsm(kwargs[const.DEVICE_IP])
@@ -267,25 +269,35 @@ class UCSVICPlugin(L2DevicePluginBase):
         chassis_id = least_rsvd_blade_dict[const.LEAST_RSVD_BLADE_CHASSIS]
         blade_id = least_rsvd_blade_dict[const.LEAST_RSVD_BLADE_ID]
         blade_data_dict = least_rsvd_blade_dict[const.LEAST_RSVD_BLADE_DATA]
-        port_binding_list = []
-        for port_id, net_id in zip(port_id_list, net_id_list):
-            new_port_profile = \
-                    self._create_port_profile(tenant_id, net_id, port_id,
-                                              conf.DEFAULT_VLAN_NAME,
-                                              conf.DEFAULT_VLAN_ID)
-            profile_name = new_port_profile[const.PROFILE_NAME]
-            rsvd_nic_dict = ucs_inventory.\
-                    reserve_blade_interface(self._ucsm_ip, chassis_id,
-                                            blade_id, blade_data_dict,
-                                            tenant_id, port_id,
-                                            profile_name)
-            port_binding = udb.update_portbinding(port_id,
-                                           portprofile_name=profile_name,
-                                           vlan_name=conf.DEFAULT_VLAN_NAME,
-                                           vlan_id=conf.DEFAULT_VLAN_ID,
-                                           qos=qos)
-            port_binding_list.append(port_binding)
-        return port_binding_list
+        available = int(conf.MAX_UCSM_PORT_PROFILES) - \
+                self._port_profile_counter
+        if ports_num > available:
+            idx = max(available, 0)
+            raise cexc.UCSMPortProfileLimit(net_id=net_id_list[idx],
+                                            port_id=port_id_list[idx])
+        profile_names = [self._get_profile_name(port_id)
+                         for port_id in port_id_list]
+        rsvd_nics = ucs_inventory.\
+                reserve_blade_interfaces(self._ucsm_ip, chassis_id,
+                                         blade_id, blade_data_dict,
+                                         tenant_id,
+                                         zip(port_id_list, profile_names),
+                                         conf.DEFAULT_VLAN_NAME,
+                                         conf.DEFAULT_VLAN_ID, qos)
+        try:
+            self._driver.create_profiles(
+                [(profile_name, conf.DEFAULT_VLAN_NAME)
+                 for profile_name in profile_names],
+                self._ucsm_ip, self._ucsm_username, self._ucsm_password)
+        except:
+            for rsvd_nic in rsvd_nics:
+                ucs_inventory.unreserve_blade_interface(
+                    self._ucsm_ip, chassis_id, blade_id,
+                    rsvd_nic[const.BLADE_INTF_DN])
+            udb.remove_portbindings(port_id_list)
+            raise
+        self._port_profile_counter += ports_num
+        return rsvd_nics
 
     def detach_port(self, tenant_id, instance_id, instance_desc, **kwargs):
         """
@@ -335,5 +347,6 @@ class UCSVICPlugin(L2DevicePluginBase):
     def _set_ucsm(self, ucsm_ip):
         """Set the UCSM IP, username, and password"""
         self._ucsm_ip = ucsm_ip
-        self._ucsm_username = cred.Store.getUsername(conf.UCSM_IP_ADDRESS)
-        self._ucsm_password = cred.Store.getPassword(conf.UCSM_IP_ADDRESS)
+        credential = cred.Store.getCredential(conf.UCSM_IP_ADDRESS)
+        self._ucsm_username = credential[const.USERNAME]
+        self._ucsm_password = credential[const.PASSWORD]
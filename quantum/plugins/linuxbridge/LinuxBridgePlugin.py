@@ -68,7 +68,7 @@ class LinuxBridgePlugin(QuantumPluginBase):
         the specified tenant.
         """
         LOG.debug("LinuxBridgePlugin.get_all_networks() called")
-        networks_list = db.network_list(tenant_id)
+        networks_list = db.network_list_rows(tenant_id)
         new_networks_list = []
         for network in networks_list:
             new_network_dict = cutil.make_net_dict(network[const.UUID],
@@ -85,8 +85,8 @@ class LinuxBridgePlugin(QuantumPluginBase):
         are attached to the network
         """
         LOG.debug("LinuxBridgePlugin.get_network_details() called")
-        network = db.network_get(net_id)
-        ports_list = db.port_list(net_id)
+        network = db.network_get_row(net_id)
+        ports_list = db.port_list_rows(net_id)
         ports_on_net = []
         for port in ports_list:
             new_port = cutil.make_port_dict(port)
@@ -124,13 +124,8 @@ class LinuxBridgePlugin(QuantumPluginBase):
         LOG.debug("LinuxBridgePlugin.delete_network() called")
         net = db.network_get(net_id)
         if net:
-            ports_on_net = db.port_list(net_id)
-            if len(ports_on_net) > 0:
-                for port in ports_on_net:
-                    if port[const.INTERFACEID]:
-                        raise exc.NetworkInUse(net_id=net_id)
-                for port in ports_on_net:
-                    self.delete_port(tenant_id, net_id, port[const.UUID])
+            if db.network_in_use(net_id):
+                raise exc.NetworkInUse(net_id=net_id)
 
             net_dict = cutil.make_net_dict(net[const.UUID],
                                            net[const.NETWORKNAME],
@@ -164,8 +159,7 @@ class LinuxBridgePlugin(QuantumPluginBase):
         specified Virtual Network.
         """
         LOG.debug("LinuxBridgePlugin.get_all_ports() called")
-        network = db.network_get(net_id)
-        ports_list = db.port_list(net_id)
+        ports_list = db.port_list_rows(net_id)
         ports_on_net = []
         for port in ports_list:
             new_port = cutil.make_port_dict(port)
@@ -180,8 +174,7 @@ class LinuxBridgePlugin(QuantumPluginBase):
         that is attached to this particular port.
         """
         LOG.debug("LinuxBridgePlugin.get_port_details() called")
-        network = db.network_get(net_id)
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_row(port_id, net_id)
         new_port_dict = cutil.make_port_dict(port)
         return new_port_dict
 
@@ -27,14 +27,24 @@ from optparse import OptionParser
 from subprocess import *
 
 import ConfigParser
+import datetime
+import json
 import logging as LOG
 import MySQLdb
 import os
 import signal
+import socket
 import sqlite3
 import sys
 import time
 
+# The agent can run without the quantum package installed, metrics are only
+# collected when it is
+try:
+    from quantum import metrics
+except ImportError:
+    metrics = None
+
 
 BRIDGE_NAME_PREFIX = "brq"
 GATEWAY_INTERFACE_PREFIX = "gw-"
@@ -42,7 +52,22 @@ TAP_INTERFACE_PREFIX = "tap"
 BRIDGE_FS = "/sys/devices/virtual/net/"
 BRIDGE_NAME_PLACEHOLDER = "bridge_name"
 BRIDGE_INTERFACES_FS = BRIDGE_FS + BRIDGE_NAME_PLACEHOLDER + "/brif/"
-PORT_OPSTATUS_UPDATESQL = "UPDATE ports SET op_status = '%s' WHERE uuid = '%s'"
+PORT_OPSTATUS_UPDATESQL = "UPDATE ports SET op_status = '%s', host = '%s' " \
+                          "WHERE uuid = '%s'"
+PORT_HOST_UPDATESQL = "UPDATE ports SET host = '%s' WHERE uuid = '%s'"
+PORT_HOST_CLEARSQL = "UPDATE ports SET host = NULL WHERE uuid = '%s'"
+HOST_PORTS_SELECTSQL = "SELECT * FROM ports WHERE state = 'ACTIVE' " \
+                       "AND interface_id IS NOT NULL AND host = '%s'"
+DEVICE_PORTS_SELECTSQL = "SELECT * FROM ports WHERE state = 'ACTIVE' " \
+                         "AND (%s)"
+DEVICE_PORT_CONDITION = "interface_id LIKE '%s%%'"
+# Maximum number of devices looked up by a query
+DEVICES_PER_QUERY = 500
+HEARTBEAT_UPDATESQL = "UPDATE agent_heartbeats SET heartbeat_at = '%s' " \
+                      "WHERE host = '%s' AND agent_type = '%s'"
+HEARTBEAT_INSERTSQL = "INSERT INTO agent_heartbeats " \
+                      "(host, agent_type, heartbeat_at) " \
+                      "VALUES ('%s', '%s', '%s')"
 DEVICE_NAME_PLACEHOLDER = "device_name"
 BRIDGE_PORT_FS_FOR_DEVICE = BRIDGE_FS + DEVICE_NAME_PLACEHOLDER + "/brport"
 VLAN_BINDINGS = "vlan_bindings"
@@ -50,13 +75,15 @@ PORT_BINDINGS = "port_bindings"
 OP_STATUS_UP = "UP"
 OP_STATUS_DOWN = "DOWN"
 DB_CONNECTION = None
+AGENT_TYPE = "linuxbridge"
+STATE_FORMAT_VERSION = 1
 
 
-class LinuxBridge:
-    def __init__(self, br_name_prefix, physical_interface):
-        self.br_name_prefix = br_name_prefix
-        self.physical_interface = physical_interface
-
+class CommandRunner:
+    """
+    Runs the ip and brctl commands and reads the bridge state from sysfs,
+    can be replaced by a fake backend to run the agent without bridges.
+    """
     def run_cmd(self, args):
         LOG.debug("Running command: " + " ".join(args))
         p = Popen(args, stdout=PIPE)
@@ -67,6 +94,72 @@ class LinuxBridge:
             LOG.debug("Command returned: %s" % retval)
         return retval
 
+    def listdir(self, path):
+        return os.listdir(path)
+
+    def path_exists(self, path):
+        return os.path.exists(path)
+
+
+class LocalState:
+    """
+    Bindings last applied by the agent, saved to a local file so that a
+    restarted agent only touches the interfaces which changed while it was
+    down. The file is replaced atomically; a missing or unreadable file, or
+    one of another format version, is ignored and the agent starts from
+    scratch.
+    The agents are deployed as single files, so this class is duplicated
+    in the Open vSwitch and Linux Bridge agents; test_agent_local_state
+    checks that both copies stay identical.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.saved = None
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as state_file:
+                state = json.load(state_file)
+        except (IOError, ValueError), e:
+            LOG.warn("Ignoring unreadable local state %s: %s" %
+                     (self.path, e))
+            return None
+        if not isinstance(state, dict) or \
+           state.get("version") != STATE_FORMAT_VERSION:
+            LOG.warn("Ignoring local state %s of unknown version" %
+                     self.path)
+            return None
+        self.saved = state["bindings"]
+        return self.saved
+
+    def save(self, bindings):
+        if not self.path or bindings == self.saved:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as state_file:
+                json.dump({"version": STATE_FORMAT_VERSION,
+                           "bindings": bindings}, state_file)
+                state_file.flush()
+                os.fsync(state_file.fileno())
+            os.rename(tmp_path, self.path)
+            self.saved = bindings
+        except (IOError, OSError), e:
+            LOG.warn("Unable to save the local state %s: %s" %
+                     (self.path, e))
+
+
+class LinuxBridge:
+    def __init__(self, br_name_prefix, physical_interface, runner=None):
+        self.br_name_prefix = br_name_prefix
+        self.physical_interface = physical_interface
+        self.runner = runner or CommandRunner()
+
+    def run_cmd(self, args):
+        return self.runner.run_cmd(args)
+
     def device_exists(self, device):
         """Check if ethernet device exists."""
         retval = self.run_cmd(['ip', 'link', 'show', 'dev', device])
@@ -96,9 +189,24 @@ class LinuxBridge:
         tap_device_name = TAP_INTERFACE_PREFIX + interface_id[0:11]
         return tap_device_name
 
+    def get_interface_device_name(self, interface_id):
+        if interface_id.startswith(GATEWAY_INTERFACE_PREFIX):
+            """
+            The name for the gateway devices is set by the linux net
+            driver, hence we use the name as is
+            """
+            return interface_id
+        return self.get_tap_device_name(interface_id)
+
+    def get_interface_id_prefix(self, device_name):
+        """Returns the start of the interface ids named device_name"""
+        if device_name.startswith(TAP_INTERFACE_PREFIX):
+            return device_name[len(TAP_INTERFACE_PREFIX):]
+        return device_name
+
     def get_all_quantum_bridges(self):
         quantum_bridge_list = []
-        bridge_list = os.listdir(BRIDGE_FS)
+        bridge_list = self.runner.listdir(BRIDGE_FS)
         for bridge in bridge_list:
             if bridge.startswith(BRIDGE_NAME_PREFIX):
                 quantum_bridge_list.append(bridge)
@@ -109,7 +217,7 @@ class LinuxBridge:
             bridge_interface_path = \
                     BRIDGE_INTERFACES_FS.replace(BRIDGE_NAME_PLACEHOLDER,
                                                  bridge_name)
-            return os.listdir(bridge_interface_path)
+            return self.runner.listdir(bridge_interface_path)
 
     def get_all_tap_devices(self):
         tap_devices = []
@@ -149,7 +257,13 @@ class LinuxBridge:
             bridge_port_path = \
                     BRIDGE_PORT_FS_FOR_DEVICE.replace(DEVICE_NAME_PLACEHOLDER,
                                                       device_name)
-            return os.path.exists(bridge_port_path)
+            return self.runner.path_exists(bridge_port_path)
+
+    def is_interface_on_bridge(self, bridge_name, device_name):
+        bridge_interface_path = \
+                BRIDGE_INTERFACES_FS.replace(BRIDGE_NAME_PLACEHOLDER,
+                                             bridge_name)
+        return self.runner.path_exists(bridge_interface_path + device_name)
 
     def ensure_vlan_bridge(self, network_id, vlan_id):
         """Create a vlan and bridge unless they already exist."""
@@ -233,13 +347,8 @@ class LinuxBridge:
             no more processing is required
             """
             return False
-        if interface_id.startswith(GATEWAY_INTERFACE_PREFIX):
-            return self.add_tap_interface(network_id, vlan_id,
-                                              interface_id)
-        else:
-            tap_device_name = self.get_tap_device_name(interface_id)
-            return self.add_tap_interface(network_id, vlan_id,
-                                          tap_device_name)
+        return self.add_tap_interface(
+            network_id, vlan_id, self.get_interface_device_name(interface_id))
 
     def delete_vlan_bridge(self, bridge_name):
         if self.device_exists(bridge_name):
@@ -287,12 +396,20 @@ class LinuxBridge:
 
 class LinuxBridgeQuantumAgent:
 
-    def __init__(self, br_name_prefix, physical_interface, polling_interval):
+    def __init__(self, br_name_prefix, physical_interface, polling_interval,
+                 runner=None, state_path=None):
         self.polling_interval = int(polling_interval)
-        self.setup_linux_bridge(br_name_prefix, physical_interface)
-
-    def setup_linux_bridge(self, br_name_prefix, physical_interface):
-        self.linux_br = LinuxBridge(br_name_prefix, physical_interface)
+        self.host = socket.gethostname()
+        self.local_state = LocalState(state_path)
+        # interface_id -> [network_id, vlan_id] of the interfaces added to
+        # their bridge
+        self.applied_bindings = self.local_state.load() or {}
+        self.setup_linux_bridge(br_name_prefix, physical_interface, runner)
+
+    def setup_linux_bridge(self, br_name_prefix, physical_interface,
+                           runner=None):
+        self.linux_br = LinuxBridge(br_name_prefix, physical_interface,
+                                    runner)
 
     def process_port_binding(self, port_id, network_id, interface_id,
                              vlan_id):
@@ -347,12 +464,52 @@ class LinuxBridgeQuantumAgent:
             if bridge not in current_quantum_bridge_names:
                 self.linux_br.delete_vlan_bridge(bridge)
 
-    def manage_networks_on_host(self, conn, old_vlan_bindings,
-                                old_port_bindings):
+    def get_cursor(self, conn):
         if DB_CONNECTION != 'sqlite':
-            cursor = MySQLdb.cursors.DictCursor(conn)
+            return MySQLdb.cursors.DictCursor(conn)
         else:
-            cursor = conn.cursor()
+            return conn.cursor()
+
+    def get_local_ports(self, conn, device_names):
+        """
+        Returns the active ports bound to this host or attached to one of
+        the devices of the host. The ports already bound to the host are
+        read first, so that only the devices new on the host are looked
+        up, by the start of their interface ids.
+        """
+        cursor = self.get_cursor(conn)
+        cursor.execute(HOST_PORTS_SELECTSQL % self.host)
+        ports = list(cursor.fetchall())
+        cursor.close()
+        port_ids = set([pb['uuid'] for pb in ports])
+        bound_device_names = set(
+            [self.linux_br.get_interface_device_name(pb['interface_id'])
+             for pb in ports])
+        device_names = [device_name for device_name in device_names
+                        if device_name not in bound_device_names]
+        for i in xrange(0, len(device_names), DEVICES_PER_QUERY):
+            chunk = device_names[i:i + DEVICES_PER_QUERY]
+            chunk_names = set(chunk)
+            conditions = " OR ".join(
+                [DEVICE_PORT_CONDITION %
+                 self.linux_br.get_interface_id_prefix(device_name)
+                 for device_name in chunk])
+            cursor = self.get_cursor(conn)
+            cursor.execute(DEVICE_PORTS_SELECTSQL % conditions)
+            for pb in cursor.fetchall():
+                device_name = \
+                        self.linux_br.get_interface_device_name(
+                            pb['interface_id'])
+                if pb['uuid'] not in port_ids and \
+                   device_name in chunk_names:
+                    port_ids.add(pb['uuid'])
+                    ports.append(pb)
+            cursor.close()
+        return ports
+
+    def manage_networks_on_host(self, conn, old_vlan_bindings,
+                                old_port_bindings):
+        cursor = self.get_cursor(conn)
         cursor.execute("SELECT * FROM vlan_bindings")
         rows = cursor.fetchall()
         cursor.close()
@@ -363,27 +520,54 @@ class LinuxBridgeQuantumAgent:
             vlans_string = "%s %s" % (vlans_string, row)
 
         plugged_interfaces = []
-        cursor = MySQLdb.cursors.DictCursor(conn)
-        cursor.execute("SELECT * FROM ports where state = 'ACTIVE'")
-        port_bindings = cursor.fetchall()
-        cursor.close()
+        applied_bindings = {}
+        device_names = self.linux_br.get_all_tap_devices() + \
+                self.linux_br.get_all_gateway_devices()
+        port_bindings = self.get_local_ports(conn, device_names)
+        host_devices = set(device_names)
 
         ports_string = ""
         for pb in port_bindings:
             ports_string = "%s %s" % (ports_string, pb)
-            if pb['interface_id']:
+            interface_id = pb['interface_id']
+            if interface_id:
                 vlan_id = \
                         str(vlan_bindings[pb['network_id']]['vlan_id'])
-                if self.process_port_binding(pb['uuid'],
-                                             pb['network_id'],
-                                             pb['interface_id'],
-                                             vlan_id):
-                    cursor = MySQLdb.cursors.DictCursor(conn)
-                    sql = PORT_OPSTATUS_UPDATESQL % (pb['uuid'],
-                                                     OP_STATUS_UP)
+                binding = [pb['network_id'], vlan_id]
+                bridge_name = self.linux_br.get_bridge_name(pb['network_id'])
+                device_name = \
+                        self.linux_br.get_interface_device_name(interface_id)
+                # Only the interfaces whose binding changed, or which left
+                # their bridge, are processed
+                sql = None
+                if self.applied_bindings.get(interface_id) == binding and \
+                   self.linux_br.is_interface_on_bridge(bridge_name,
+                                                        device_name):
+                    applied_bindings[interface_id] = binding
+                else:
+                    if self.process_port_binding(pb['uuid'],
+                                                 pb['network_id'],
+                                                 interface_id,
+                                                 vlan_id):
+                        sql = PORT_OPSTATUS_UPDATESQL % (OP_STATUS_UP,
+                                                         self.host,
+                                                         pb['uuid'])
+                    if self.linux_br.is_interface_on_bridge(bridge_name,
+                                                            device_name):
+                        applied_bindings[interface_id] = binding
+                # The ports whose interface is on a bridge of the host are
+                # bound to it, and unbound from it once their device left
+                if sql is None and interface_id in applied_bindings and \
+                   pb['host'] != self.host:
+                    sql = PORT_HOST_UPDATESQL % (self.host, pb['uuid'])
+                elif sql is None and pb['host'] == self.host and \
+                     device_name not in host_devices:
+                    sql = PORT_HOST_CLEARSQL % pb['uuid']
+                if sql:
+                    cursor = self.get_cursor(conn)
                     cursor.execute(sql)
                     cursor.close()
-                plugged_interfaces.append(pb['interface_id'])
+                plugged_interfaces.append(interface_id)
 
         if old_port_bindings != port_bindings:
             LOG.debug("Port-bindings: %s" % ports_string)
@@ -396,19 +580,43 @@ class LinuxBridgeQuantumAgent:
         self.process_deleted_networks(vlan_bindings)
 
         conn.commit()
+        self.applied_bindings = applied_bindings
+        self.local_state.save(applied_bindings)
         return {VLAN_BINDINGS: vlan_bindings,
                 PORT_BINDINGS: port_bindings}
 
+    def report_heartbeat(self, conn):
+        """Records the heartbeat of the agent, reported by GET /healthz"""
+        now = datetime.datetime.utcnow()
+        try:
+            cursor = self.get_cursor(conn)
+            cursor.execute(HEARTBEAT_UPDATESQL % (now, self.host, AGENT_TYPE))
+            if not cursor.rowcount:
+                cursor.execute(HEARTBEAT_INSERTSQL % (self.host, AGENT_TYPE,
+                                                      now))
+            cursor.close()
+            conn.commit()
+        except Exception, e:
+            conn.rollback()
+            LOG.warn("Unable to record the agent heartbeat: %s" % e)
+
     def daemon_loop(self, conn):
         old_vlan_bindings = {}
         old_port_bindings = {}
 
         while True:
+            start = time.time()
             bindings = self.manage_networks_on_host(conn,
                                                     old_vlan_bindings,
                                                     old_port_bindings)
             old_vlan_bindings = bindings[VLAN_BINDINGS]
             old_port_bindings = bindings[PORT_BINDINGS]
+            self.report_heartbeat(conn)
+            if metrics:
+                metrics.histogram("agent.linuxbridge.loop.latency").\
+                        observe_since(start)
+                metrics.gauge("agent.linuxbridge.ports").\
+                        set(len(old_port_bindings))
             time.sleep(self.polling_interval)
 
 if __name__ == "__main__":
@@ -438,6 +646,17 @@ if __name__ == "__main__":
         br_name_prefix = BRIDGE_NAME_PREFIX
         physical_interface = config.get("LINUX_BRIDGE", "physical_interface")
         polling_interval = config.get("AGENT", "polling_interval")
+        state_path = None
+        if config.has_option("AGENT", "state_file"):
+            state_path = config.get("AGENT", "state_file")
+        if metrics and config.has_option("AGENT", "statsd_host"):
+            statsd_interval = 10
+            if config.has_option("AGENT", "statsd_interval"):
+                statsd_interval = config.get("AGENT", "statsd_interval")
+            metrics.StatsdEmitter(config.get("AGENT", "statsd_host"),
+                                  config.get("AGENT", "statsd_port"),
+                                  statsd_interval,
+                                  prefix="quantum.linuxbridge_agent").start()
         'Establish database connection and load models'
         DB_CONNECTION = config.get("DATABASE", "connection")
         if DB_CONNECTION == 'sqlite':
@@ -460,7 +679,8 @@ if __name__ == "__main__":
 
     try:
         plugin = LinuxBridgeQuantumAgent(br_name_prefix, physical_interface,
-                                         polling_interval)
+                                         polling_interval,
+                                         state_path=state_path)
         LOG.info("Agent initialized successfully, now running...")
         plugin.daemon_loop(conn)
     finally:
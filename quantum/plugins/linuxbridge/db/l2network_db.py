@@ -15,10 +15,10 @@
 #    under the License.
 # @author: Rohit Agarwalla, Cisco Systems, Inc.
 
-from sqlalchemy import func
 from sqlalchemy.orm import exc
 
 from quantum.common import exceptions as q_exc
+from quantum.db import vlan_allocator
 from quantum.plugins.linuxbridge import plugin_configuration as conf
 from quantum.plugins.linuxbridge.common import exceptions as c_exc
 from quantum.plugins.linuxbridge.db import l2network_models
@@ -30,6 +30,8 @@ import quantum.db.api as db
 
 LOG = logging.getLogger(__name__)
 
+_VLAN_ALLOCATOR = None
+
 
 def initialize():
     'Establish database connection and load models'
@@ -47,41 +49,16 @@ def initialize():
 
 
 def create_vlanids():
-    """Prepopulates the vlan_bindings table"""
+    """Prepopulates the vlan_ids table and loads the VLAN allocator"""
     LOG.debug("create_vlanids() called")
-    session = db.get_session()
+    global _VLAN_ALLOCATOR
     start = int(conf.VLAN_START)
     end = int(conf.VLAN_END)
-    try:
-        vlanid = session.query(l2network_models.VlanID).\
-          one()
-    except exc.MultipleResultsFound:
-        """
-        TODO (Sumit): Salvatore rightly points out that this will not handle
-        change in VLAN ID range across server reboots. This is currently not
-        a supported feature. This logic will need to change if this feature
-        has to be supported.
-        Per Dan's suggestion we just throw a server exception for now.
-        """
-        current_start = \
-                int(session.query(func.min(l2network_models.VlanID.vlan_id)).
-                    one()[0])
-        current_end = \
-                int(session.query(func.max(l2network_models.VlanID.vlan_id)).
-                    one()[0])
-        if current_start != start or current_end != end:
-            LOG.debug("Old VLAN range %s-%s" % (current_start, current_end))
-            LOG.debug("New VLAN range %s-%s" % (start, end))
-            raise c_exc.UnableToChangeVlanRange(range_start=current_start,
-                                                range_end=current_end)
-    except exc.NoResultFound:
-        LOG.debug("Setting VLAN range to %s-%s" % (start, end))
-        while start <= end:
-            vlanid = l2network_models.VlanID(start)
-            session.add(vlanid)
-            start += 1
-        session.flush()
-    return
+    if _VLAN_ALLOCATOR:
+        _VLAN_ALLOCATOR.set_range(start, end)
+    else:
+        _VLAN_ALLOCATOR = vlan_allocator.VlanAllocator(
+            l2network_models.VlanID, db.get_session, start, end)
 
 
 def get_all_vlanids():
@@ -112,18 +89,11 @@ def is_vlanid_used(vlan_id):
 def release_vlanid(vlan_id):
     """Sets the vlanid state to be unused"""
     LOG.debug("release_vlanid() called")
-    session = db.get_session()
-    try:
-        vlanid = session.query(l2network_models.VlanID).\
-         filter_by(vlan_id=vlan_id).\
-          one()
-        vlanid["vlan_used"] = False
-        session.merge(vlanid)
-        session.flush()
-        return vlanid["vlan_used"]
-    except exc.NoResultFound:
+    if not _VLAN_ALLOCATOR:
+        create_vlanids()
+    if not _VLAN_ALLOCATOR.release(vlan_id):
         raise c_exc.VlanIDNotFound(vlan_id=vlan_id)
-    return
+    return False
 
 
 def delete_vlanid(vlan_id):
@@ -144,28 +114,16 @@ def delete_vlanid(vlan_id):
 def reserve_vlanid():
     """Reserves the first unused vlanid"""
     LOG.debug("reserve_vlanid() called")
-    session = db.get_session()
-    try:
-        rvlan = session.query(l2network_models.VlanID).\
-          first()
-        if not rvlan:
-            create_vlanids()
-
-        rvlan = session.query(l2network_models.VlanID).\
-         filter_by(vlan_used=False).\
-          first()
-        if not rvlan:
-            raise c_exc.VlanIDNotAvailable()
-
-        rvlanid = session.query(l2network_models.VlanID).\
-         filter_by(vlan_id=rvlan["vlan_id"]).\
-          one()
-        rvlanid["vlan_used"] = True
-        session.merge(rvlanid)
-        session.flush()
-        return rvlan["vlan_id"]
-    except exc.NoResultFound:
+    if not _VLAN_ALLOCATOR:
+        create_vlanids()
+    vlan_id = _VLAN_ALLOCATOR.reserve()
+    if vlan_id is None:
+        # The vlan_ids table may have been cleared
+        create_vlanids()
+        vlan_id = _VLAN_ALLOCATOR.reserve()
+    if vlan_id is None:
         raise c_exc.VlanIDNotAvailable()
+    return vlan_id
 
 
 def get_all_vlanids_used():
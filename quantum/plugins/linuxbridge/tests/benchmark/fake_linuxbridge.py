@@ -0,0 +1,118 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2012 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+"""
+In-memory bridge backend for the LinuxBridge agent, to run the agent
+without ip, brctl and sysfs.
+"""
+
+from quantum.plugins.linuxbridge.agent import linuxbridge_quantum_agent \
+        as linux_agent
+
+
+class FakeLinuxBridgeRunner(object):
+    """
+    Command runner for the LinuxBridge agent keeping the devices and the
+    bridge table in memory. Counts the commands which would have been run
+    as subprocesses.
+    """
+
+    def __init__(self):
+        self.commands = 0
+        self.devices = {}
+        self.bridges = {}
+
+    def add_tap(self, device_name):
+        """Creates a tap device, as the hypervisor would"""
+        self.devices[device_name] = 'tap'
+
+    def remove_tap(self, device_name):
+        """Deletes a tap device, as the hypervisor would"""
+        self._link_delete(device_name)
+
+    def _device_bridge(self, device_name):
+        for bridge_name, interfaces in self.bridges.iteritems():
+            if device_name in interfaces:
+                return bridge_name
+
+    def run_cmd(self, args):
+        self.commands += 1
+        if args[0] == 'ip' and args[1] == 'link':
+            return getattr(self, "_link_" + args[2])(*args[3:])
+        elif args[0] == 'ip' and args[1] == 'tuntap':
+            return "".join(["%s: tap\n" % name
+                            for name, kind in self.devices.iteritems()
+                            if kind == 'tap'])
+        elif args[0] == 'brctl':
+            return getattr(self, "_brctl_" + args[1])(*args[2:])
+        raise ValueError("Unsupported command: %s" % " ".join(args))
+
+    def listdir(self, path):
+        path = path[len(linux_agent.BRIDGE_FS):].strip("/").split("/")
+        if path == ['']:
+            return self.devices.keys()
+        return list(self.bridges[path[0]])
+
+    def path_exists(self, path):
+        path = path[len(linux_agent.BRIDGE_FS):].strip("/").split("/")
+        if len(path) == 3 and path[1] == 'brif':
+            return path[2] in self.bridges.get(path[0], ())
+        if len(path) == 2 and path[1] == 'brport':
+            return self._device_bridge(path[0]) is not None
+        return path[0] in self.devices
+
+    def _link_show(self, dev, device_name):
+        if device_name not in self.devices:
+            return ""
+        return "1: %s: <BROADCAST,MULTICAST,UP,LOWER_UP>\n" % device_name
+
+    def _link_add(self, link, physical_interface, name, device_name, *args):
+        self.devices[device_name] = 'vlan'
+        return ""
+
+    def _link_set(self, device_name, state):
+        return ""
+
+    def _link_delete(self, device_name):
+        bridge_name = self._device_bridge(device_name)
+        if bridge_name:
+            self.bridges[bridge_name].discard(device_name)
+        del self.devices[device_name]
+        return ""
+
+    def _brctl_addbr(self, bridge_name):
+        self.devices[bridge_name] = 'bridge'
+        self.bridges[bridge_name] = set()
+        return ""
+
+    def _brctl_delbr(self, bridge_name):
+        del self.devices[bridge_name]
+        del self.bridges[bridge_name]
+        return ""
+
+    def _brctl_setfd(self, bridge_name, delay):
+        return ""
+
+    def _brctl_stp(self, bridge_name, state):
+        return ""
+
+    def _brctl_addif(self, bridge_name, device_name):
+        self.bridges[bridge_name].add(device_name)
+        return ""
+
+    def _brctl_delif(self, bridge_name, device_name):
+        self.bridges[bridge_name].discard(device_name)
+        return ""
@@ -345,6 +345,28 @@ class L2networkDBTest(unittest.TestCase):
         self.assertFalse(used)
         #counting on default teardown here to clear db
 
+    def testf_change_vlan_range(self):
+        """test changing the vlanid range"""
+        vlanid = l2network_db.reserve_vlanid()
+        start, end = l2network_db.conf.VLAN_START, l2network_db.conf.VLAN_END
+        try:
+            l2network_db.conf.VLAN_START = int(start) + 1
+            l2network_db.conf.VLAN_END = int(start) + 2
+            l2network_db.create_vlanids()
+            vlanids = [vlan["vlan_id"] for vlan in
+                       l2network_db.get_all_vlanids()]
+            # the used vlanid is kept until it is released
+            self.assertEqual(sorted(vlanids),
+                             [vlanid, int(start) + 1, int(start) + 2])
+            self.assertEqual(l2network_db.reserve_vlanid(), int(start) + 1)
+            l2network_db.release_vlanid(vlanid)
+            vlanids = [vlan["vlan_id"] for vlan in
+                       l2network_db.get_all_vlanids()]
+            self.assertEqual(sorted(vlanids), [int(start) + 1, int(start) + 2])
+        finally:
+            l2network_db.conf.VLAN_START = start
+            l2network_db.conf.VLAN_END = end
+
     def teardown_network(self):
         """tearDown Network table"""
         LOG.debug("Tearing Down Network")
@@ -0,0 +1,97 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2012 Cisco Systems, Inc.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import logging as LOG
+import sqlite3
+import unittest
+
+import quantum.plugins.linuxbridge.agent.linuxbridge_quantum_agent\
+                                                     as linux_agent
+from quantum.plugins.linuxbridge.tests.benchmark.fake_linuxbridge import \
+        FakeLinuxBridgeRunner
+from quantum.tests.unit.testlib_db import CountingConnection
+
+
+LOG.getLogger(__name__)
+
+
+class LinuxBridgeAgentHostTest(unittest.TestCase):
+
+    def setUp(self):
+        linux_agent.DB_CONNECTION = 'sqlite'
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        self.conn = CountingConnection(conn)
+        conn.execute("CREATE TABLE vlan_bindings (vlan_id INTEGER, "
+                     "network_id VARCHAR(255))")
+        conn.execute("CREATE TABLE ports (uuid VARCHAR(255), "
+                     "network_id VARCHAR(255), "
+                     "interface_id VARCHAR(255), state VARCHAR(8), "
+                     "op_status VARCHAR(16), host VARCHAR(255))")
+        conn.execute("INSERT INTO vlan_bindings VALUES (2, 'net1')")
+        self.runner = FakeLinuxBridgeRunner()
+        self.agent = linux_agent.LinuxBridgeQuantumAgent(
+            linux_agent.BRIDGE_NAME_PREFIX, "eth1", 2, self.runner)
+        # vif0 and vif1 are plugged on this host, vif2 on another one
+        for i, host in enumerate([None, None, "other"]):
+            conn.execute("INSERT INTO ports VALUES "
+                         "('port%d', 'net1', 'vif%d-0000-0000', "
+                         "'ACTIVE', 'DOWN', ?)" % (i, i), (host,))
+            if host is None:
+                self.runner.add_tap(self.agent.linux_br.get_tap_device_name(
+                    "vif%d-0000-0000" % i))
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _ports(self):
+        return dict([(row['uuid'], (row['op_status'], row['host']))
+                     for row in self.conn.conn.execute(
+                         "SELECT * FROM ports")])
+
+    def test_local_ports_are_bound_to_host(self):
+        LOG.debug("test_local_ports_are_bound_to_host - START")
+        bindings = self.agent.manage_networks_on_host(self.conn, {}, {})
+        self.assertEqual(
+            sorted([pb['uuid'] for pb in bindings[linux_agent.PORT_BINDINGS]]),
+            ["port0", "port1"])
+        host = self.agent.host
+        self.assertEqual(self._ports(), {"port0": ("UP", host),
+                                         "port1": ("UP", host),
+                                         "port2": ("DOWN", "other")})
+
+        # The ports bound to the host are read without looking up the
+        # taps, with the vlan bindings
+        statements = self.conn.statements
+        bindings = self.agent.manage_networks_on_host(self.conn, {}, {})
+        self.assertEqual(len(bindings[linux_agent.PORT_BINDINGS]), 2)
+        self.assertEqual(self.conn.statements - statements, 2)
+        LOG.debug("test_local_ports_are_bound_to_host - END")
+
+    def test_ports_are_unbound_when_device_leaves(self):
+        LOG.debug("test_ports_are_unbound_when_device_leaves - START")
+        self.agent.manage_networks_on_host(self.conn, {}, {})
+        self.runner.remove_tap(self.agent.linux_br.get_tap_device_name(
+            "vif0-0000-0000"))
+        self.agent.manage_networks_on_host(self.conn, {}, {})
+        self.assertEqual(self._ports()["port0"], ("UP", None))
+        self.assertEqual(self._ports()["port1"], ("UP", self.agent.host))
+
+        bindings = self.agent.manage_networks_on_host(self.conn, {}, {})
+        self.assertEqual([pb['uuid'] for pb in
+                          bindings[linux_agent.PORT_BINDINGS]], ["port1"])
+        LOG.debug("test_ports_are_unbound_when_device_leaves - END")
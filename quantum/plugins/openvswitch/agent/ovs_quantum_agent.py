@@ -19,18 +19,53 @@
 # @author: Dan Wendlandt, Nicira Networks, Inc.
 
 import ConfigParser
+import datetime
+import json
 import logging as LOG
+import os
+import socket
 import sys
 import time
 import signal
 
 from optparse import OptionParser
-from sqlalchemy.ext.sqlsoup import SqlSoup
+from sqlalchemy import and_, bindparam, create_engine, select
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
 from subprocess import *
 
+# The agent can run without the quantum package installed, metrics are only
+# collected when it is
+try:
+    from quantum import metrics
+except ImportError:
+    metrics = None
+
 
 OP_STATUS_UP = "UP"
 OP_STATUS_DOWN = "DOWN"
+AGENT_TYPE = "ovs"
+# Tag of the ports without a binding, the traffic of the dead vlan is dropped
+DEAD_VLAN_TAG = "4095"
+STATE_FORMAT_VERSION = 1
+# Maximum number of interface ids in the IN list of a query
+INTERFACE_IDS_PER_QUERY = 500
+
+# The tables used by the agent, declared with only the columns it reads
+# and writes instead of reflecting the schema of the plugin
+METADATA = MetaData()
+PORTS = Table("ports", METADATA,
+              Column("uuid", String(255), primary_key=True),
+              Column("network_id", String(255)),
+              Column("interface_id", String(255)),
+              Column("op_status", String(16)),
+              Column("host", String(255)))
+VLAN_BINDINGS = Table("vlan_bindings", METADATA,
+                      Column("vlan_id", Integer, primary_key=True),
+                      Column("network_id", String(255)))
+AGENT_HEARTBEATS = Table("agent_heartbeats", METADATA,
+                         Column("host", String(255), primary_key=True),
+                         Column("agent_type", String(255), primary_key=True),
+                         Column("heartbeat_at", DateTime))
 
 
 # A class to represent a VIF (i.e., a port that has 'iface-id' and 'vif-mac'
@@ -49,10 +84,9 @@ class VifPort:
           ", ofport=" + self.ofport + ", bridge name = " + self.switch.br_name
 
 
-class OVSBridge:
-    def __init__(self, br_name):
-        self.br_name = br_name
-
+# Runs the ovs-vsctl, ovs-ofctl and xe commands of the agent, can be
+# replaced by a fake backend to run the agent without Open vSwitch.
+class CommandRunner:
     def run_cmd(self, args):
         # LOG.debug("## running command: " + " ".join(args))
         p = Popen(args, stdout=PIPE)
@@ -61,6 +95,15 @@ class OVSBridge:
             LOG.debug("## timeout running command: " + " ".join(args))
         return retval
 
+
+class OVSBridge:
+    def __init__(self, br_name, runner=None):
+        self.br_name = br_name
+        self.runner = runner or CommandRunner()
+
+    def run_cmd(self, args):
+        return self.runner.run_cmd(args)
+
     def run_vsctl(self, args):
         full_args = ["ovs-vsctl", "--timeout=2"] + args
         return self.run_cmd(full_args)
@@ -169,97 +212,317 @@ class OVSBridge:
         return edge_ports
 
 
+class LocalState:
+    """
+    Bindings last applied by the agent, saved to a local file so that a
+    restarted agent only touches the interfaces which changed while it was
+    down. The file is replaced atomically; a missing or unreadable file, or
+    one of another format version, is ignored and the agent starts from
+    scratch.
+    The agents are deployed as single files, so this class is duplicated
+    in the Open vSwitch and Linux Bridge agents; test_agent_local_state
+    checks that both copies stay identical.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.saved = None
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as state_file:
+                state = json.load(state_file)
+        except (IOError, ValueError), e:
+            LOG.warn("Ignoring unreadable local state %s: %s" %
+                     (self.path, e))
+            return None
+        if not isinstance(state, dict) or \
+           state.get("version") != STATE_FORMAT_VERSION:
+            LOG.warn("Ignoring local state %s of unknown version" %
+                     self.path)
+            return None
+        self.saved = state["bindings"]
+        return self.saved
+
+    def save(self, bindings):
+        if not self.path or bindings == self.saved:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as state_file:
+                json.dump({"version": STATE_FORMAT_VERSION,
+                           "bindings": bindings}, state_file)
+                state_file.flush()
+                os.fsync(state_file.fileno())
+            os.rename(tmp_path, self.path)
+            self.saved = bindings
+        except (IOError, OSError), e:
+            LOG.warn("Unable to save the local state %s: %s" %
+                     (self.path, e))
+
+
+# Queries of the agent, reading only the columns it uses and writing back
+# only the operational statuses which changed
+class AgentDB:
+    def __init__(self, sql_connection):
+        self.engine = create_engine(sql_connection)
+
+    def get_ports(self, host, interface_ids):
+        """
+        Returns the uuid, interface_id, network_id, op_status and host of
+        the ports bound to host or attached to interface_ids. The ports
+        already bound to the host are read first, so that the interface
+        ids are only looked up for the VIFs new on the host.
+        """
+        query = select([PORTS.c.uuid, PORTS.c.interface_id,
+                        PORTS.c.network_id, PORTS.c.op_status,
+                        PORTS.c.host])
+        ports = self.engine.execute(
+            query.where(and_(PORTS.c.host == host,
+                             PORTS.c.interface_id != None))).fetchall()
+        bound_ids = set([port.interface_id for port in ports])
+        interface_ids = [interface_id for interface_id in interface_ids
+                         if interface_id not in bound_ids]
+        for i in xrange(0, len(interface_ids), INTERFACE_IDS_PER_QUERY):
+            chunk = interface_ids[i:i + INTERFACE_IDS_PER_QUERY]
+            ports.extend(self.engine.execute(
+                query.where(PORTS.c.interface_id.in_(chunk))).fetchall())
+        return ports
+
+    def get_vlan_bindings(self):
+        """Returns the vlan of each network"""
+        return dict(self.engine.execute(
+            select([VLAN_BINDINGS.c.network_id,
+                    VLAN_BINDINGS.c.vlan_id])).fetchall())
+
+    def set_port_statuses(self, statuses):
+        """
+        Sets the op_status and host of the ports, {uuid: (op_status,
+        host)}, with one batched UPDATE
+        """
+        if not statuses:
+            return
+        self.engine.execute(
+            PORTS.update().
+                where(PORTS.c.uuid == bindparam("port_uuid")).
+                values(op_status=bindparam("port_op_status"),
+                       host=bindparam("port_host")),
+            [{"port_uuid": port_uuid, "port_op_status": op_status,
+              "port_host": host}
+             for port_uuid, (op_status, host) in statuses.iteritems()])
+
+    def set_heartbeat(self, host, agent_type, heartbeat_at):
+        conn = self.engine.connect()
+        try:
+            trans = conn.begin()
+            try:
+                updated = conn.execute(
+                    AGENT_HEARTBEATS.update().
+                        where(and_(AGENT_HEARTBEATS.c.host == host,
+                                   AGENT_HEARTBEATS.c.agent_type ==
+                                   agent_type)).
+                        values(heartbeat_at=heartbeat_at)).rowcount
+                if not updated:
+                    conn.execute(AGENT_HEARTBEATS.insert().
+                                 values(host=host, agent_type=agent_type,
+                                        heartbeat_at=heartbeat_at))
+                trans.commit()
+            except:
+                trans.rollback()
+                raise
+        finally:
+            conn.close()
+
+
 class OVSQuantumAgent:
 
-    def __init__(self, integ_br):
-        self.setup_integration_br(integ_br)
+    def __init__(self, integ_br, runner=None, state_path=None):
+        self.host = socket.gethostname()
+        # vif_id -> (ofport, tag) of the ports tagged by the agent
+        self.port_tags = {}
+        self.local_state = LocalState(state_path)
+        self.saved_state = self.local_state.load()
+        self.setup_integration_br(integ_br, runner)
 
     def port_bound(self, port, vlan_id):
         self.int_br.set_db_attribute("Port", port.port_name, "tag",
                                                        str(vlan_id))
         self.int_br.delete_flows(match="in_port=%s" % port.ofport)
+        self.port_tags[port.vif_id] = (port.ofport, str(vlan_id))
 
     def port_unbound(self, port, still_exists):
         if still_exists:
             self.int_br.clear_db_attribute("Port", port.port_name, "tag")
+        self.port_tags.pop(port.vif_id, None)
 
-    def setup_integration_br(self, integ_br):
-        self.int_br = OVSBridge(integ_br)
-        self.int_br.remove_all_flows()
+    def port_dead(self, port):
+        self.int_br.set_db_attribute("Port", port.port_name, "tag",
+                                     DEAD_VLAN_TAG)
+        self.int_br.add_flow(priority=2,
+                             match="in_port=%s" % port.ofport, actions="drop")
+        self.port_tags[port.vif_id] = (port.ofport, DEAD_VLAN_TAG)
+
+    def setup_integration_br(self, integ_br, runner=None):
+        self.int_br = OVSBridge(integ_br, runner)
+        # The flows of a restored state are kept, they are still in use
+        if self.saved_state is None:
+            self.int_br.remove_all_flows()
         # switch all traffic using L2 learning
         self.int_br.add_flow(priority=1, actions="normal")
 
+    def restore_state(self, saved):
+        """
+        Returns the local bindings and VIF ports of a saved state, keeping
+        the ports whose interface and tag did not change on the bridge.
+        The ports unplugged while the agent was down are kept too, so that
+        the first update_ports reports them down.
+        """
+        local_bindings = {}
+        vif_ports = {}
+        live_ports = dict([(p.vif_id, p)
+                           for p in self.int_br.get_vif_ports()])
+        for vif_id, entry in saved.iteritems():
+            port = live_ports.get(vif_id)
+            if port is None:
+                port = VifPort(entry["port_name"], entry["ofport"], vif_id,
+                               entry["vif_mac"], self.int_br)
+            elif port.port_name != entry["port_name"] or \
+                 port.ofport != entry["ofport"] or \
+                 self.int_br.db_get_val("Port", port.port_name,
+                                        "tag") != entry["tag"]:
+                continue
+            else:
+                self.port_tags[vif_id] = (port.ofport, entry["tag"])
+            if entry["net_id"] is not None:
+                local_bindings[vif_id] = entry["net_id"]
+            vif_ports[vif_id] = port
+        LOG.info("Restored %d of the %d saved ports" %
+                 (len(self.port_tags), len(saved)))
+        return local_bindings, vif_ports
+
+    def save_state(self, local_bindings, vif_ports):
+        bindings = {}
+        for vif_id, port in vif_ports.iteritems():
+            if vif_id in self.port_tags:
+                bindings[vif_id] = {"port_name": port.port_name,
+                                    "ofport": port.ofport,
+                                    "vif_mac": port.vif_mac,
+                                    "net_id": local_bindings.get(vif_id),
+                                    "tag": self.port_tags[vif_id][1]}
+        self.local_state.save(bindings)
+
+    def update_ports(self, db, old_local_bindings, old_vif_ports):
+        """
+        Binds the VIF ports of the integration bridge to the vlans of
+        their networks, returns the new local bindings and VIF ports
+        """
+        vif_ports = self.int_br.get_vif_ports()
+
+        # Only the ports bound to the host, or of the VIFs on the bridge
+        # or which were on it during the previous pass, are read
+        all_bindings = {}
+        interface_ids = set(old_vif_ports.keys())
+        interface_ids.update([p.vif_id for p in vif_ports])
+        try:
+            ports = db.get_ports(self.host, interface_ids)
+        except:
+            ports = []
+        for port in ports:
+            all_bindings[port.interface_id] = port
+
+        try:
+            vlan_bindings = db.get_vlan_bindings()
+        except:
+            vlan_bindings = {}
+
+        # uuid -> new op_status of the ports
+        op_statuses = {}
+
+        def set_op_status(vif_id, op_status):
+            port = all_bindings.get(vif_id)
+            if port is not None:
+                op_statuses[port.uuid] = op_status
+
+        new_vif_ports = {}
+        new_local_bindings = {}
+        for p in vif_ports:
+            new_vif_ports[p.vif_id] = p
+            if p.vif_id in all_bindings:
+                net_id = all_bindings[p.vif_id].network_id
+                new_local_bindings[p.vif_id] = net_id
+
+            old_b = old_local_bindings.get(p.vif_id, None)
+            new_b = new_local_bindings.get(p.vif_id, None)
+
+            if old_b != new_b and old_b is not None:
+                LOG.info("Removing binding to net-id = %s for %s"
+                  % (old_b, str(p)))
+                self.port_unbound(p, True)
+                set_op_status(p.vif_id, OP_STATUS_DOWN)
+            if new_b is not None:
+                # If we don't have a binding we have to stick it on
+                # the dead vlan
+                vlan_id = str(vlan_bindings.get(new_b, DEAD_VLAN_TAG))
+                if old_b != new_b or \
+                   self.port_tags.get(p.vif_id) != (p.ofport, vlan_id):
+                    self.port_bound(p, vlan_id)
+                    set_op_status(p.vif_id, OP_STATUS_UP)
+                    LOG.info("Adding binding to net-id = %s " \
+                         "for %s on vlan %s" % (new_b, str(p), vlan_id))
+            elif self.port_tags.get(p.vif_id) != (p.ofport, DEAD_VLAN_TAG):
+                # no binding, put him on the 'dead vlan'
+                self.port_dead(p)
+
+        for vif_id in old_vif_ports.keys():
+            if vif_id not in new_vif_ports:
+                LOG.info("Port Disappeared: %s" % vif_id)
+                self.port_unbound(old_vif_ports[vif_id], False)
+                set_op_status(vif_id, OP_STATUS_DOWN)
+
+        # The ports whose VIF is on the bridge are bound to the host, and
+        # unbound from it once their VIF left. Only the ports whose status
+        # or host changed are written
+        statuses = {}
+        for vif_id, port in all_bindings.iteritems():
+            op_status = op_statuses.get(port.uuid, port.op_status)
+            if vif_id in new_vif_ports:
+                host = self.host
+            elif port.host == self.host:
+                host = None
+            else:
+                host = port.host
+            if (op_status, host) != (port.op_status, port.host):
+                statuses[port.uuid] = (op_status, host)
+        db.set_port_statuses(statuses)
+        self.save_state(new_local_bindings, new_vif_ports)
+        return new_local_bindings, new_vif_ports
+
+    def report_heartbeat(self, db):
+        """Records the heartbeat of the agent, reported by GET /healthz"""
+        try:
+            db.set_heartbeat(self.host, AGENT_TYPE,
+                             datetime.datetime.utcnow())
+        except Exception, e:
+            LOG.warn("Unable to record the agent heartbeat: %s" % e)
+
     def daemon_loop(self, db):
         self.local_vlan_map = {}
         old_local_bindings = {}
         old_vif_ports = {}
+        if self.saved_state is not None:
+            old_local_bindings, old_vif_ports = \
+                    self.restore_state(self.saved_state)
 
         while True:
-
-            all_bindings = {}
-            try:
-                ports = db.ports.all()
-            except:
-                ports = []
-            for port in ports:
-                all_bindings[port.interface_id] = port
-
-            vlan_bindings = {}
-            try:
-                vlan_binds = db.vlan_bindings.all()
-            except:
-                vlan_binds = []
-            for bind in vlan_binds:
-                vlan_bindings[bind.network_id] = bind.vlan_id
-
-            new_vif_ports = {}
-            new_local_bindings = {}
-            vif_ports = self.int_br.get_vif_ports()
-            for p in vif_ports:
-                new_vif_ports[p.vif_id] = p
-                if p.vif_id in all_bindings:
-                    net_id = all_bindings[p.vif_id].network_id
-                    new_local_bindings[p.vif_id] = net_id
-                else:
-                    # no binding, put him on the 'dead vlan'
-                    self.int_br.set_db_attribute("Port", p.port_name, "tag",
-                              "4095")
-                    self.int_br.add_flow(priority=2,
-                           match="in_port=%s" % p.ofport, actions="drop")
-
-                old_b = old_local_bindings.get(p.vif_id, None)
-                new_b = new_local_bindings.get(p.vif_id, None)
-
-                if old_b != new_b:
-                    if old_b is not None:
-                        LOG.info("Removing binding to net-id = %s for %s"
-                          % (old_b, str(p)))
-                        self.port_unbound(p, True)
-                        if p.vif_id in all_bindings:
-                            all_bindings[p.vif_id].op_status = OP_STATUS_DOWN
-                    if new_b is not None:
-                        # If we don't have a binding we have to stick it on
-                        # the dead vlan
-                        net_id = all_bindings[p.vif_id].network_id
-                        vlan_id = vlan_bindings.get(net_id, "4095")
-                        self.port_bound(p, vlan_id)
-                        if p.vif_id in all_bindings:
-                            all_bindings[p.vif_id].op_status = OP_STATUS_UP
-                        LOG.info("Adding binding to net-id = %s " \
-                             "for %s on vlan %s" % (new_b, str(p), vlan_id))
-
-            for vif_id in old_vif_ports.keys():
-                if vif_id not in new_vif_ports:
-                    LOG.info("Port Disappeared: %s" % vif_id)
-                    if vif_id in old_local_bindings:
-                        old_b = old_local_bindings[vif_id]
-                        self.port_unbound(old_vif_ports[vif_id], False)
-                    if vif_id in all_bindings:
-                        all_bindings[vif_id].op_status = OP_STATUS_DOWN
-
-            old_vif_ports = new_vif_ports
-            old_local_bindings = new_local_bindings
-            db.commit()
+            start = time.time()
+            old_local_bindings, old_vif_ports = \
+                    self.update_ports(db, old_local_bindings, old_vif_ports)
+            self.report_heartbeat(db)
+            if metrics:
+                metrics.histogram("agent.ovs.loop.latency").\
+                        observe_since(start)
+                metrics.gauge("agent.ovs.vif_ports").set(len(old_vif_ports))
             time.sleep(2)
 
 if __name__ == "__main__":
@@ -289,12 +552,25 @@ if __name__ == "__main__":
 
     integ_br = config.get("OVS", "integration-bridge")
 
+    if metrics and config.has_option("AGENT", "statsd_host"):
+        statsd_interval = 10
+        if config.has_option("AGENT", "statsd_interval"):
+            statsd_interval = config.get("AGENT", "statsd_interval")
+        metrics.StatsdEmitter(config.get("AGENT", "statsd_host"),
+                              config.get("AGENT", "statsd_port"),
+                              statsd_interval,
+                              prefix="quantum.ovs_agent").start()
+
     options = {"sql_connection": config.get("DATABASE", "sql_connection")}
-    db = SqlSoup(options["sql_connection"])
+    db = AgentDB(options["sql_connection"])
 
     LOG.info("Connecting to database \"%s\" on %s" %
              (db.engine.url.database, db.engine.url.host))
-    plugin = OVSQuantumAgent(integ_br)
+    state_path = None
+    if config.has_option("AGENT", "state_file"):
+        state_path = config.get("AGENT", "state_file")
+
+    plugin = OVSQuantumAgent(integ_br, state_path=state_path)
     plugin.daemon_loop(db)
 
     sys.exit(0)
@@ -18,6 +18,7 @@
 # @author: Dan Wendlandt, Nicira Networks, Inc.
 
 
+from sqlalchemy import exc as sa_exc
 from sqlalchemy.orm import exc
 
 import quantum.db.api as db
@@ -38,6 +39,39 @@ def get_vlans():
     return res
 
 
+def get_vlan_ids(start, end):
+    """Returns the vlans in use from start to end"""
+    session = db.get_session()
+    bindings = session.query(ovs_models.VlanBinding.vlan_id).\
+      filter(ovs_models.VlanBinding.vlan_id >= start).\
+      filter(ovs_models.VlanBinding.vlan_id <= end).\
+      all()
+    return [binding.vlan_id for binding in bindings]
+
+
+def get_vlan_network(vlanid):
+    session = db.get_session()
+    try:
+        binding = session.query(ovs_models.VlanBinding).\
+          filter_by(vlan_id=vlanid).\
+          one()
+    except exc.NoResultFound:
+        return None
+    return binding.network_id
+
+
+def reserve_vlan_binding(vlanid, netid):
+    """Binds a vlan to a network, returns False if the vlan is taken"""
+    session = db.get_session()
+    binding = ovs_models.VlanBinding(vlanid, netid)
+    session.add(binding)
+    try:
+        session.flush()
+    except sa_exc.IntegrityError:
+        return False
+    return True
+
+
 def add_vlan_binding(vlanid, netid):
     session = db.get_session()
     binding = ovs_models.VlanBinding(vlanid, netid)
@@ -54,5 +88,6 @@ def remove_vlan_binding(netid):
           one()
         session.delete(binding)
     except exc.NoResultFound:
-            pass
+        return None
     session.flush()
+    return binding.vlan_id
@@ -28,6 +28,7 @@ from quantum.common import exceptions as q_exc
 from quantum.common.config import find_config_file
 from quantum.quantum_plugin_base import QuantumPluginBase
 
+from quantum.db import vlan_allocator
 import quantum.db.api as db
 import ovs_db
 
@@ -40,37 +41,56 @@ LOG.getLogger("ovs_quantum_plugin")
 
 
 class VlanMap(object):
-    vlans = {}
-    net_ids = {}
-    free_vlans = set()
-
-    def __init__(self):
-        self.vlans.clear()
-        self.net_ids.clear()
-        self.free_vlans = set(xrange(2, 4094))
-
-    def set_vlan(self, vlan_id, network_id):
-        self.vlans[vlan_id] = network_id
-        self.net_ids[network_id] = vlan_id
+    """
+    Allocates vlans to networks. The allocations are the rows of the
+    vlan_bindings table, whose primary key makes a reservation atomic
+    across API servers sharing the database. The vlans in use are cached
+    in a bitmap. When another server took the vlan, the bitmap is reloaded
+    for the vlans following it and the allocation retried.
+    """
+    RELOAD_WINDOW = 64
+    VLAN_MIN = 2
+    VLAN_MAX = 4093
+
+    def __init__(self, vlan_min=VLAN_MIN, vlan_max=VLAN_MAX):
+        self.vlan_min = vlan_min
+        self.vlan_max = vlan_max
+        self.conflicts = 0
+        self.reload()
+
+    def reload(self):
+        self.used = vlan_allocator.VlanBitmap(self.vlan_min, self.vlan_max)
+        for vlan_id, _network_id in ovs_db.get_vlans():
+            self.used.set_used(vlan_id)
 
     def acquire(self, network_id):
-        if len(self.free_vlans):
-            vlan = self.free_vlans.pop()
-            self.set_vlan(vlan, network_id)
-            # LOG.debug("VlanMap::acquire %s -> %s", x, network_id)
-            return vlan
-        else:
-            raise Exception("No free vlans..")
+        reloaded = False
+        while True:
+            vlan = self.used.lowest_free()
+            if vlan is None:
+                if reloaded:
+                    raise Exception("No free vlans..")
+                self.reload()
+                reloaded = True
+                continue
+            self.used.set_used(vlan)
+            if ovs_db.reserve_vlan_binding(vlan, network_id):
+                # LOG.debug("VlanMap::acquire %s -> %s", vlan, network_id)
+                return vlan
+            # The vlans next to it are likely taken as well
+            LOG.debug("Vlan %s already reserved" % vlan)
+            self.conflicts += 1
+            for vlan_id in ovs_db.get_vlan_ids(vlan,
+                                               vlan + self.RELOAD_WINDOW):
+                self.used.set_used(vlan_id)
 
     def get(self, vlan_id):
-        return self.vlans.get(vlan_id, None)
+        return ovs_db.get_vlan_network(vlan_id)
 
     def release(self, network_id):
-        vlan = self.net_ids.get(network_id, None)
+        vlan = ovs_db.remove_vlan_binding(network_id)
         if vlan is not None:
-            self.free_vlans.add(vlan)
-            del self.vlans[vlan]
-            del self.net_ids[network_id]
+            self.used.set_free(vlan)
             # LOG.debug("VlanMap::release %s", vlan)
         else:
             LOG.error("No vlan found with network \"%s\"", network_id)
@@ -97,18 +117,10 @@ class OVSQuantumPlugin(QuantumPluginBase):
         db.configure_db(options)
 
         self.vmap = VlanMap()
-        # Populate the map with anything that is already present in the
-        # database
-        vlans = ovs_db.get_vlans()
-        for x in vlans:
-            vlan_id, network_id = x
-            # LOG.debug("Adding already populated vlan %s -> %s"
-            #                                   % (vlan_id, network_id))
-            self.vmap.set_vlan(vlan_id, network_id)
 
     def get_all_networks(self, tenant_id, **kwargs):
         nets = []
-        for x in db.network_list(tenant_id):
+        for x in db.network_list_rows(tenant_id):
             LOG.debug("Adding network: %s" % x.uuid)
             nets.append(self._make_net_dict(str(x.uuid), x.name,
                                             None, x.op_status))
@@ -126,8 +138,7 @@ class OVSQuantumPlugin(QuantumPluginBase):
         net = db.network_create(tenant_id, net_name,
                           op_status=OperationalStatus.UP)
         LOG.debug("Created network: %s" % net)
-        vlan_id = self.vmap.acquire(str(net.uuid))
-        ovs_db.add_vlan_binding(vlan_id, str(net.uuid))
+        self.vmap.acquire(str(net.uuid))
         return self._make_net_dict(str(net.uuid), net.name, [],
                                         net.op_status)
 
@@ -135,17 +146,15 @@ class OVSQuantumPlugin(QuantumPluginBase):
         net = db.network_get(net_id)
 
         # Verify that no attachments are plugged into the network
-        for port in db.port_list(net_id):
-            if port.interface_id:
-                raise q_exc.NetworkInUse(net_id=net_id)
+        if db.network_in_use(net_id):
+            raise q_exc.NetworkInUse(net_id=net_id)
         net = db.network_destroy(net_id)
-        ovs_db.remove_vlan_binding(net_id)
         self.vmap.release(net_id)
         return self._make_net_dict(str(net.uuid), net.name, [],
                                         net.op_status)
 
     def get_network_details(self, tenant_id, net_id):
-        net = db.network_get(net_id)
+        net = db.network_get_row(net_id)
         ports = self.get_all_ports(tenant_id, net_id)
         return self._make_net_dict(str(net.uuid), net.name,
                                     ports, net.op_status)
@@ -169,7 +178,7 @@ class OVSQuantumPlugin(QuantumPluginBase):
 
     def get_all_ports(self, tenant_id, net_id, **kwargs):
         ids = []
-        ports = db.port_list(net_id)
+        ports = db.port_list_rows(net_id)
         # This plugin does not perform filtering at the moment
         return [{'port-id': str(p.uuid)} for p in ports]
 
@@ -193,7 +202,7 @@ class OVSQuantumPlugin(QuantumPluginBase):
         return self._make_port_dict(port)
 
     def get_port_details(self, tenant_id, net_id, port_id):
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_row(port_id, net_id)
         return self._make_port_dict(port)
 
     def plug_interface(self, tenant_id, net_id, port_id, remote_iface_id):
@@ -204,5 +213,5 @@ class OVSQuantumPlugin(QuantumPluginBase):
         db.port_update(port_id, net_id, op_status=OperationalStatus.DOWN)
 
     def get_interface_details(self, tenant_id, net_id, port_id):
-        res = db.port_get(port_id, net_id)
+        res = db.port_get_row(port_id, net_id)
         return res.interface_id
@@ -0,0 +1,117 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 Nicira Networks, Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+In-memory Open vSwitch backend for the OVS agent, to run the agent without
+ovs-vsctl and ovs-ofctl.
+"""
+
+
+class FakeOVSRunner(object):
+    """
+    Command runner for the OVS agent keeping a fake OVSDB (bridges, ports
+    and interfaces) and flow tables in memory. Counts the commands which
+    would have been run as subprocesses.
+    """
+
+    def __init__(self):
+        self.commands = 0
+        self.bridges = {}
+        self.interfaces = {}
+        self.tags = {}
+        self.flows = {}
+        self._next_ofport = 1
+
+    def add_vif(self, br_name, port_name, vif_id, vif_mac):
+        """Plugs a VIF, as the hypervisor would"""
+        self.bridges.setdefault(br_name, []).append(port_name)
+        self.interfaces[port_name] = {
+            'external_ids': {'iface-id': vif_id, 'attached-mac': vif_mac},
+            'ofport': self._next_ofport}
+        self._next_ofport += 1
+
+    def remove_vif(self, br_name, port_name):
+        """Unplugs a VIF, as the hypervisor would"""
+        self.bridges[br_name].remove(port_name)
+        del self.interfaces[port_name]
+        self.tags.pop(port_name, None)
+
+    def run_cmd(self, args):
+        self.commands += 1
+        if args[0] == "ovs-vsctl":
+            # Skip --timeout and the -- and --if-exists options
+            args = [arg for arg in args[1:] if not arg.startswith("--")]
+            return getattr(self, "_vsctl_" + args[0].replace("-", "_"))(
+                *args[1:])
+        elif args[0] == "ovs-ofctl":
+            return getattr(self, "_ofctl_" + args[1].replace("-", "_"))(
+                *args[2:])
+        raise ValueError("Unsupported command: %s" % " ".join(args))
+
+    def _vsctl_add_br(self, br_name):
+        self.bridges.setdefault(br_name, [])
+        self.flows.setdefault(br_name, [])
+        return ""
+
+    def _vsctl_del_br(self, br_name):
+        for port_name in self.bridges.pop(br_name, []):
+            self.interfaces.pop(port_name, None)
+            self.tags.pop(port_name, None)
+        self.flows.pop(br_name, None)
+        return ""
+
+    def _vsctl_del_port(self, br_name, port_name):
+        if port_name in self.bridges.get(br_name, []):
+            self.remove_vif(br_name, port_name)
+        return ""
+
+    def _vsctl_list_ports(self, br_name):
+        return "".join(["%s\n" % port_name
+                        for port_name in self.bridges.get(br_name, [])])
+
+    def _vsctl_get(self, table, record, column):
+        if table == "Port" and column == "tag":
+            return "%s\n" % self.tags.get(record, "[]")
+        value = self.interfaces[record].get(column, {})
+        if isinstance(value, dict):
+            return "{%s}\n" % ", ".join(['%s="%s"' % item
+                                         for item in sorted(value.items())])
+        return "%s\n" % value
+
+    def _vsctl_set(self, table, record, value):
+        column, value = value.split("=", 1)
+        if table == "Port" and column == "tag":
+            self.tags[record] = value
+        else:
+            self.interfaces[record][column] = value
+        return ""
+
+    def _vsctl_clear(self, table, record, column):
+        if table == "Port" and column == "tag":
+            self.tags.pop(record, None)
+        else:
+            self.interfaces[record].pop(column, None)
+        return ""
+
+    def _ofctl_add_flow(self, br_name, flow):
+        self.flows.setdefault(br_name, []).append(flow)
+        return ""
+
+    def _ofctl_del_flows(self, br_name, match=""):
+        fields = set([field for field in match.split(",") if field])
+        self.flows[br_name] = [flow for flow in self.flows.get(br_name, [])
+                               if not fields.issubset(flow.split(","))]
+        return ""
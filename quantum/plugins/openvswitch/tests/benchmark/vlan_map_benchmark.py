@@ -0,0 +1,95 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2011 Nicira Networks, Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark of the OVS plugin vlan allocation.
+
+Allocates vlans sequentially through one VlanMap, then concurrently
+through several VlanMaps sharing the database, as API servers would.
+
+    python -m quantum.plugins.openvswitch.tests.benchmark.vlan_map_benchmark
+"""
+
+from optparse import OptionParser
+import sys
+import time
+
+import eventlet
+
+import quantum.db.api as db
+from quantum.plugins.openvswitch.ovs_quantum_plugin import VlanMap
+
+
+def _acquire(vmap, network_ids, vlans):
+    for network_id in network_ids:
+        vlans.append(vmap.acquire(network_id))
+        # Let the other servers run between allocations
+        eventlet.sleep(0)
+
+
+def run_sequential(count):
+    vmap = VlanMap()
+    vlans = []
+    start = time.time()
+    _acquire(vmap, ["net%d" % i for i in xrange(count)], vlans)
+    return time.time() - start, vlans, vmap.conflicts
+
+
+def run_concurrent(count, servers):
+    vmaps = [VlanMap() for _i in xrange(servers)]
+    vlans = []
+    pool = eventlet.GreenPool(servers)
+    start = time.time()
+    for i, vmap in enumerate(vmaps):
+        pool.spawn(_acquire, vmap,
+                   ["net%d-%d" % (i, j) for j in xrange(i, count, servers)],
+                   vlans)
+    pool.waitall()
+    return (time.time() - start, vlans,
+            sum([vmap.conflicts for vmap in vmaps]))
+
+
+def _report(name, count, elapsed, vlans, conflicts):
+    assert len(set(vlans)) == count, "Duplicate vlans allocated"
+    print "%-28s %6d vlans %8.3fs %10.1f us/vlan %6d conflicts" % \
+            (name, count, elapsed, elapsed / count * 1000000, conflicts)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-n", "--count", type="int", default=4000,
+                      help="Number of vlans to allocate")
+    parser.add_option("-s", "--servers", type="int", default=4,
+                      help="Number of concurrent VlanMaps")
+    parser.add_option("--sql-connection", default="sqlite:///:memory:",
+                      help="Database to allocate from")
+    options, _args = parser.parse_args()
+
+    db.configure_db({'sql_connection': options.sql_connection})
+    db.clear_db()
+    elapsed, vlans, conflicts = run_sequential(options.count)
+    _report("sequential", options.count, elapsed, vlans, conflicts)
+    db.clear_db()
+    elapsed, vlans, conflicts = run_concurrent(options.count,
+                                               options.servers)
+    _report("concurrent (%d servers)" % options.servers, options.count,
+            elapsed, vlans, conflicts)
+    db.clear_db()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
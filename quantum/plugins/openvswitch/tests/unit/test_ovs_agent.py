@@ -0,0 +1,164 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 Nicira Networks, Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import event
+
+from quantum.plugins.openvswitch.agent import ovs_quantum_agent
+from quantum.plugins.openvswitch.tests.benchmark.fake_ovs import \
+        FakeOVSRunner
+
+
+BRIDGE = "br-int"
+WRITE_COMMANDS = ("set", "clear", "add-flow", "del-flows")
+
+
+class RecordingOVSRunner(FakeOVSRunner):
+
+    def __init__(self):
+        FakeOVSRunner.__init__(self)
+        self.writes = []
+
+    def run_cmd(self, args):
+        if [arg for arg in args if arg in WRITE_COMMANDS]:
+            self.writes.append(" ".join(args))
+        return FakeOVSRunner.run_cmd(self, args)
+
+
+class OVSAgentStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.state_path = os.path.join(self.tmp_dir, "ovs_agent.state")
+        self.db = ovs_quantum_agent.AgentDB(
+            "sqlite:///%s" % os.path.join(self.tmp_dir, "ovs.sqlite"))
+        ovs_quantum_agent.METADATA.create_all(self.db.engine)
+        self.db.engine.execute(ovs_quantum_agent.VLAN_BINDINGS.insert(),
+                               [{"vlan_id": 2, "network_id": "net1"},
+                                {"vlan_id": 3, "network_id": "net2"}])
+        self.runner = RecordingOVSRunner()
+        for i, net_id in enumerate(["net1", "net1", "net2"]):
+            self.db.engine.execute(ovs_quantum_agent.PORTS.insert(),
+                                   uuid="port%d" % i, network_id=net_id,
+                                   interface_id="vif%d" % i,
+                                   op_status="DOWN")
+            self.runner.add_vif(BRIDGE, "tap%d" % i, "vif%d" % i,
+                                "fa:16:3e:00:00:0%d" % i)
+        self.runner.add_vif(BRIDGE, "tap9", "vif9", "fa:16:3e:00:00:09")
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        shutil.rmtree(self.tmp_dir)
+
+    def _port_column(self, column):
+        ports = ovs_quantum_agent.PORTS
+        return dict(self.db.engine.execute(
+            ports.select().with_only_columns([ports.c.uuid,
+                                              ports.c[column]])).fetchall())
+
+    def _op_statuses(self):
+        return self._port_column("op_status")
+
+    def _start_agent(self):
+        agent = ovs_quantum_agent.OVSQuantumAgent(BRIDGE, self.runner,
+                                                  self.state_path)
+        bindings, vif_ports = {}, {}
+        if agent.saved_state is not None:
+            bindings, vif_ports = agent.restore_state(agent.saved_state)
+        return agent, agent.update_ports(self.db, bindings, vif_ports)
+
+    def testRestartWithoutChanges(self):
+        self._start_agent()
+        self.assertEqual(self.runner.tags, {"tap0": "2", "tap1": "2",
+                                            "tap2": "3", "tap9": "4095"})
+        self.assertTrue(os.path.exists(self.state_path))
+
+        del self.runner.writes[:]
+        agent, (bindings, vif_ports) = self._start_agent()
+        self.assertEqual(self.runner.writes,
+                         ["ovs-ofctl add-flow br-int "
+                          "priority=1,actions=normal"])
+        self.assertEqual(bindings, {"vif0": "net1", "vif1": "net1",
+                                    "vif2": "net2"})
+        self.assertEqual(len(vif_ports), 4)
+
+    def testOnlyChangedStatusesAreWritten(self):
+        statements = []
+        event.listen(self.db.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args:
+                     statements.append(statement))
+        agent, (bindings, vif_ports) = self._start_agent()
+        self.assertEqual(self._op_statuses(),
+                         {"port0": "UP", "port1": "UP", "port2": "UP"})
+        self.assertEqual(len([s for s in statements
+                              if s.startswith("UPDATE")]), 1)
+
+        del statements[:]
+        agent.update_ports(self.db, bindings, vif_ports)
+        # Ports bound to the host, vif9 which has no port, and vlans
+        self.assertEqual(len(statements), 3)
+        self.assertFalse([s for s in statements if s.startswith("UPDATE")])
+
+    def testPortsAreBoundToHost(self):
+        self.db.engine.execute(ovs_quantum_agent.PORTS.insert(),
+                               uuid="port5", network_id="net1",
+                               interface_id="vif5", op_status="UP",
+                               host="other")
+        agent, (bindings, vif_ports) = self._start_agent()
+        self.assertEqual(self._port_column("host"),
+                         {"port0": agent.host, "port1": agent.host,
+                          "port2": agent.host, "port5": "other"})
+
+        # The VIF moved to this host
+        self.runner.add_vif(BRIDGE, "tap5", "vif5", "fa:16:3e:00:00:05")
+        agent.update_ports(self.db, bindings, vif_ports)
+        self.assertEqual(self._port_column("host")["port5"], agent.host)
+
+    def testPortsAreUnboundWhenVifLeaves(self):
+        agent, (bindings, vif_ports) = self._start_agent()
+        self.runner.remove_vif(BRIDGE, "tap2")
+        bindings, vif_ports = agent.update_ports(self.db, bindings, vif_ports)
+        self.assertEqual(self._port_column("host")["port2"], None)
+        self.assertEqual(self._op_statuses()["port2"], "DOWN")
+
+        # The port is no longer read with the ports of the host
+        self.assertFalse("port2" in [port.uuid for port in
+                                     self.db.get_ports(agent.host, [])])
+
+    def testRestartAfterChanges(self):
+        self._start_agent()
+        # While the agent is down, a tag is changed and a port unplugged
+        self.runner.tags["tap1"] = "7"
+        self.runner.remove_vif(BRIDGE, "tap2")
+
+        del self.runner.writes[:]
+        self._start_agent()
+        self.assertEqual(self.runner.writes[1:],
+                         ["ovs-vsctl --timeout=2 set Port tap1 tag=2",
+                          "ovs-ofctl del-flows br-int in_port=2"])
+        self.assertEqual(self._op_statuses()["port2"], "DOWN")
+
+    def testUnreadableStateIsIgnored(self):
+        with open(self.state_path, "w") as state_file:
+            state_file.write("{not json")
+        agent, (bindings, vif_ports) = self._start_agent()
+        self.assertTrue(agent.saved_state is None)
+        self.assertTrue("ovs-ofctl del-flows br-int" in self.runner.writes)
+        self.assertEqual(len(bindings), 3)
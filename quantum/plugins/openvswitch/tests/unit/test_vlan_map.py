@@ -16,15 +16,18 @@
 
 import unittest
 from ovs_quantum_plugin import VlanMap
+import quantum.db.api as db
 
 
 class VlanMapTest(unittest.TestCase):
 
     def setUp(self):
+        db.configure_db({'sql_connection': 'sqlite:///:memory:'})
+        db.register_models()
         self.vmap = VlanMap()
 
     def tearDown(self):
-        pass
+        db.clear_db()
 
     def testAddVlan(self):
         vlan_id = self.vmap.acquire("foobar")
@@ -43,3 +46,19 @@ class VlanMapTest(unittest.TestCase):
         for id in range(2, 4000):
             self.vmap.release(id)
             self.assertTrue(self.vmap.get(id) is None)
+
+    def testReleasedVlanIsReused(self):
+        self.vmap.acquire("foo")
+        vlan_id = self.vmap.acquire("bar")
+        self.vmap.acquire("baz")
+        self.vmap.release("bar")
+        self.assertTrue(self.vmap.acquire("qux") == vlan_id)
+
+    def testSharedVlans(self):
+        # Another server allocating from the same database
+        other = VlanMap()
+        vlan_id = self.vmap.acquire("foo")
+        other_vlan_id = other.acquire("bar")
+        self.assertTrue(vlan_id != other_vlan_id)
+        self.assertTrue(other.conflicts == 1)
+        self.assertTrue(self.vmap.get(other_vlan_id) == "bar")
@@ -17,11 +17,18 @@
 # @author: Salvatore Orlando, Citrix
 
 import logging
+import uuid
 
 from quantum.api.api_common import OperationalStatus
 from quantum.common import exceptions as exc
 from quantum.db import api as db
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    # Python 2.6, the in-memory networks and ports are listed unordered
+    OrderedDict = dict
+
 LOG = logging.getLogger('quantum.plugins.sample.SamplePlugin')
 
 
@@ -135,7 +142,7 @@ class FakePlugin(object):
 
     def _get_network(self, tenant_id, network_id):
         try:
-            network = db.network_get(network_id)
+            network = db.network_get_row(network_id)
         except:
             raise exc.NetworkNotFound(net_id=network_id)
         return network
@@ -143,7 +150,7 @@ class FakePlugin(object):
     def _get_port(self, tenant_id, network_id, port_id):
         net = self._get_network(tenant_id, network_id)
         try:
-            port = db.port_get(port_id, network_id)
+            port = db.port_get_row(port_id, network_id)
         except:
             raise exc.PortNotFound(net_id=network_id, port_id=port_id)
         # Port must exist and belong to the appropriate network.
@@ -158,7 +165,7 @@ class FakePlugin(object):
 
     def _validate_attachment(self, tenant_id, network_id, port_id,
                              remote_interface_id):
-        for port in db.port_list(network_id):
+        for port in db.port_list_rows(network_id):
             if port['interface_id'] == remote_interface_id:
                 raise exc.AlreadyAttached(net_id=network_id,
                                           port_id=port_id,
@@ -177,7 +184,7 @@ class FakePlugin(object):
             LOG.debug("filtering options were passed to the plugin"
                       "but the Fake plugin does not support them")
         nets = []
-        for net in db.network_list(tenant_id):
+        for net in db.network_list_rows(tenant_id):
             net_item = {'net-id': str(net.uuid),
                         'net-name': net.name,
                         'net-op-status': net.op_status}
@@ -220,9 +227,8 @@ class FakePlugin(object):
         net = self._get_network(tenant_id, net_id)
         # Verify that no attachments are plugged into the network
         if net:
-            for port in db.port_list(net_id):
-                if port['interface_id']:
-                    raise exc.NetworkInUse(net_id=net_id)
+            if db.network_in_use(net_id):
+                raise exc.NetworkInUse(net_id=net_id)
             db.network_destroy(net_id)
             return net
         # Network not found
@@ -247,7 +253,7 @@ class FakePlugin(object):
             LOG.debug("filtering options were passed to the plugin"
                       "but the Fake plugin does not support them")
         port_ids = []
-        ports = db.port_list(net_id)
+        ports = db.port_list_rows(net_id)
         for x in ports:
             d = {'port-id': str(x.uuid)}
             port_ids.append(d)
@@ -338,3 +344,195 @@ class FakePlugin(object):
         # TODO(salvatore-orlando):
         # Should unplug on port without attachment raise an Error?
         db.port_unset_attachment(port_id, net_id)
+
+
+class InMemoryFakePlugin(FakePlugin):
+    """
+    InMemoryFakePlugin is a FakePlugin that keeps networks and ports in
+    dictionaries indexed by tenant, network and attachment instead of a
+    sqlite database, so that every operation takes constant time.
+    It is meant for measuring the throughput and latency of the API
+    in isolation.
+    """
+
+    def __init__(self):
+        self._networks = {}
+        self._tenant_networks = {}
+        self._network_ports = {}
+        self._attachments = {}
+
+    def _get_network(self, tenant_id, network_id):
+        try:
+            return self._networks[network_id]
+        except KeyError:
+            raise exc.NetworkNotFound(net_id=network_id)
+
+    def _get_port(self, tenant_id, network_id, port_id):
+        self._get_network(tenant_id, network_id)
+        try:
+            return self._network_ports[network_id][port_id]
+        except KeyError:
+            raise exc.PortNotFound(net_id=network_id, port_id=port_id)
+
+    def _validate_attachment(self, tenant_id, network_id, port_id,
+                             remote_interface_id):
+        port = self._attachments.get(remote_interface_id)
+        if port:
+            raise exc.AlreadyAttached(net_id=network_id,
+                                      port_id=port_id,
+                                      att_id=remote_interface_id,
+                                      att_port_id=port['uuid'])
+
+    def get_all_networks(self, tenant_id, **kwargs):
+        """
+        Returns a dictionary containing all
+        <network_uuid, network_name> for
+        the specified tenant.
+        """
+        LOG.debug("InMemoryFakePlugin.get_all_networks() called")
+        return [{'net-id': net['uuid'],
+                 'net-name': net['name'],
+                 'net-op-status': net['op_status']}
+                for net in self._tenant_networks.get(tenant_id,
+                                                     {}).itervalues()]
+
+    def get_network_details(self, tenant_id, net_id):
+        """
+        retrieved a list of all the remote vifs that
+        are attached to the network
+        """
+        LOG.debug("InMemoryFakePlugin.get_network_details() called")
+        net = self._get_network(tenant_id, net_id)
+        return {'net-id': net['uuid'],
+                'net-name': net['name'],
+                'net-op-status': net['op_status'],
+                'net-ports': self.get_all_ports(tenant_id, net_id)}
+
+    def create_network(self, tenant_id, net_name, **kwargs):
+        """
+        Creates a new Virtual Network, and assigns it
+        a symbolic name.
+        """
+        LOG.debug("InMemoryFakePlugin.create_network() called")
+        net = {'uuid': str(uuid.uuid4()),
+               'tenant_id': tenant_id,
+               'name': net_name,
+               'op_status': OperationalStatus.UP}
+        self._networks[net['uuid']] = net
+        self._tenant_networks.setdefault(tenant_id,
+                                         OrderedDict())[net['uuid']] = net
+        self._network_ports[net['uuid']] = OrderedDict()
+        return {'net-id': net['uuid']}
+
+    def delete_network(self, tenant_id, net_id):
+        """
+        Deletes the network with the specified network identifier
+        belonging to the specified tenant.
+        """
+        LOG.debug("InMemoryFakePlugin.delete_network() called")
+        net = self._get_network(tenant_id, net_id)
+        # Verify that no attachments are plugged into the network
+        for port in self._network_ports[net_id].itervalues():
+            if port['interface_id']:
+                raise exc.NetworkInUse(net_id=net_id)
+        del self._networks[net_id]
+        del self._tenant_networks[net['tenant_id']][net_id]
+        del self._network_ports[net_id]
+        return net
+
+    def update_network(self, tenant_id, net_id, **kwargs):
+        """
+        Updates the attributes of a particular Virtual Network.
+        """
+        LOG.debug("InMemoryFakePlugin.update_network() called")
+        net = self._get_network(tenant_id, net_id)
+        net.update(kwargs)
+        return net
+
+    def get_all_ports(self, tenant_id, net_id, **kwargs):
+        """
+        Retrieves all port identifiers belonging to the
+        specified Virtual Network.
+        """
+        LOG.debug("InMemoryFakePlugin.get_all_ports() called")
+        self._get_network(tenant_id, net_id)
+        return [{'port-id': port_id}
+                for port_id in self._network_ports[net_id].iterkeys()]
+
+    def get_port_details(self, tenant_id, net_id, port_id):
+        """
+        This method allows the user to retrieve a remote interface
+        that is attached to this particular port.
+        """
+        LOG.debug("InMemoryFakePlugin.get_port_details() called")
+        port = self._get_port(tenant_id, net_id, port_id)
+        return {'port-id': port['uuid'],
+                'attachment': port['interface_id'],
+                'port-state': port['state'],
+                'port-op-status': port['op_status']}
+
+    def create_port(self, tenant_id, net_id, port_state=None, **kwargs):
+        """
+        Creates a port on the specified Virtual Network.
+        """
+        LOG.debug("InMemoryFakePlugin.create_port() called")
+        self._get_network(tenant_id, net_id)
+        port = {'uuid': str(uuid.uuid4()),
+                'network_id': net_id,
+                'interface_id': None,
+                'state': port_state or 'DOWN',
+                'op_status': OperationalStatus.UP}
+        self._network_ports[net_id][port['uuid']] = port
+        return {'port-id': port['uuid']}
+
+    def update_port(self, tenant_id, net_id, port_id, **kwargs):
+        """
+        Updates the attributes of a port on the specified Virtual Network.
+        """
+        LOG.debug("InMemoryFakePlugin.update_port() called")
+        port = self._get_port(tenant_id, net_id, port_id)
+        if 'state' in kwargs:
+            self._validate_port_state(kwargs['state'])
+        port.update(kwargs)
+        return {'port-id': port_id,
+                'port-state': port['state']}
+
+    def delete_port(self, tenant_id, net_id, port_id):
+        """
+        Deletes a port on a specified Virtual Network,
+        if the port contains a remote interface attachment,
+        the remote interface is first un-plugged and then the port
+        is deleted.
+        """
+        LOG.debug("InMemoryFakePlugin.delete_port() called")
+        port = self._get_port(tenant_id, net_id, port_id)
+        if port['interface_id']:
+            raise exc.PortInUse(net_id=net_id, port_id=port_id,
+                                att_id=port['interface_id'])
+        del self._network_ports[net_id][port_id]
+        return {'port-id': port_id}
+
+    def plug_interface(self, tenant_id, net_id, port_id, remote_interface_id):
+        """
+        Attaches a remote interface to the specified port on the
+        specified Virtual Network.
+        """
+        LOG.debug("InMemoryFakePlugin.plug_interface() called")
+        port = self._get_port(tenant_id, net_id, port_id)
+        self._validate_attachment(tenant_id, net_id, port_id,
+                                  remote_interface_id)
+        if port['interface_id']:
+            raise exc.PortInUse(net_id=net_id, port_id=port_id,
+                                att_id=port['interface_id'])
+        port['interface_id'] = remote_interface_id
+        self._attachments[remote_interface_id] = port
+
+    def unplug_interface(self, tenant_id, net_id, port_id):
+        """
+        Detaches a remote interface from the specified port on the
+        specified Virtual Network.
+        """
+        LOG.debug("InMemoryFakePlugin.unplug_interface() called")
+        port = self._get_port(tenant_id, net_id, port_id)
+        self._attachments.pop(port['interface_id'], None)
+        port['interface_id'] = None
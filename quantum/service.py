@@ -17,6 +17,7 @@
 
 import logging
 from quantum.common import config
+from quantum import metrics
 from quantum import wsgi
 from quantum.common import exceptions as exception
 
@@ -112,4 +113,15 @@ def _run_wsgi(app_name, paste_conf, paste_config_file):
     server = wsgi.Server("Quantum")
     server.start(app,
                  int(paste_conf['bind_port']), paste_conf['bind_host'])
+    if paste_conf.get('metrics_bind_port'):
+        LOG.info(_('Serving the metrics on port %s'),
+                 paste_conf['metrics_bind_port'])
+        server.start(metrics.MetricsApp(),
+                     int(paste_conf['metrics_bind_port']),
+                     paste_conf.get('metrics_bind_host',
+                                    paste_conf['bind_host']))
+    if paste_conf.get('statsd_host'):
+        metrics.StatsdEmitter(paste_conf['statsd_host'],
+                              paste_conf.get('statsd_port', 8125),
+                              paste_conf.get('statsd_interval', 10)).start()
     return server
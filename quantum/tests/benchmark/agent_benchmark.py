@@ -0,0 +1,306 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark of the reconciliation loop of the OVS and LinuxBridge agents.
+
+The agent runs against an sqlite DB and an in-memory fake of the host
+(OVSDB and flows, or devices and bridges) instead of ovs-vsctl, ip and
+brctl. The DB and the host are populated with the networks and the ports,
+the DB also holds the ports of the VIFs of other hosts. Then every
+iteration replaces a fraction of the local ports (unplugging and deleting
+them, and creating and plugging new ones) and runs one pass of the agent
+loop. The wall time, the number of commands the agent would
+have run as subprocesses and the number of DB queries are reported per
+iteration, and for the first pass of the agent restarted from its saved
+local state:
+
+    python -m quantum.tests.benchmark.agent_benchmark -a ovs -p 1000 -r 20000
+    python -m quantum.tests.benchmark.agent_benchmark -a linuxbridge
+"""
+
+from optparse import OptionParser
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import event
+
+import quantum.db.api as db
+from quantum.tests.unit.testlib_db import CountingConnection
+
+
+TENANT_ID = "benchmark_tenant"
+INTEGRATION_BRIDGE = "br-int"
+
+
+class AgentDriver(object):
+    """Runs one agent against the benchmark DB and its fake host"""
+
+    def statement_count(self):
+        """Returns the number of DB queries run by the agent"""
+        raise NotImplementedError()
+
+    def bind_vlan(self, vlan_id, network_id):
+        raise NotImplementedError()
+
+    def plug(self, interface_id):
+        raise NotImplementedError()
+
+    def unplug(self, interface_id):
+        raise NotImplementedError()
+
+    def run_iteration(self):
+        raise NotImplementedError()
+
+    def restart(self):
+        """Replaces the agent by a new one, started from the saved state"""
+        raise NotImplementedError()
+
+
+class OVSAgentDriver(AgentDriver):
+
+    def __init__(self, db_path, state_path):
+        from quantum.plugins.openvswitch import ovs_db
+        from quantum.plugins.openvswitch.agent import ovs_quantum_agent
+        from quantum.plugins.openvswitch.tests.benchmark.fake_ovs import \
+                FakeOVSRunner
+
+        self._ovs_db = ovs_db
+        self._ovs_agent = ovs_quantum_agent
+        self._state_path = state_path
+        db.configure_db({'sql_connection': "sqlite:///%s" % db_path})
+        self.runner = FakeOVSRunner()
+        self.agent = ovs_quantum_agent.OVSQuantumAgent(INTEGRATION_BRIDGE,
+                                                       self.runner,
+                                                       state_path)
+        self._db = ovs_quantum_agent.AgentDB("sqlite:///%s" % db_path)
+        self._statements = 0
+        event.listen(self._db.engine, "before_cursor_execute",
+                     self._executed)
+        self._local_bindings = {}
+        self._vif_ports = {}
+
+    def _executed(self, *args):
+        self._statements += 1
+
+    def statement_count(self):
+        return self._statements
+
+    def _port_name(self, interface_id):
+        return "tap%s" % interface_id[0:11]
+
+    def bind_vlan(self, vlan_id, network_id):
+        self._ovs_db.add_vlan_binding(vlan_id, network_id)
+
+    def plug(self, interface_id):
+        self.runner.add_vif(INTEGRATION_BRIDGE,
+                            self._port_name(interface_id), interface_id,
+                            "fa:16:3e:%02x:%02x:%02x" %
+                            tuple(random.randint(0, 255) for i in xrange(3)))
+
+    def unplug(self, interface_id):
+        self.runner.remove_vif(INTEGRATION_BRIDGE,
+                               self._port_name(interface_id))
+
+    def run_iteration(self):
+        self._local_bindings, self._vif_ports = \
+                self.agent.update_ports(self._db, self._local_bindings,
+                                        self._vif_ports)
+
+    def restart(self):
+        self.agent = self._ovs_agent.OVSQuantumAgent(INTEGRATION_BRIDGE,
+                                                     self.runner,
+                                                     self._state_path)
+        self._local_bindings, self._vif_ports = \
+                self.agent.restore_state(self.agent.saved_state)
+
+
+class LinuxBridgeAgentDriver(AgentDriver):
+
+    def __init__(self, db_path, state_path):
+        from quantum.plugins.linuxbridge.agent import \
+                linuxbridge_quantum_agent as linux_agent
+        from quantum.plugins.linuxbridge.db import l2network_db as cdb
+        from quantum.plugins.linuxbridge.tests.benchmark.fake_linuxbridge \
+                import FakeLinuxBridgeRunner
+
+        self._cdb = cdb
+        db.configure_db({'sql_connection': "sqlite:///%s" % db_path})
+        self.runner = FakeLinuxBridgeRunner()
+        self._state_path = state_path
+        self.agent = linux_agent.LinuxBridgeQuantumAgent(
+            linux_agent.BRIDGE_NAME_PREFIX, "eth1", 2, self.runner,
+            state_path)
+        linux_agent.DB_CONNECTION = 'sqlite'
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        self._conn = CountingConnection(conn)
+        self._linux_agent = linux_agent
+        self._vlan_bindings = {}
+        self._port_bindings = {}
+
+    def statement_count(self):
+        return self._conn.statements
+
+    def bind_vlan(self, vlan_id, network_id):
+        self._cdb.add_vlan_binding(vlan_id, network_id)
+
+    def plug(self, interface_id):
+        self.runner.add_tap(
+            self.agent.linux_br.get_tap_device_name(interface_id))
+
+    def unplug(self, interface_id):
+        self.runner.remove_tap(
+            self.agent.linux_br.get_tap_device_name(interface_id))
+
+    def run_iteration(self):
+        bindings = self.agent.manage_networks_on_host(self._conn,
+                                                      self._vlan_bindings,
+                                                      self._port_bindings)
+        self._vlan_bindings = bindings[self._linux_agent.VLAN_BINDINGS]
+        self._port_bindings = bindings[self._linux_agent.PORT_BINDINGS]
+
+    def restart(self):
+        self.agent = self._linux_agent.LinuxBridgeQuantumAgent(
+            self._linux_agent.BRIDGE_NAME_PREFIX, "eth1", 2, self.runner,
+            self._state_path)
+        self._vlan_bindings = {}
+        self._port_bindings = {}
+
+
+DRIVERS = {'ovs': OVSAgentDriver,
+           'linuxbridge': LinuxBridgeAgentDriver}
+
+
+class AgentBenchmark(object):
+
+    def __init__(self, driver, networks, ports, churn, remote_ports=0,
+                 seed=0):
+        self.driver = driver
+        self.churn = churn
+        self.random = random.Random(seed)
+        self.network_ids = []
+        self.ports = []
+        for i in xrange(networks):
+            network = db.network_create(TENANT_ID, "net-%d" % i)
+            self.driver.bind_vlan(i + 2, network.uuid)
+            self.network_ids.append(network.uuid)
+        for i in xrange(ports):
+            self.add_port(self.network_ids[i % networks])
+        for i in xrange(remote_ports):
+            self.add_port(self.network_ids[i % networks], plug=False)
+
+    def add_port(self, network_id, plug=True):
+        port = db.port_create(network_id, 'ACTIVE')
+        interface_id = str(uuid.uuid4())
+        db.port_set_attachment(port.uuid, network_id, interface_id)
+        if plug:
+            self.driver.plug(interface_id)
+            self.ports.append((network_id, port.uuid, interface_id))
+
+    def remove_port(self, index):
+        network_id, port_id, interface_id = self.ports.pop(index)
+        self.driver.unplug(interface_id)
+        db.port_unset_attachment(port_id, network_id)
+        db.port_destroy(port_id, network_id)
+
+    def churn_ports(self):
+        """Replaces the churn fraction of the ports by new ports"""
+        for _i in xrange(int(round(len(self.ports) * self.churn))):
+            self.remove_port(self.random.randrange(len(self.ports)))
+            self.add_port(self.random.choice(self.network_ids))
+
+    def run_iteration(self, restart=False):
+        commands = self.driver.runner.commands
+        statements = self.driver.statement_count()
+        start = time.time()
+        if restart:
+            self.driver.restart()
+        self.driver.run_iteration()
+        return (time.time() - start,
+                self.driver.runner.commands - commands,
+                self.driver.statement_count() - statements)
+
+
+def _summary(name, values):
+    values = sorted(values)
+    return "%-10s mean %10.2f  p50 %10.2f  max %10.2f" % \
+            (name, sum(values) / len(values), values[len(values) / 2],
+             values[-1])
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-a", "--agent", choices=DRIVERS.keys(), default="ovs",
+                      help="Agent to benchmark, ovs or linuxbridge")
+    parser.add_option("-n", "--networks", type="int", default=50,
+                      help="Number of networks")
+    parser.add_option("-p", "--ports", type="int", default=500,
+                      help="Number of ports plugged on the host")
+    parser.add_option("-r", "--remote-ports", type="int", default=0,
+                      help="Number of ports plugged on the other hosts")
+    parser.add_option("-i", "--iterations", type="int", default=10,
+                      help="Number of iterations of the agent loop")
+    parser.add_option("-c", "--churn", type="float", default=0.05,
+                      help="Fraction of the ports replaced per iteration")
+    options, _args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    state_path = db_path + ".state"
+    try:
+        driver = DRIVERS[options.agent](db_path, state_path)
+        benchmark = AgentBenchmark(driver, options.networks, options.ports,
+                                   options.churn, options.remote_ports)
+        print "%s agent, %d networks, %d ports, %d remote ports, " \
+              "%d%% churn" % (options.agent, options.networks,
+                              options.ports, options.remote_ports,
+                              options.churn * 100)
+        print "%9s %10s %10s %10s" % ("iteration", "wall ms", "commands",
+                                      "db queries")
+        elapsed, commands, statements = benchmark.run_iteration()
+        print "%9s %10.2f %10d %10d" % ("initial", elapsed * 1000, commands,
+                                        statements)
+        results = []
+        for i in xrange(options.iterations):
+            benchmark.churn_ports()
+            elapsed, commands, statements = benchmark.run_iteration()
+            results.append((elapsed * 1000, commands, statements))
+            print "%9d %10.2f %10d %10d" % (i + 1, elapsed * 1000, commands,
+                                            statements)
+        if results:
+            wall, commands, statements = zip(*results)
+            print _summary("wall ms", wall)
+            print _summary("commands", [float(c) for c in commands])
+            print _summary("db queries", [float(s) for s in statements])
+        elapsed, commands, statements = benchmark.run_iteration(restart=True)
+        print "%9s %10.2f %10d %10d" % ("restart", elapsed * 1000, commands,
+                                        statements)
+    finally:
+        os.unlink(db_path)
+        if os.path.exists(state_path):
+            os.unlink(state_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Load-generation benchmark of the Quantum API.
+
+Drives the ExtensionMiddleware -> APIRouterV11 -> plugin pipeline
+in-process with webtest and reports, for every operation and format,
+the throughput, the p50/p99 latency and the number of DB statements per
+operation. The results are written to a JSON file, which can be passed
+back with --baseline to compare two runs:
+
+    python -m quantum.tests.benchmark.api_benchmark -o before.json
+    python -m quantum.tests.benchmark.api_benchmark -b before.json
+"""
+
+import datetime
+import json
+from optparse import OptionParser
+import subprocess
+import sys
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from webtest import TestApp
+
+from quantum import api as server
+from quantum.api import networks as nets
+from quantum.api import ports
+from quantum.extensions import extensions
+from quantum.manager import QuantumManager
+from quantum.wsgi import XMLDeserializer, JSONDeserializer
+import quantum.tests.unit.testlib_api as testlib
+
+
+FORMATS = ('json', 'xml')
+OPERATIONS = ('create_network', 'list_networks', 'list_networks_detail',
+              'filter_networks', 'show_network_detail', 'create_port',
+              'list_ports', 'filter_ports', 'show_port_detail',
+              'plug_interface', 'unplug_interface', 'delete_port',
+              'delete_network')
+
+
+class StatementCounter(object):
+    """Counts the statements executed by all the SQLAlchemy engines"""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, "before_cursor_execute", self._executed)
+
+    def _executed(self, conn, cursor, statement, parameters, context,
+                  executemany):
+        self.count += 1
+
+
+class OperationStats(object):
+    """Latencies and DB statement count of one operation"""
+
+    def __init__(self):
+        self.latencies = []
+        self.statements = 0
+
+    def _percentile(self, latencies, percent):
+        if not latencies:
+            return 0
+        index = int(round(percent / 100.0 * (len(latencies) - 1)))
+        return latencies[index]
+
+    def to_dict(self):
+        """Operations without samples are reported with zeros"""
+        latencies = sorted(self.latencies)
+        total = sum(latencies)
+        return {'ops': len(latencies),
+                'ops_per_sec': total and len(latencies) / total,
+                'p50_ms': self._percentile(latencies, 50) * 1000,
+                'p99_ms': self._percentile(latencies, 99) * 1000,
+                'db_statements_per_op':
+                    latencies and float(self.statements) / len(latencies)
+                    or 0.0}
+
+
+class APIBenchmark(object):
+    """Runs the benchmark scenario for one format"""
+
+    def __init__(self, app, counter, fmt, tenants, networks,
+                 ports_per_network):
+        self.app = app
+        self.counter = counter
+        self.fmt = fmt
+        self.tenants = ["tenant-%d" % i for i in xrange(tenants)]
+        self.networks_per_tenant = networks
+        self.ports_per_network = ports_per_network
+        self.stats = dict((op, OperationStats()) for op in OPERATIONS)
+        if fmt == 'xml':
+            self._net_deserializer = XMLDeserializer(
+                nets.ControllerV11._serialization_metadata)
+            self._port_deserializer = XMLDeserializer(
+                ports.ControllerV11._serialization_metadata)
+        else:
+            self._net_deserializer = JSONDeserializer()
+            self._port_deserializer = JSONDeserializer()
+
+    def _request(self, operation, req, status):
+        stats = self.stats[operation]
+        statements = self.counter.count
+        start = time.time()
+        res = self.app.do_request(req, status, False)
+        stats.latencies.append(time.time() - start)
+        stats.statements += self.counter.count - statements
+        return res
+
+    def run(self):
+        fmt = self.fmt
+        networks = []
+        for tenant_id in self.tenants:
+            for i in xrange(self.networks_per_tenant):
+                req = testlib.new_network_request(tenant_id, "net-%d" % i,
+                                                  fmt)
+                res = self._request('create_network', req, 202)
+                data = self._net_deserializer.deserialize(res.body)['body']
+                networks.append((tenant_id, str(data['network']['id']), i))
+        for tenant_id in self.tenants:
+            for _i in xrange(self.networks_per_tenant):
+                self._request('list_networks',
+                              testlib.network_list_request(tenant_id, fmt),
+                              200)
+                self._request('list_networks_detail',
+                              testlib.network_list_detail_request(tenant_id,
+                                                                  fmt),
+                              200)
+        for tenant_id, network_id, i in networks:
+            self._request('filter_networks',
+                          testlib.network_list_request(
+                            tenant_id, fmt, query_string="name=net-%d" % i),
+                          200)
+            self._request('show_network_detail',
+                          testlib.show_network_detail_request(tenant_id,
+                                                              network_id,
+                                                              fmt),
+                          200)
+        net_ports = []
+        for tenant_id, network_id, _i in networks:
+            for _j in xrange(self.ports_per_network):
+                req = testlib.new_port_request(tenant_id, network_id,
+                                               'ACTIVE', fmt)
+                res = self._request('create_port', req, 202)
+                data = self._port_deserializer.deserialize(res.body)['body']
+                net_ports.append((tenant_id, network_id,
+                                  str(data['port']['id'])))
+            self._request('list_ports',
+                          testlib.port_list_request(tenant_id, network_id,
+                                                    fmt),
+                          200)
+            self._request('filter_ports',
+                          testlib.port_list_request(
+                            tenant_id, network_id, fmt,
+                            query_string="state=ACTIVE"),
+                          200)
+        for tenant_id, network_id, port_id in net_ports:
+            self._request('show_port_detail',
+                          testlib.show_port_detail_request(tenant_id,
+                                                           network_id,
+                                                           port_id, fmt),
+                          200)
+            self._request('plug_interface',
+                          testlib.put_attachment_request(
+                            tenant_id, network_id, port_id,
+                            "vif-%s" % port_id, fmt),
+                          204)
+        for tenant_id, network_id, port_id in net_ports:
+            self._request('unplug_interface',
+                          testlib.delete_attachment_request(
+                            tenant_id, network_id, port_id,
+                            "vif-%s" % port_id, fmt),
+                          204)
+            self._request('delete_port',
+                          testlib.port_delete_request(tenant_id, network_id,
+                                                      port_id, fmt),
+                          204)
+        for tenant_id, network_id, _i in networks:
+            self._request('delete_network',
+                          testlib.network_delete_request(tenant_id,
+                                                         network_id, fmt),
+                          204)
+        return dict((op, self.stats[op].to_dict()) for op in OPERATIONS)
+
+
+def setup_app(plugin_provider):
+    """Builds the v1.1 API pipeline, with the extensions middleware"""
+    options = {'plugin_provider': plugin_provider}
+    router = server.APIRouterV11(options)
+    ext_mgr = extensions.PluginAwareExtensionManager(
+        extensions.get_extensions_path(), QuantumManager.get_plugin())
+    return TestApp(extensions.ExtensionMiddleware(router, {},
+                                                  ext_mgr=ext_mgr))
+
+
+def _git_commit():
+    try:
+        return subprocess.Popen(["git", "rev-parse", "HEAD"],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE).communicate()[0].\
+                                strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results, baseline=None):
+    header = "%-6s %-22s %7s %10s %9s %9s %8s" % \
+            ("format", "operation", "ops", "ops/sec", "p50 ms", "p99 ms",
+             "db/op")
+    if baseline:
+        header += " %9s %9s" % ("ops/sec", "p99")
+    print header
+    for fmt in sorted(results['results']):
+        for op in OPERATIONS:
+            res = results['results'][fmt][op]
+            line = "%-6s %-22s %7d %10.1f %9.3f %9.3f %8.1f" % \
+                    (fmt, op, res['ops'], res['ops_per_sec'],
+                     res['p50_ms'], res['p99_ms'],
+                     res['db_statements_per_op'])
+            if baseline:
+                try:
+                    old = baseline['results'][fmt][op]
+                    line += " %+8.1f%% %+8.1f%%" % (
+                        (res['ops_per_sec'] / old['ops_per_sec'] - 1) * 100,
+                        (res['p99_ms'] / old['p99_ms'] - 1) * 100)
+                except (KeyError, ZeroDivisionError):
+                    pass
+            print line
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-p", "--plugin",
+                      default="quantum.plugins.sample.SamplePlugin.FakePlugin",
+                      help="Plugin provider class")
+    parser.add_option("-t", "--tenants", type="int", default=2,
+                      help="Number of tenants")
+    parser.add_option("-n", "--networks", type="int", default=25,
+                      help="Number of networks per tenant")
+    parser.add_option("-P", "--ports", type="int", default=4,
+                      help="Number of ports per network")
+    parser.add_option("-f", "--format", action="append", dest="formats",
+                      choices=FORMATS, help="Format to benchmark, "
+                      "json and xml by default")
+    parser.add_option("-o", "--output", default="api_benchmark.json",
+                      help="File to write the results to")
+    parser.add_option("-b", "--baseline",
+                      help="Results of a previous run to compare with")
+    options, _args = parser.parse_args()
+
+    app = setup_app(options.plugin)
+    counter = StatementCounter()
+    results = {'timestamp': datetime.datetime.utcnow().isoformat(),
+               'commit': _git_commit(),
+               'plugin': options.plugin,
+               'tenants': options.tenants,
+               'networks_per_tenant': options.networks,
+               'ports_per_network': options.ports,
+               'results': {}}
+    for fmt in options.formats or FORMATS:
+        benchmark = APIBenchmark(app, counter, fmt, options.tenants,
+                                 options.networks, options.ports)
+        results['results'][fmt] = benchmark.run()
+    with open(options.output, "w") as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_results(results, baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark of the DB read paths of the plugins, comparing the model
+instances (db.port_list, db.port_get) with the column-only rows
+(db.port_list_rows, db.port_get_row).
+
+An sqlite DB is populated with one network holding the ports, then every
+run reads, in a fresh interpreter, the list view (all the ports of the
+network, turned into the API dicts) and the detail view of a sample of
+the ports. The wall time of each view and the memory held by the list
+view once built are reported, as medians of the runs:
+
+    python -m quantum.tests.benchmark.db_read_benchmark -p 50000
+"""
+
+import gc
+import json
+from optparse import OptionParser
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from quantum.api.api_common import OperationalStatus
+import quantum.db.api as db
+from quantum.db import models
+
+
+TENANT_ID = "benchmark_tenant"
+MODES = {'models': (db.port_list, db.port_get),
+         'rows': (db.port_list_rows, db.port_get_row)}
+
+
+def _rss_kb():
+    """Resident memory of the process, in KB"""
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * resource.getpagesize() / 1024
+
+
+def make_port_dict(port):
+    if port['state'] == "ACTIVE":
+        op_status = port['op_status']
+    else:
+        op_status = OperationalStatus.DOWN
+    return {'port-id': str(port['uuid']),
+            'port-state': port['state'],
+            'port-op-status': op_status,
+            'net-id': port['network_id'],
+            'attachment': port['interface_id']}
+
+
+def populate(db_path, ports):
+    """Creates a network with ports, returns its id"""
+    db.configure_db({'sql_connection': "sqlite:///%s" % db_path})
+    net = db.network_create(TENANT_ID, "benchmark")
+    session = db.get_session()
+    with session.begin():
+        session.execute(models.Port.__table__.insert(),
+                        [{'uuid': str(uuid.uuid4()),
+                          'network_id': net.uuid,
+                          'interface_id': i % 2 and str(uuid.uuid4()) or None,
+                          'state': i % 2 and "ACTIVE" or "DOWN",
+                          'op_status': OperationalStatus.UP}
+                         for i in xrange(ports)])
+    return net.uuid
+
+
+def measure(mode, db_path, net_id, details):
+    """Reads the list and detail views, returns the times and memory"""
+    port_list, port_get = MODES[mode]
+    db.configure_db({'sql_connection': "sqlite:///%s" % db_path})
+    # Opens the connection and warms the query compilation caches
+    port_get(port_list(net_id)[0]['uuid'], net_id)
+    gc.collect()
+    rss = _rss_kb()
+
+    start = time.time()
+    ports = port_list(net_id)
+    port_dicts = [make_port_dict(port) for port in ports]
+    list_time = time.time() - start
+    gc.collect()
+    held = _rss_kb() - rss
+
+    port_ids = random.Random(0).sample([port['uuid'] for port in ports],
+                                       min(details, len(ports)))
+    start = time.time()
+    for port_id in port_ids:
+        make_port_dict(port_get(port_id, net_id))
+    detail_time = time.time() - start
+    return {'ports': len(port_dicts), 'list': list_time,
+            'detail': detail_time / max(len(port_ids), 1),
+            'held': held}
+
+
+def run_child(mode, db_path, net_id, options):
+    """Measures one run in a new interpreter"""
+    args = [sys.executable, "-m", "quantum.tests.benchmark.db_read_benchmark",
+            "--child", mode, "--db", db_path, "--net", net_id,
+            "-d", str(options.details)]
+    output = subprocess.Popen(args, stdout=subprocess.PIPE).communicate()[0]
+    return json.loads(output.splitlines()[-1])
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) / 2]
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-p", "--ports", type="int", default=50000,
+                      help="Number of ports on the network")
+    parser.add_option("-d", "--details", type="int", default=1000,
+                      help="Number of ports read with the detail view")
+    parser.add_option("-r", "--runs", type="int", default=5,
+                      help="Number of runs per mode, the medians are "
+                      "reported")
+    parser.add_option("--child", choices=MODES.keys(),
+                      help="Measure one run in this process and print the "
+                      "results as JSON")
+    parser.add_option("--db", help="Path of the populated sqlite DB")
+    parser.add_option("--net", help="Id of the populated network")
+    options, _args = parser.parse_args()
+
+    if options.child:
+        print json.dumps(measure(options.child, options.db, options.net,
+                                 options.details))
+        return 0
+
+    fd, db_path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    try:
+        net_id = populate(db_path, options.ports)
+        print "%d ports, %d port details" % (options.ports, options.details)
+        print "%-8s %12s %14s %12s" % ("mode", "list ms", "detail ms/port",
+                                       "held KB")
+        for mode in sorted(MODES):
+            runs = [run_child(mode, db_path, net_id, options)
+                    for i in xrange(options.runs)]
+            print "%-8s %12.2f %14.3f %12d" % \
+                    (mode,
+                     _median([run['list'] for run in runs]) * 1000,
+                     _median([run['detail'] for run in runs]) * 1000,
+                     _median([run['held'] for run in runs]))
+    finally:
+        os.unlink(db_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Startup-time benchmark of the Quantum API server.
+
+Builds the API pipeline the way the server does (plugin, API routers and
+extension middleware) in a fresh interpreter for every run, and reports
+the import and initialization time of each component, in two modes:
+
+  eager  the plugin is initialized and every extension module is imported
+         before the server starts
+  lazy   the plugin is initialized in a green thread and the extensions
+         are loaded from the extension manifest, their modules are only
+         imported when used; the time until the plugin is ready is
+         reported separately
+
+    python -m quantum.tests.benchmark.startup_benchmark -p <plugin>
+"""
+
+import imp
+import json
+from optparse import OptionParser
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+MODES = ('eager', 'lazy')
+
+
+class ComponentTimer(object):
+    """Import and initialization times of the components, in seconds"""
+
+    def __init__(self):
+        self.components = []
+        self.times = {}
+
+    def _add(self, component, kind, elapsed):
+        if component not in self.times:
+            self.components.append(component)
+            self.times[component] = {'import': 0.0, 'init': 0.0}
+        self.times[component][kind] += elapsed
+
+    def run(self, component, kind, func, *args, **kwargs):
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._add(component, kind, time.time() - start)
+
+    def time_extension_imports(self):
+        """Times the imports of the extension modules"""
+        load_source = imp.load_source
+
+        def timed_load_source(name, path, *args):
+            return self.run("extension %s" % name, 'import', load_source,
+                            name, path, *args)
+        imp.load_source = timed_load_source
+
+    def results(self):
+        return [dict(component=component, **self.times[component])
+                for component in self.components]
+
+
+def _import(name):
+    __import__(name)
+    return sys.modules[name]
+
+
+def measure_startup(plugin_provider, lazy, extensions_path, manifest):
+    """Builds the API pipeline and returns the times of its components"""
+    timer = ComponentTimer()
+    timer.time_extension_imports()
+    start = time.time()
+
+    manager = timer.run("quantum.manager", 'import', _import,
+                        "quantum.manager")
+    api = timer.run("quantum.api", 'import', _import, "quantum.api")
+    extensions = timer.run("quantum.extensions", 'import', _import,
+                           "quantum.extensions.extensions")
+    utils = _import("quantum.common.utils")
+    timer.run("plugin", 'import', utils.import_class, plugin_provider)
+
+    options = {'plugin_provider': plugin_provider,
+               'lazy_plugin_init': lazy}
+    plugin = timer.run("plugin", 'init', manager.QuantumManager.get_plugin,
+                       options)
+    routers = []
+    for router in (api.APIRouterV10, api.APIRouterV11):
+        routers.append(timer.run("router v%s" % router._version, 'init',
+                                 router, options))
+    path = extensions.get_extensions_path(
+        {'api_extensions_path': extensions_path or ''})
+    ext_mgr = timer.run("extension manager", 'init',
+                        extensions.PluginAwareExtensionManager, path, plugin,
+                        lazy and manifest or None)
+    for router in routers:
+        timer.run("extension middleware", 'init',
+                  extensions.ExtensionMiddleware, router, {}, ext_mgr)
+    startup = time.time() - start
+
+    result = {'startup': startup, 'components': timer.results()}
+    if isinstance(plugin, manager.DeferredPlugin):
+        plugin.wait()
+        result['ready'] = time.time() - start
+    return result
+
+
+def run_child(mode, options, manifest):
+    """Measures the startup in a new interpreter"""
+    args = [sys.executable, "-m", "quantum.tests.benchmark.startup_benchmark",
+            "--child", mode, "-p", options.plugin, "--manifest", manifest]
+    if options.extensions:
+        args.extend(["-e", options.extensions])
+    output = subprocess.Popen(args, stdout=subprocess.PIPE).communicate()[0]
+    return json.loads(output.splitlines()[-1])
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) / 2]
+
+
+def summarize(runs):
+    """Returns the median times of the runs, in milliseconds"""
+    summary = {'startup': _median([run['startup'] for run in runs]) * 1000,
+               'components': []}
+    if 'ready' in runs[0]:
+        summary['ready'] = _median([run['ready'] for run in runs]) * 1000
+    for component in runs[0]['components']:
+        name = component['component']
+        times = [c for run in runs for c in run['components']
+                 if c['component'] == name]
+        summary['components'].append({
+            'component': name,
+            'import': _median([t['import'] for t in times]) * 1000,
+            'init': _median([t['init'] for t in times]) * 1000})
+    return summary
+
+
+def print_summary(mode, summary):
+    print "%s loading" % mode
+    print "  %-40s %10s %10s" % ("component", "import ms", "init ms")
+    for component in summary['components']:
+        print "  %-40s %10.2f %10.2f" % (component['component'],
+                                         component['import'],
+                                         component['init'])
+    print "  %-40s %21.2f" % ("startup", summary['startup'])
+    if 'ready' in summary:
+        print "  %-40s %21.2f" % ("plugin ready", summary['ready'])
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-p", "--plugin",
+                      default="quantum.plugins.sample.SamplePlugin.FakePlugin",
+                      help="Plugin provider class")
+    parser.add_option("-e", "--extensions",
+                      help="Additional extension paths, colon separated")
+    parser.add_option("-r", "--runs", type="int", default=5,
+                      help="Number of runs per mode, the medians are "
+                      "reported")
+    parser.add_option("--child", choices=MODES, help="Measure one startup "
+                      "in this process and print the times as JSON")
+    parser.add_option("--manifest", help="Extension manifest file")
+    options, _args = parser.parse_args()
+
+    if options.child:
+        result = measure_startup(options.plugin, options.child == 'lazy',
+                                 options.extensions, options.manifest)
+        print json.dumps(result)
+        return 0
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        manifest = os.path.join(tmp_dir, "extensions.json")
+        # Writes the manifest used by the lazy runs
+        run_child('lazy', options, manifest)
+        for mode in MODES:
+            runs = [run_child(mode, options, manifest)
+                    for i in xrange(options.runs)]
+            print_summary(mode, summarize(runs))
+    finally:
+        shutil.rmtree(tmp_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import quantum.plugins.linuxbridge.agent.linuxbridge_quantum_agent\
+                                                     as linux_agent
+from quantum.plugins.openvswitch.agent import ovs_quantum_agent
+
+
+# The agents are deployed as single files, each with its own copy
+AGENTS = (linux_agent, ovs_quantum_agent)
+
+
+class LocalStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "agent.state")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_copies_are_identical(self):
+        sources = [inspect.getsource(agent.LocalState) for agent in AGENTS]
+        self.assertEqual(sources[0], sources[1])
+        self.assertEqual(linux_agent.STATE_FORMAT_VERSION,
+                         ovs_quantum_agent.STATE_FORMAT_VERSION)
+
+    def test_save_and_load(self):
+        for agent in AGENTS:
+            agent.LocalState(self.path).save({"vif1": ["net1", "2"]})
+            self.assertFalse(os.path.exists(self.path + ".tmp"))
+            state = agent.LocalState(self.path)
+            self.assertEqual(state.load(), {"vif1": ["net1", "2"]})
+            os.remove(self.path)
+
+    def test_unchanged_bindings_are_not_written(self):
+        for agent in AGENTS:
+            state = agent.LocalState(self.path)
+            state.save({"vif1": ["net1", "2"]})
+            os.remove(self.path)
+            state.save({"vif1": ["net1", "2"]})
+            self.assertFalse(os.path.exists(self.path))
+
+    def test_missing_or_unreadable_state_is_ignored(self):
+        for agent in AGENTS:
+            self.assertEqual(agent.LocalState(None).load(), None)
+            self.assertEqual(agent.LocalState(self.path).load(), None)
+            with open(self.path, "w") as state_file:
+                state_file.write("{not json")
+            self.assertEqual(agent.LocalState(self.path).load(), None)
+            with open(self.path, "w") as state_file:
+                json.dump({"version": agent.STATE_FORMAT_VERSION + 1,
+                           "bindings": {}}, state_file)
+            self.assertEqual(agent.LocalState(self.path).load(), None)
+            os.remove(self.path)
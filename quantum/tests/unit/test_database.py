@@ -23,6 +23,7 @@ import logging
 import unittest
 
 
+from quantum.common import exceptions as q_exc
 from quantum.db import api as db
 from quantum.tests.unit import database_stubs as db_stubs
 
@@ -116,3 +117,30 @@ class QuantumDBTest(unittest.TestCase):
         self.dbtest.unplug_interface(net1["id"], port1["id"])
         port = self.dbtest.get_port(net1["id"], port1["id"])
         self.assertTrue(port[0]["attachment"] is None)
+
+    def testh_read_rows(self):
+        """test to read networks and ports as rows"""
+        net1 = self.dbtest.create_network(self.tenant_id, "plugin_test1")
+        port1 = self.dbtest.create_port(net1["id"])
+        self.dbtest.plug_interface(net1["id"], port1["id"], "vif1.1")
+        nets = db.network_list_rows(self.tenant_id)
+        self.assertEqual([(net.uuid, net["name"]) for net in nets],
+                         [(net1["id"], "plugin_test1")])
+        self.assertEqual(db.network_get_row(net1["id"]), nets[0])
+        ports = db.port_list_rows(net1["id"])
+        self.assertEqual([port["uuid"] for port in ports], [port1["id"]])
+        port = db.port_get_row(port1["id"], net1["id"])
+        self.assertEqual(port.interface_id, "vif1.1")
+        self.assertEqual(port.get("state"), "DOWN")
+        self.assertEqual(port[1], net1["id"])
+
+    def testi_read_rows_not_found(self):
+        """test to read missing networks and ports as rows"""
+        net1 = self.dbtest.create_network(self.tenant_id, "plugin_test1")
+        self.assertEqual(db.port_list_rows(net1["id"]), [])
+        self.assertRaises(q_exc.NetworkNotFound, db.network_get_row, "net")
+        self.assertRaises(q_exc.NetworkNotFound, db.port_list_rows, "net")
+        self.assertRaises(q_exc.NetworkNotFound, db.port_get_row, "port",
+                          "net")
+        self.assertRaises(q_exc.PortNotFound, db.port_get_row, "port",
+                          net1["id"])
@@ -17,6 +17,8 @@ import json
 import logging
 import os
 import routes
+import shutil
+import tempfile
 import unittest
 from quantum.tests.unit import BaseTest
 from webtest import TestApp
@@ -38,7 +40,8 @@ from quantum.tests.unit.extension_stubs import (StubExtension, StubPlugin,
 import quantum.tests.unit.extensions
 from quantum.extensions.extensions import (ExtensionManager,
                                        PluginAwareExtensionManager,
-                                       ExtensionMiddleware)
+                                       ExtensionMiddleware,
+                                       LazyExtension)
 
 LOG = logging.getLogger('test_extensions')
 
@@ -422,6 +425,49 @@ class PluginAwareExtensionManagerTest(unittest.TestCase):
         self.assertTrue("e1" in ext_mgr.extensions)
 
 
+class ExtensionManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manifest = os.path.join(self.tmp_dir, "extensions.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_extensions_are_loaded_from_manifest(self):
+        ExtensionManager(extensions_path, self.manifest)
+        self.assertTrue(os.path.exists(self.manifest))
+
+        ext_mgr = ExtensionManager(extensions_path, self.manifest)
+        ext = ext_mgr.extensions["FOXNSOX"]
+        self.assertTrue(isinstance(ext, LazyExtension))
+        self.assertEqual(ext.get_name(), "Fox In Socks")
+        self.assertEqual(ext._extension, None)
+        self.assertEqual(ext_mgr.get_resources()[1].collection, "foxnsocks")
+        self.assertNotEqual(ext._extension, None)
+
+    def test_unsupported_extensions_are_not_imported(self):
+        ExtensionManager(extensions_path, self.manifest)
+        stub_plugin = StubPlugin(supported_extensions=[])
+        ext_mgr = PluginAwareExtensionManager(extensions_path, stub_plugin,
+                                              self.manifest)
+        self.assertEqual(ext_mgr.extensions, {})
+        ext_mgr = PluginAwareExtensionManager(extensions_path,
+                                              QuantumEchoPlugin(),
+                                              self.manifest)
+        self.assertTrue("FOXNSOX" in ext_mgr.extensions)
+
+    def test_out_of_date_manifest_is_rewritten(self):
+        with open(self.manifest, 'w') as manifest:
+            manifest.write('{"files": {}, "extensions": []}')
+        ext_mgr = ExtensionManager(extensions_path, self.manifest)
+        self.assertFalse(isinstance(ext_mgr.extensions["FOXNSOX"],
+                                    LazyExtension))
+        ext_mgr = ExtensionManager(extensions_path, self.manifest)
+        self.assertTrue(isinstance(ext_mgr.extensions["FOXNSOX"],
+                                   LazyExtension))
+
+
 class ExtensionControllerTest(unittest.TestCase):
 
     def setUp(self):
@@ -0,0 +1,100 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import json
+import unittest
+
+from sqlalchemy import create_engine
+import webob
+
+from quantum import api as server
+from quantum.api import versions
+from quantum.common.test_lib import test_config
+from quantum.db import api as db
+from quantum.db import models
+from quantum import metrics
+
+
+class HealthCheckTest(unittest.TestCase):
+
+    def setUp(self):
+        options = {'plugin_provider': test_config['plugin_name']}
+        server.APIRouterV11(options)
+        self.app = versions.Versions(heartbeat_cache_ttl=60,
+                                     agent_down_time=30)
+
+    def tearDown(self):
+        db.clear_db()
+
+    def _get(self, path):
+        res = webob.Request.blank(path).get_response(self.app)
+        return res.status_int, json.loads(res.body)
+
+    def _add_heartbeat(self, host, seconds_ago):
+        session = db.get_session()
+        heartbeat_at = (datetime.datetime.utcnow() -
+                        datetime.timedelta(seconds=seconds_ago))
+        session.add(models.AgentHeartbeat(host, "ovs", heartbeat_at))
+        session.flush()
+
+    def test_readiness(self):
+        db.network_list("test_tenant")
+        status, body = self._get("/readyz")
+        self.assertEqual(status, 200)
+        self.assertEqual(body['checks'], {'plugin': True, 'db': True})
+
+        metrics.mark("db", False)
+        status, body = self._get("/readyz")
+        self.assertEqual(status, 503)
+        self.assertEqual(body['checks']['db'], False)
+
+    def test_health(self):
+        with metrics.timer("test_health.device"):
+            pass
+        status, body = self._get("/healthz")
+        self.assertEqual(status, 200)
+        self.assertEqual(body['plugin']['status'], 'ready')
+        self.assertTrue(body['db']['pool'])
+        self.assertTrue('last_success' in
+                        body['devices']['test_health.device'])
+
+    def test_without_core_engine(self):
+        # As with the Cisco plugin, which has its own engine
+        engines = db._ENGINES.copy()
+        db._ENGINES.clear()
+        try:
+            db.register_engine("plugin", create_engine("sqlite://"))
+            status, body = self._get("/readyz")
+            self.assertEqual(status, 200)
+            self.assertEqual(body['checks'], {'plugin': True, 'db': True})
+            status, body = self._get("/healthz")
+            self.assertEqual(body['db']['pool'].keys(), ["plugin"])
+            self.assertEqual(body['agents'], [])
+        finally:
+            db._ENGINES.clear()
+            db._ENGINES.update(engines)
+
+    def test_agent_heartbeats_are_cached(self):
+        self._add_heartbeat("host1", 0)
+        self._add_heartbeat("host2", 60)
+        agents = dict([(agent['host'], agent['alive']) for agent in
+                       self._get("/healthz")[1]['agents']])
+        self.assertEqual(agents, {'host1': True, 'host2': False})
+
+        self._add_heartbeat("host3", 0)
+        self.assertEqual(len(self._get("/healthz")[1]['agents']), 2)
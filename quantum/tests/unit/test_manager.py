@@ -0,0 +1,73 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import webob
+
+from quantum.api import versions
+from quantum.manager import DeferredPlugin, QuantumManager
+from quantum.quantum_plugin_base import QuantumPluginBase
+
+
+class SlowPlugin(QuantumPluginBase):
+
+    supported_extension_aliases = ["FOXNSOX"]
+    instances = 0
+
+    def __init__(self):
+        SlowPlugin.instances += 1
+
+    def get_all_networks(self, tenant_id, **kwargs):
+        return []
+
+    get_network_details = create_network = delete_network = None
+    update_network = get_all_ports = create_port = delete_port = None
+    update_port = get_port_details = plug_interface = None
+    unplug_interface = None
+
+
+class DeferredPluginTest(unittest.TestCase):
+
+    def setUp(self):
+        self.instance = QuantumManager._instance
+        SlowPlugin.instances = 0
+        QuantumManager._instance = QuantumManager(
+            {'plugin_provider': __name__ + '.SlowPlugin',
+             'lazy_plugin_init': True})
+        self.plugin = QuantumManager._instance.plugin
+
+    def tearDown(self):
+        QuantumManager._instance = self.instance
+
+    def _readiness(self):
+        req = webob.Request.blank("/readyz")
+        return req.get_response(versions.Versions())
+
+    def test_plugin_initialized_in_background(self):
+        self.assertTrue(isinstance(self.plugin, DeferredPlugin))
+        self.assertTrue(isinstance(self.plugin, SlowPlugin))
+        self.assertEqual(self.plugin.supported_extension_aliases,
+                         ["FOXNSOX"])
+        self.assertEqual(SlowPlugin.instances, 0)
+        self.assertEqual(QuantumManager.plugin_status(), 'initializing')
+        self.assertEqual(self._readiness().status_int, 503)
+
+        self.assertEqual(self.plugin.get_all_networks("tenant"), [])
+        self.assertEqual(SlowPlugin.instances, 1)
+        self.assertEqual(QuantumManager.plugin_status(), 'ready')
+        self.assertEqual(self._readiness().status_int, 200)
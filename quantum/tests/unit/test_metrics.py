@@ -0,0 +1,134 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import socket
+import threading
+import time
+import unittest
+
+import webob
+
+from quantum import api as server
+from quantum.common.test_lib import test_config
+from quantum.db import api as db
+from quantum import metrics
+import quantum.tests.unit.testlib_api as testlib
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def test_counter_and_gauge(self):
+        self.registry.counter("requests").inc()
+        self.registry.counter("requests").inc(2)
+        self.registry.gauge("ports").set(5)
+        snapshot = self.registry.snapshot()
+        self.assertEqual(snapshot['counters'], {'requests': 3})
+        self.assertEqual(snapshot['gauges'], {'ports': 5})
+
+    def test_histogram_buckets(self):
+        histogram = self.registry.histogram("latency")
+        for value in (0.5, 1, 3, 20000):
+            histogram.observe(value)
+        data = histogram.to_dict()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['sum'], 20004.5)
+        self.assertEqual(data['buckets']['1'], 2)
+        self.assertEqual(data['buckets']['5'], 1)
+        self.assertEqual(data['buckets']['inf'], 1)
+        self.assertEqual(sum(data['buckets'].values()), 4)
+
+    def test_timer_counts_errors(self):
+        @metrics.timed("test_metrics.fail")
+        def fail():
+            raise ValueError()
+
+        errors = metrics.counter("test_metrics.fail.errors").value
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(metrics.counter("test_metrics.fail.errors").value,
+                         errors + 1)
+        self.assertTrue(
+            metrics.histogram("test_metrics.fail.latency").count > 0)
+
+    def test_metrics_app(self):
+        self.registry.counter("requests").inc()
+        res = webob.Request.blank("/").get_response(
+            metrics.MetricsApp(self.registry))
+        self.assertEqual(res.content_type, "application/json")
+        self.assertEqual(json.loads(res.body)['counters'], {'requests': 1})
+
+    def test_statsd_emitter(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.settimeout(5)
+        emitter = metrics.StatsdEmitter("127.0.0.1",
+                                        listener.getsockname()[1],
+                                        prefix="test", registry=self.registry)
+        try:
+            self.registry.counter("requests").inc(3)
+            self.registry.gauge("ports").set(2)
+            self.registry.histogram("latency").observe(4)
+            emitter.flush()
+            lines = listener.recv(metrics.StatsdEmitter.MAX_PACKET_SIZE).\
+                    split("\n")
+            self.assertEqual(lines, ["test.requests:3|c", "test.ports:2|g",
+                                     "test.latency.count:1|c",
+                                     "test.latency.sum:4|c"])
+            # Counters are sent as increments since the last flush
+            self.registry.counter("requests").inc()
+            emitter.flush()
+            lines = listener.recv(metrics.StatsdEmitter.MAX_PACKET_SIZE).\
+                    split("\n")
+            self.assertEqual(lines, ["test.requests:1|c", "test.ports:2|g"])
+        finally:
+            listener.close()
+
+    def test_statsd_emitter_survives_errors(self):
+        emitter = metrics.StatsdEmitter("127.0.0.1", 8125, interval=0.01,
+                                        registry=self.registry)
+        flushes = []
+        flushed = threading.Event()
+
+        def flush():
+            flushes.append(time.time())
+            if len(flushes) == 1:
+                raise RuntimeError("dictionary changed size during iteration")
+            flushed.set()
+
+        emitter.flush = flush
+        emitter.start()
+        flushed.wait(5)
+        emitter.stop()
+        self.assertTrue(len(flushes) > 1)
+
+    def test_api_request_metrics(self):
+        api = server.APIRouterV11(
+            {'plugin_provider': test_config['plugin_name']})
+        name = "api.network.create"
+        created = metrics.counter(name + ".status.202").value
+        req = testlib.new_network_request("test_tenant", "net1", "json")
+        try:
+            self.assertEqual(req.get_response(api).status_int, 202)
+        finally:
+            db.clear_db()
+        self.assertEqual(metrics.counter(name + ".status.202").value,
+                         created + 1)
+        self.assertTrue(metrics.histogram(name + ".latency").count > 0)
+        self.assertTrue(metrics.histogram("db.query.latency").count > 0)
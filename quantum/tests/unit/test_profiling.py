@@ -0,0 +1,96 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from quantum import api as server
+from quantum.api import profiling
+from quantum.common.test_lib import test_config
+from quantum.db import api as db
+from quantum.manager import QuantumManager
+import quantum.tests.unit.testlib_api as testlib
+from quantum import wsgi
+
+
+class ProfilingMiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        options = {'plugin_provider': test_config['plugin_name']}
+        self.api = server.APIRouterV11(options)
+        self.tenant_id = "test_tenant"
+        self.profile_dir = None
+
+    def tearDown(self):
+        db.clear_db()
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir)
+
+    def _timings(self, res):
+        return dict([metric.split(";")[0:2] for metric in
+                     res.headers[profiling.TIMING_HEADER].split(", ")])
+
+    def test_timing_header(self):
+        app = profiling.ProfilingMiddleware(self.api)
+        req = testlib.new_network_request(self.tenant_id, "net1", "json")
+        res = req.get_response(app)
+        self.assertEqual(res.status_int, 202)
+        timings = self._timings(res)
+        for phase in ('routing', 'deserialize', 'dispatch', 'plugin',
+                      'serialize', 'total'):
+            self.assertTrue(phase in timings)
+        self.assertTrue('Server-Timing' not in
+                        req.get_response(self.api).headers)
+        self.assertEqual(wsgi.RequestTimings.current(), None)
+
+    def test_plugin_instrumented_once(self):
+        profiling.ProfilingMiddleware(self.api)
+        plugin = QuantumManager.get_plugin()
+        wrapper = plugin.get_all_networks
+        profiling.ProfilingMiddleware(self.api)
+        self.assertTrue(plugin.get_all_networks is wrapper)
+
+    def test_nested_phase_timed_once(self):
+        timings = wsgi.RequestTimings.activate()
+        try:
+            with wsgi.RequestTimings.phase('plugin'):
+                with wsgi.RequestTimings.phase('plugin'):
+                    pass
+        finally:
+            wsgi.RequestTimings.deactivate()
+        self.assertEqual(timings.counts['plugin'], 1)
+
+    def test_profile_dump(self):
+        self.profile_dir = tempfile.mkdtemp()
+        app = profiling.ProfilingMiddleware(self.api,
+                                            profile_dir=self.profile_dir,
+                                            profile_threshold_ms=0)
+        req = testlib.network_list_request(self.tenant_id, "json")
+        res = req.get_response(app)
+        self.assertEqual(res.status_int, 200)
+        self.assertEqual(len(os.listdir(self.profile_dir)), 1)
+
+    def test_profile_threshold(self):
+        self.profile_dir = tempfile.mkdtemp()
+        app = profiling.ProfilingMiddleware(self.api,
+                                            profile_dir=self.profile_dir,
+                                            profile_threshold_ms=60000)
+        req = testlib.network_list_request(self.tenant_id, "json")
+        req.get_response(app)
+        self.assertEqual(os.listdir(self.profile_dir), [])
@@ -0,0 +1,96 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2011, Nicira Networks, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+from quantum.common import exceptions as exc
+from quantum.db import api as db
+from quantum.plugins.sample import SamplePlugin
+
+
+class FakePluginTest(unittest.TestCase):
+    """Checks the behavior of the FakePlugin backends"""
+
+    plugin_class = SamplePlugin.FakePlugin
+
+    def setUp(self):
+        self.plugin = self.plugin_class()
+        self.tenant_id = "test_tenant"
+
+    def tearDown(self):
+        db.clear_db()
+
+    def test_networks(self):
+        net_id = self.plugin.create_network(self.tenant_id, "net1")['net-id']
+        self.plugin.create_network("other_tenant", "net2")
+        self.plugin.update_network(self.tenant_id, net_id, name="net3")
+        self.assertEqual(self.plugin.get_all_networks(self.tenant_id),
+                         [{'net-id': net_id,
+                           'net-name': "net3",
+                           'net-op-status': "UP"}])
+        self.plugin.delete_network(self.tenant_id, net_id)
+        self.assertEqual(self.plugin.get_all_networks(self.tenant_id), [])
+        self.assertRaises(exc.NetworkNotFound,
+                          self.plugin.get_network_details,
+                          self.tenant_id, net_id)
+
+    def test_ports(self):
+        net_id = self.plugin.create_network(self.tenant_id, "net1")['net-id']
+        port_id = self.plugin.create_port(self.tenant_id, net_id)['port-id']
+        self.plugin.update_port(self.tenant_id, net_id, port_id,
+                                state="ACTIVE")
+        self.assertRaises(exc.StateInvalid, self.plugin.update_port,
+                          self.tenant_id, net_id, port_id, state="BAD")
+        self.assertEqual(self.plugin.get_port_details(self.tenant_id,
+                                                      net_id, port_id),
+                         {'port-id': port_id,
+                          'attachment': None,
+                          'port-state': "ACTIVE",
+                          'port-op-status': "UP"})
+        self.assertEqual(self.plugin.get_network_details(
+                            self.tenant_id, net_id)['net-ports'],
+                         [{'port-id': port_id}])
+        self.plugin.delete_port(self.tenant_id, net_id, port_id)
+        self.assertRaises(exc.PortNotFound, self.plugin.get_port_details,
+                          self.tenant_id, net_id, port_id)
+
+    def test_attachments(self):
+        net_id = self.plugin.create_network(self.tenant_id, "net1")['net-id']
+        port1_id = self.plugin.create_port(self.tenant_id, net_id)['port-id']
+        port2_id = self.plugin.create_port(self.tenant_id, net_id)['port-id']
+        self.plugin.plug_interface(self.tenant_id, net_id, port1_id, "vif1")
+        self.assertRaises(exc.AlreadyAttached, self.plugin.plug_interface,
+                          self.tenant_id, net_id, port2_id, "vif1")
+        self.assertRaises(exc.PortInUse, self.plugin.plug_interface,
+                          self.tenant_id, net_id, port1_id, "vif2")
+        self.assertRaises(exc.PortInUse, self.plugin.delete_port,
+                          self.tenant_id, net_id, port1_id)
+        self.assertRaises(exc.NetworkInUse, self.plugin.delete_network,
+                          self.tenant_id, net_id)
+        self.plugin.unplug_interface(self.tenant_id, net_id, port1_id)
+        self.plugin.plug_interface(self.tenant_id, net_id, port2_id, "vif1")
+        self.assertEqual(self.plugin.get_port_details(
+                            self.tenant_id, net_id, port2_id)['attachment'],
+                         "vif1")
+
+
+class InMemoryFakePluginTest(FakePluginTest):
+
+    plugin_class = SamplePlugin.InMemoryFakePlugin
+
+    def tearDown(self):
+        # The in-memory plugin does not configure the DB
+        pass
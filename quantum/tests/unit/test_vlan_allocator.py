@@ -0,0 +1,42 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012, Cisco Systems, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+from quantum.db import vlan_allocator
+
+
+class VlanBitmapTest(unittest.TestCase):
+
+    def test_lowest_free(self):
+        bitmap = vlan_allocator.VlanBitmap(100, 103, [100, 102])
+        self.assertEqual(bitmap.lowest_free(), 101)
+        bitmap.set_used(101)
+        self.assertEqual(bitmap.lowest_free(), 103)
+        bitmap.set_used(103)
+        self.assertEqual(bitmap.lowest_free(), None)
+        bitmap.set_free(100)
+        self.assertEqual(bitmap.lowest_free(), 100)
+        self.assertEqual(bitmap.used_count(), 3)
+
+    def test_outside_of_range(self):
+        bitmap = vlan_allocator.VlanBitmap(100, 103)
+        bitmap.set_used(99)
+        bitmap.set_used(104)
+        self.assertFalse(bitmap.is_used(99))
+        self.assertFalse(99 in bitmap)
+        self.assertEqual(bitmap.used_count(), 0)
+        self.assertEqual(bitmap.lowest_free(), 100)
@@ -19,8 +19,11 @@
 Utility methods for working with WSGI servers
 """
 
+import contextlib
 import logging
 import sys
+import time
+import eventlet.corolocal
 import eventlet.wsgi
 eventlet.patcher.monkey_patch(all=False, socket=True)
 import routes.middleware
@@ -33,6 +36,7 @@ from xml.parsers import expat
 
 from quantum.common import exceptions as exception
 from quantum.common import utils
+from quantum import metrics
 
 LOG = logging.getLogger('quantum.common.wsgi')
 
@@ -80,6 +84,81 @@ class Server(object):
                              log=WritableLogger(logger))
 
 
+class RequestTimings(object):
+    """
+    Phase timings of the request handled by the current green thread.
+
+    Timings are only collected for the requests going through a middleware
+    which activated them, the phase hooks are no-ops otherwise. Phases can
+    be nested, a phase already running in the green thread (a plugin method
+    calling another one) is only timed once.
+    """
+
+    _local = eventlet.corolocal.local()
+
+    def __init__(self):
+        self.start = time.time()
+        self.phases = []
+        self.durations = {}
+        self.counts = {}
+        self._running = set()
+
+    @classmethod
+    def activate(cls):
+        """Starts collecting the timings of the current request"""
+        timings = cls()
+        cls._local.timings = timings
+        return timings
+
+    @classmethod
+    def deactivate(cls):
+        cls._local.timings = None
+
+    @classmethod
+    def current(cls):
+        return getattr(cls._local, 'timings', None)
+
+    def add(self, phase, elapsed, count=1):
+        if phase not in self.durations:
+            self.phases.append(phase)
+            self.durations[phase] = 0.0
+            self.counts[phase] = 0
+        self.durations[phase] += elapsed
+        self.counts[phase] += count
+
+    def begin(self, phase):
+        """Starts timing a phase, returns False if it is already running"""
+        if phase in self._running:
+            return False
+        self._running.add(phase)
+        return True
+
+    def end(self, phase, start):
+        self._running.discard(phase)
+        self.add(phase, time.time() - start)
+
+    @classmethod
+    def mark(cls, phase):
+        """Records the time elapsed since the start of the request"""
+        timings = cls.current()
+        if timings:
+            timings.add(phase, time.time() - timings.start)
+
+    @classmethod
+    @contextlib.contextmanager
+    def phase(cls, phase):
+        """Times the enclosed block as a phase of the current request"""
+        timings = cls.current()
+        if not timings or not timings.begin(phase):
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            timings.end(phase, start)
+
+
 class Middleware(object):
     """
     Base WSGI middleware wrapper. These classes require an application to be
@@ -722,29 +801,37 @@ class Resource(Application):
         xml_serializer = self.serializer.body_serializers['application/xml']
         if hasattr(xml_serializer, 'xmlns'):
             self._xmlns = xml_serializer.xmlns
+        self._metrics_name = "api.%s" % getattr(controller, '_resource_name',
+                                                controller.__class__.__name__)
 
     @webob.dec.wsgify(RequestClass=Request)
     def __call__(self, request):
         """WSGI method that controls (de)serialization and method dispatch."""
 
+        start = time.time()
+        RequestTimings.mark('routing')
         LOG.info("%(method)s %(url)s" % {"method": request.method,
                                           "url": request.url})
 
         try:
-            action, args, accept = self.deserializer.deserialize(request)
+            with RequestTimings.phase('deserialize'):
+                action, args, accept = self.deserializer.deserialize(request)
         except exception.InvalidContentType:
             msg = _("Unsupported Content-Type")
             LOG.exception("InvalidContentType:%s", msg)
-            return Fault(webob.exc.HTTPBadRequest(explanation=msg),
-                         self._xmlns)
+            return self._observe('invalid', start,
+                                 Fault(webob.exc.HTTPBadRequest(
+                                     explanation=msg), self._xmlns))
         except exception.MalformedRequestBody:
             msg = _("Malformed request body")
             LOG.exception("MalformedRequestBody:%s", msg)
-            return Fault(webob.exc.HTTPBadRequest(explanation=msg),
-                         self._xmlns)
+            return self._observe('invalid', start,
+                                 Fault(webob.exc.HTTPBadRequest(
+                                     explanation=msg), self._xmlns))
 
         try:
-            action_result = self.dispatch(request, action, args)
+            with RequestTimings.phase('dispatch'):
+                action_result = self.dispatch(request, action, args)
         except webob.exc.HTTPException as ex:
             LOG.info(_("HTTP exception thrown: %s"), unicode(ex))
             action_result = Fault(ex,
@@ -752,9 +839,10 @@ class Resource(Application):
                                   self._fault_body_function)
 
         if isinstance(action_result, dict) or action_result is None:
-            response = self.serializer.serialize(action_result,
-                                                 accept,
-                                                 action=action)
+            with RequestTimings.phase('serialize'):
+                response = self.serializer.serialize(action_result,
+                                                     accept,
+                                                     action=action)
         else:
             response = action_result
 
@@ -767,6 +855,19 @@ class Resource(Application):
 
         LOG.info(msg)
 
+        return self._observe(action, start, response)
+
+    def _observe(self, action, start, response):
+        """
+        Records the latency and the status of the request, and the outcome
+        of the plugin call for the dispatched requests
+        """
+        name = "%s.%s" % (self._metrics_name, action)
+        status = getattr(response, 'status_int', None)
+        metrics.histogram(name + ".latency").observe_since(start)
+        metrics.counter("%s.status.%s" % (name, status or 'fault')).inc()
+        if action != 'invalid' and status:
+            metrics.mark("plugin", status < 500)
         return response
 
     def dispatch(self, request, action, action_args):